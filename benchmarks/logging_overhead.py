@@ -0,0 +1,121 @@
+"""Measure the logging overhead of the evaluation hot path in production mode.
+
+Wall-clock A/B timings are too noisy to resolve a 1% difference, so the
+overhead is derived from the number of logger calls made by one evaluation
+and the measured cost of each kind of call.
+
+Usage: PYTHONPATH=src python benchmarks/logging_overhead.py [--input-dir inputs]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import timeit
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Self
+
+from analyzer import api, utils
+
+# Same mapping as inputs/mapping_.yml
+FACTORS = [[8, 32, 1], [1, 1, 1], [1, 2, 1], [1, 1, 1024], [1, 4, 1], [1, 1, 1]]
+PERMUTATIONS = [["BatchSize", "NumOutputFeature", "NumInputFeature"]] * 6
+
+
+class CountingLogger:
+    def __init__(self: Self, logger: logging.Logger, counter: Counter[str]) -> None:
+        self._logger = logger
+        self._counter = counter
+
+    def __getattr__(self: Self, name: str) -> Callable[..., Any]:
+        method = getattr(self._logger, name)
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self._counter[name] += 1
+            return method(*args, **kwargs)
+
+        return wrapper
+
+
+@contextmanager
+def count_logger_calls() -> Generator[Counter[str], None, None]:
+    # Wrap every module logger of the package
+    modules = [
+        module
+        for name, module in sys.modules.items()
+        if name.startswith("analyzer") and hasattr(module, "logger")
+    ]
+    loggers = [module.logger for module in modules]
+    counter: Counter[str] = Counter()
+    for module, logger in zip(modules, loggers, strict=True):
+        module.logger = CountingLogger(logger, counter)
+    try:
+        yield counter
+    finally:
+        for module, logger in zip(modules, loggers, strict=True):
+            module.logger = logger
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input-dir", type=Path, default=Path("inputs"))
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.01)
+    args = parser.parse_args()
+
+    utils.set_production_mode()
+    logger = utils.get_logger()
+    evaluator = api.Evaluator.load(args.input_dir)
+
+    def evaluate() -> None:
+        evaluator.evaluate(FACTORS, PERMUTATIONS)
+
+    evaluation_time = measure(evaluate, args.number, args.repeat)
+    with count_logger_calls() as calls:
+        evaluate()
+
+    call_costs = {
+        name: measure(
+            lambda name=name: getattr(logger, name)(
+                logging.DEBUG if name == "isEnabledFor" else "message"
+            ),
+            args.number * 100,
+            args.repeat,
+        )
+        for name in calls
+    }
+    logging_time = sum(count * call_costs[name] for name, count in calls.items())
+
+    # The pre-production behaviour for reference: everything formatted at DEBUG
+    utils.set_logger(logging.DEBUG, rich=False)
+    logger.handlers = [logging.NullHandler()]
+    debug_time = measure(evaluate, args.number, args.repeat)
+    utils.set_production_mode()
+
+    overhead = logging_time / evaluation_time
+    report = {
+        "evaluation_seconds": evaluation_time,
+        "debug_evaluation_seconds": debug_time,
+        "logger_calls": dict(calls),
+        "logger_call_seconds": call_costs,
+        "logging_seconds": logging_time,
+        "overhead": overhead,
+        "threshold": args.threshold,
+        "passed": overhead < args.threshold,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
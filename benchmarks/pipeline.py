@@ -0,0 +1,268 @@
+"""Benchmark every stage of the evaluation pipeline on synthetic inputs.
+
+Architectures have 3 to 12 hierarchy levels and workloads 3 to 7 dimensions.
+Results are written as JSON so they can be compared across revisions.
+
+Usage: PYTHONPATH=src python benchmarks/pipeline.py [--output bench.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from analyzer import api, utils
+from analyzer.dataflow import Dataflow
+from analyzer.IR import ArchitectueConfig, MappingConfig, WorkloadConfig
+from analyzer.nest_analysis import NestedLoop
+from analyzer.network import Network
+from analyzer.tile_analysis import analyze_tiling
+
+SPATIAL_FANOUT = 4
+CONTAINER_STRIDE = 3
+MM_DIMS = 3
+
+
+def create_architecture(num_levels: int) -> dict[str, Any]:
+    # Storage levels with a container every third level, MAC innermost
+    hierarchy: list[dict[str, Any]] = []
+    for idx in range(num_levels - 1):
+        if idx % CONTAINER_STRIDE == CONTAINER_STRIDE - 1 and idx != num_levels - 2:
+            hierarchy.append({
+                "type": "container",
+                "name": f"Tile{idx}",
+                "spatial": {"NumX": SPATIAL_FANOUT},
+            })
+        else:
+            hierarchy.append({
+                "type": "component",
+                "name": f"Buffer{idx}",
+                "class": "storage",
+                "attributes": {
+                    "depth": 2 ** (16 - idx),
+                    "width": 64,
+                    "datawidth": 8,
+                    "shared_bandwidth": 2 ** (3 + idx % 4),
+                },
+            })
+    hierarchy.append({
+        "type": "component",
+        "name": "MAC",
+        "class": "compute",
+        "attributes": {"datawidth": 8},
+    })
+
+    # One network for each group of elements above the same container
+    groups: list[list[str]] = [[]]
+    for elem in hierarchy:
+        groups[-1].append(elem["name"])
+        if elem["type"] == "container":
+            groups.append([])
+    network = [
+        {
+            "name": f"Network{idx}",
+            "class": "network",
+            "source": group,
+            "sink": group,
+            "attributes": {"datawidth": 8},
+        }
+        for idx, group in enumerate(groups)
+        if len(group) > 1
+    ]
+    return {"architecture": {"hierarchy": hierarchy, "network": network}}
+
+
+def create_workload(num_dims: int) -> dict[str, Any]:
+    # A matmul whose extra dimensions are shared by every dataspace
+    dims = [f"D{idx}" for idx in range(num_dims)]
+    batch, reduction, output, *shared = dims
+    return {
+        "workload": {
+            "shape": {"operation_dimensions": dims},
+            "dataspaces": {
+                "Weights": {
+                    "projection": [[[d]] for d in (reduction, output, *shared)]
+                },
+                "Inputs": {"projection": [[[d]] for d in (batch, reduction, *shared)]},
+                "Outputs": {
+                    "projection": [[[d]] for d in (batch, output, *shared)],
+                    "read_write": True,
+                },
+            },
+            "operation_dimension_size": {
+                dim: 2 ** (6 if idx < MM_DIMS else 2) for idx, dim in enumerate(dims)
+            },
+        }
+    }
+
+
+def create_mappings(
+    evaluator: api.Evaluator, num_mappings: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    # Random legal factors by spreading the power-of-two exponents over levels
+    levels, dims = evaluator.levels, evaluator.dims
+    factors = np.ones((num_mappings, len(levels), len(dims)), dtype=np.int64)
+    temporal_idx = [
+        idx for idx, lvl in enumerate(levels) if not lvl.endswith("_spatial")
+    ]
+    spatial_idx = [idx for idx, lvl in enumerate(levels) if lvl.endswith("_spatial")]
+
+    for dim_idx, dim in enumerate(dims):
+        exponent = evaluator.workload.operation_dimension_size[dim].bit_length() - 1
+        for n in range(num_mappings):
+            remaining = exponent
+            # Spread one dim over each spatial level to use the fan-out
+            if dim_idx == n % len(dims):
+                for lvl_idx in spatial_idx:
+                    step = min(remaining, SPATIAL_FANOUT.bit_length() - 1)
+                    factors[n, lvl_idx, dim_idx] = 2**step
+                    remaining -= step
+            for lvl_idx in rng.choice(temporal_idx, remaining):
+                factors[n, lvl_idx, dim_idx] *= 2
+
+    permutations = np.argsort(rng.random(factors.shape), axis=-1)
+    return factors, permutations
+
+
+def time_stage(func: Callable[[], Any], min_time: float) -> float:
+    # Mean seconds per call, repeating until `min_time` has elapsed
+    number = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_time or number == 0:
+        func()
+        number += 1
+    return elapsed / number
+
+
+def time_stages(
+    workload: dict[str, Any],
+    arch: dict[str, Any],
+    mapping: dict[str, Any],
+    min_time: float,
+) -> dict[str, float]:
+    # Each stage reuses the outputs of the previous ones so only it is timed
+    workload_config = WorkloadConfig.create(workload)
+    arch_config = ArchitectueConfig.create(arch)
+    mapping_config = MappingConfig.create(mapping)
+    dataflow = Dataflow.create(arch_config)
+    nested_loop = NestedLoop.create(dataflow, mapping_config)
+    tile_analyze_result = analyze_tiling(dataflow, nested_loop, workload_config, "MM")
+    networks = [
+        Network.create(network, arch_config, workload_config)
+        for network in arch_config.network.values()
+    ]
+
+    stages = {
+        "WorkloadConfig.create": lambda: WorkloadConfig.create(workload),
+        "ArchitectueConfig.create": lambda: ArchitectueConfig.create(arch),
+        "MappingConfig.create": lambda: MappingConfig.create(mapping),
+        "MappingConfig.create(validate=False)": lambda: MappingConfig.create(
+            mapping, validate=False
+        ),
+        "Dataflow.create": lambda: Dataflow.create(arch_config),
+        "NestedLoop.create": lambda: NestedLoop.create(dataflow, mapping_config),
+        "analyze_tiling": lambda: analyze_tiling(
+            dataflow, nested_loop, workload_config, "MM"
+        ),
+        "Network.create": lambda: [
+            Network.create(network, arch_config, workload_config)
+            for network in arch_config.network.values()
+        ],
+        "evaluate_latency": lambda: [
+            network.evaluate_latency(tile_analyze_result) for network in networks
+        ],
+    }
+    return {name: time_stage(func, min_time) for name, func in stages.items()}
+
+
+def benchmark(
+    num_levels: int, num_dims: int, num_mappings: int, min_time: float
+) -> dict[str, Any]:
+    rng = np.random.default_rng(num_levels * 100 + num_dims)
+    arch, workload = create_architecture(num_levels), create_workload(num_dims)
+
+    evaluator = api.Evaluator.create(workload, arch)
+    factors, permutations = create_mappings(evaluator, num_mappings, rng)
+    # Per-level factors in permutation order, as `Evaluator.evaluate` expects
+    single = [
+        [[f[d] for d in p] for f, p in zip(lvl_f, lvl_p, strict=True)]
+        for lvl_f, lvl_p in zip(factors, permutations, strict=True)
+    ]
+    mapping = api._build_mapping(
+        evaluator.levels, *evaluator._normalize(single[0], permutations[0])
+    )
+    stage_seconds = time_stages(workload, arch, mapping, min_time)
+
+    idx = iter(range(sys.maxsize))
+    single_seconds = time_stage(
+        lambda: evaluator.evaluate(
+            single[(n := next(idx) % num_mappings)], permutations[n]
+        ),
+        min_time,
+    )
+    batch_seconds = time_stage(
+        lambda: evaluator.evaluate_batch(factors, permutations), min_time
+    )
+
+    tracemalloc.start()
+    evaluator.evaluate(single[0], permutations[0])
+    _, single_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    evaluator.evaluate_batch(factors, permutations)
+    _, batch_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "num_levels": num_levels,
+        "num_dims": num_dims,
+        "num_mapping_levels": len(evaluator.levels),
+        "stage_seconds": stage_seconds,
+        "evaluations_per_second": 1 / single_seconds,
+        "batch_evaluations_per_second": num_mappings / batch_seconds,
+        "peak_memory_bytes": single_peak,
+        "batch_peak_memory_bytes": batch_peak,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[3, 6, 9, 12])
+    parser.add_argument("--dims", type=int, nargs="+", default=[3, 5, 7])
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    utils.set_production_mode()
+    report = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": [
+            benchmark(num_levels, num_dims, args.batch_size, args.min_time)
+            for num_levels in args.levels
+            for num_dims in args.dims
+        ],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,12 @@
 from .architecture_config import ArchitectueConfig, HierarchyElem, NetworkElem
 from .attributes_config import (
+    SPATIAL_AXES,
     AttributeFactory,
     ComputeAttributes,
     NetworkAttributes,
     StorageAttrtributes,
 )
+from .base_config import skip_validation
 from .mapping_config import (
     BypassMappingElem,
     MappingConfig,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import Any, Self
 
 from attr import field, frozen
@@ -18,6 +19,30 @@ HIERARCHY_ELEM_TYPES = {"component", "container"}
 COMPONENT_CLASSES = {"storage", "compute"}
 NETWORK_CLASSES = {"network"}
 
+ARCHITECTURE_SCHEMA = Schema(
+    {"hierarchy": list, "network": list}, ignore_extra_keys=True
+)
+HIERARCHY_ELEM_SCHEMA = Schema(
+    {
+        "name": str,
+        "type": lambda x: x in HIERARCHY_ELEM_TYPES,
+        Optional("class"): lambda x: x in COMPONENT_CLASSES,
+        Optional("attributes"): dict,
+        Optional("spatial"): dict,
+    },
+    ignore_extra_keys=True,
+)
+NETWORK_ELEM_SCHEMA = Schema(
+    {
+        "name": str,
+        "class": lambda x: x in NETWORK_CLASSES,
+        "source": list[str],
+        "sink": list[str],
+        "attributes": dict,
+    },
+    ignore_extra_keys=True,
+)
+
 logger = get_logger()
 
 
@@ -27,15 +52,15 @@ class ArchitectueConfig(BaseConfig):
     network: dict[str, NetworkElem]
 
     @classmethod
-    def create(cls: type[ArchitectueConfig], arch: dict[str, Any]) -> ArchitectueConfig:
+    def create(
+        cls: type[ArchitectueConfig], arch: dict[str, Any], *, validate: bool = True
+    ) -> ArchitectueConfig:
         _arch: dict[str, Any] = arch.get("architecture", arch)
-        return super().create(_arch)
+        return super().create(_arch, validate=validate)
 
     @staticmethod
     def _pre_validate(arch: dict[str, list[dict[str, Any]]]) -> None:
-        Schema({"hierarchy": list, "network": list}, ignore_extra_keys=True).validate(
-            arch
-        )
+        ARCHITECTURE_SCHEMA.validate(arch)
 
     @staticmethod
     def _convert(arch: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
@@ -60,21 +85,13 @@ class HierarchyElem(BaseConfig):
 
     def __attrs_post_init__(self: Self) -> None:
         self._post_validate()
-        msg = f"{self.__class__.__name__}.{self.elem_name} created successfully!"
-        logger.debug(msg)
+        if logger.isEnabledFor(logging.DEBUG):
+            msg = f"{self.__class__.__name__}.{self.elem_name} created successfully!"
+            logger.debug(msg)
 
     @staticmethod
     def _pre_validate(elem: dict[str, Any]) -> None:
-        Schema(
-            {
-                "name": str,
-                "type": lambda x: x in HIERARCHY_ELEM_TYPES,
-                Optional("class"): lambda x: x in COMPONENT_CLASSES,
-                Optional("attributes"): dict,
-                Optional("spatial"): dict,
-            },
-            ignore_extra_keys=True,
-        ).validate(elem)
+        HIERARCHY_ELEM_SCHEMA.validate(elem)
 
         if elem["type"] == "component" and not any(
             key in elem for key in ("class", "attributes")
@@ -122,21 +139,13 @@ class NetworkElem(BaseConfig):
 
     def __attrs_post_init__(self: Self) -> None:
         self._post_validate()
-        msg = f"{self.__class__.__name__}.{self.elem_name} created successfully!"
-        logger.debug(msg)
+        if logger.isEnabledFor(logging.DEBUG):
+            msg = f"{self.__class__.__name__}.{self.elem_name} created successfully!"
+            logger.debug(msg)
 
     @staticmethod
     def _pre_validate(elem: dict[str, Any]) -> None:
-        Schema(
-            {
-                "name": str,
-                "class": lambda x: x in NETWORK_CLASSES,
-                "source": list[str],
-                "sink": list[str],
-                "attributes": dict,
-            },
-            ignore_extra_keys=True,
-        ).validate(elem)
+        NETWORK_ELEM_SCHEMA.validate(elem)
 
     @staticmethod
     def _convert(elem: dict[str, Any]) -> dict[str, Any]:
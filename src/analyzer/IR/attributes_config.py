@@ -7,6 +7,28 @@ from schema import Optional, Schema
 
 from analyzer.IR.base_config import BaseConfig
 
+SPATIAL_AXES = ("x", "y")
+
+STORAGE_SCHEMA = Schema(
+    {
+        "depth": int,
+        "width": int,
+        "datawidth": int,
+        Optional("shared_bandwidth"): int,
+        Optional("read_bandwidth"): int,
+        Optional("write_bandwidth"): int,
+    },
+    ignore_extra_keys=True,
+)
+COMPUTE_SCHEMA = Schema({"datawidth": int}, ignore_extra_keys=True)
+NETWORK_SCHEMA = Schema(
+    {
+        "datawidth": int,
+        Optional("multicast"): [lambda x: x in SPATIAL_AXES],
+    },
+    ignore_extra_keys=True,
+)
+
 
 class AttributeFactory:
     @staticmethod
@@ -36,19 +58,14 @@ class StorageAttrtributes(BaseConfig):
     def __attrs_post_init__(self: Self) -> None:
         self._post_validate()
 
+    @property
+    def capacity(self: Self) -> int:
+        # Number of `datawidth`-bit elements the storage can hold
+        return self.depth * self.width // self.datawidth
+
     @staticmethod
     def _pre_validate(attrs: dict[str, Any]) -> None:
-        Schema(
-            {
-                "depth": int,
-                "width": int,
-                "datawidth": int,
-                Optional("shared_bandwidth"): int,
-                Optional("read_bandwidth"): int,
-                Optional("write_bandwidth"): int,
-            },
-            ignore_extra_keys=True,
-        ).validate(attrs)
+        STORAGE_SCHEMA.validate(attrs)
 
     def _post_validate(self: Self) -> None:
         if self.shared_bandwidth is not None:
@@ -69,16 +86,25 @@ class ComputeAttributes(BaseConfig):
 
     @staticmethod
     def _pre_validate(attrs: dict[str, int]) -> None:
-        Schema({"datawidth": int}, ignore_extra_keys=True).validate(attrs)
+        COMPUTE_SCHEMA.validate(attrs)
 
 
 @frozen
 class NetworkAttributes(BaseConfig):
     datawidth: int
+    # Spatial axes along which one transfer reaches every sharing instance
+    multicast: frozenset[str] = field(default=frozenset(SPATIAL_AXES))
 
     def __attrs_post_init__(self: Self) -> None:
         pass
 
     @staticmethod
-    def _pre_validate(attrs: dict[str, int]) -> None:
-        Schema({"datawidth": int}, ignore_extra_keys=True).validate(attrs)
+    def _pre_validate(attrs: dict[str, Any]) -> None:
+        NETWORK_SCHEMA.validate(attrs)
+
+    @staticmethod
+    def _convert(attrs: dict[str, Any]) -> dict[str, Any]:
+        _attrs = {"datawidth": attrs["datawidth"]}
+        if "multicast" in attrs:
+            _attrs["multicast"] = frozenset(attrs["multicast"])
+        return _attrs
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import logging
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any, Self
 
 from attr import frozen
@@ -8,12 +12,29 @@ from analyzer.utils import get_logger
 
 logger = get_logger()
 
+_validate_schema: ContextVar[bool] = ContextVar("validate_schema", default=True)
+
+
+@contextmanager
+def skip_validation() -> Generator[None, None, None]:
+    # Trust configs built in code, e.g. by a mapper, and skip schema checks
+    token = _validate_schema.set(False)
+    try:
+        yield
+    finally:
+        _validate_schema.reset(token)
+
 
 @frozen
 class BaseConfig:
     @classmethod
-    def create(cls, config: Any) -> Self:  # noqa: ANN102
-        cls._pre_validate(config)
+    def create(cls, config: Any, *, validate: bool = True) -> Self:  # noqa: ANN102
+        if not validate:
+            with skip_validation():
+                return cls.create(config)
+
+        if _validate_schema.get():
+            cls._pre_validate(config)
         _config = cls._convert(config)
         return cls(**_config)
 
@@ -30,5 +51,6 @@ class BaseConfig:
 
     def __attrs_post_init__(self: Self) -> None:
         self._post_validate()
-        msg = f"{self.__class__.__name__} created successfully!"
-        logger.info(msg)
+        if logger.isEnabledFor(logging.INFO):
+            msg = f"{self.__class__.__name__} created successfully!"
+            logger.info(msg)
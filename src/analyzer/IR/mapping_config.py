@@ -1,13 +1,39 @@
 from __future__ import annotations
 
+import logging
 from typing import Any, Self
 
 from attr import field, frozen
 from schema import Optional, Schema
 
-from analyzer.IR.base_config import BaseConfig
+from analyzer.IR.base_config import BaseConfig, skip_validation
 from analyzer.utils import get_logger
 
+MAPPING_ELEM_SCHEMA = Schema(
+    {
+        Optional("temporal"): dict,
+        Optional("spatial"): dict,
+        Optional("bypass"): dict,
+    },
+    ignore_extra_keys=True,
+)
+TEMPORAL_SCHEMA = Schema(
+    {
+        "factor": dict[str, int],
+        "permutation": list[str],
+    },
+    ignore_extra_keys=True,
+)
+SPATIAL_SCHEMA = Schema(
+    {
+        "factor": dict[str, int],
+        "permutation": list[str],
+        "split": int,
+    },
+    ignore_extra_keys=True,
+)
+BYPASS_SCHEMA = Schema({"bypass": list[str], "keep": list[str]}, ignore_extra_keys=True)
+
 logger = get_logger()
 
 
@@ -18,20 +44,15 @@ class MappingElem(BaseConfig):
     bypass: BypassMappingElem | None = field(default=None)
 
     @classmethod
-    def create(cls: type[MappingElem], elem: dict[str, Any]) -> MappingElem:
+    def create(
+        cls: type[MappingElem], elem: dict[str, Any], *, validate: bool = True
+    ) -> MappingElem:
         _elem: dict[str, Any] = elem.get("mapping", elem)
-        return super().create(_elem)
+        return super().create(_elem, validate=validate)
 
     @staticmethod
     def _pre_validate(elem: dict[str, Any]) -> None:
-        Schema(
-            {
-                Optional("temporal"): dict,
-                Optional("spatial"): dict,
-                Optional("bypass"): dict,
-            },
-            ignore_extra_keys=True,
-        ).validate(elem)
+        MAPPING_ELEM_SCHEMA.validate(elem)
 
     @staticmethod
     def _convert(
@@ -57,13 +78,7 @@ class TemporalMappingElem(BaseConfig):
 
     @staticmethod
     def _pre_validate(temporal: dict[str, Any]) -> None:
-        Schema(
-            {
-                "factor": dict[str, int],
-                "permutation": list[str],
-            },
-            ignore_extra_keys=True,
-        ).validate(temporal)
+        TEMPORAL_SCHEMA.validate(temporal)
 
     def __attrs_post_init__(self: Self) -> None:
         pass
@@ -78,14 +93,7 @@ class SpatialMappingElem(BaseConfig):
 
     @staticmethod
     def _pre_validate(spatial: dict[str, Any]) -> None:
-        Schema(
-            {
-                "factor": dict[str, int],
-                "permutation": list[str],
-                "split": int,
-            },
-            ignore_extra_keys=True,
-        ).validate(spatial)
+        SPATIAL_SCHEMA.validate(spatial)
 
     @staticmethod
     def _convert(spatial: dict[str, Any]) -> dict[str, Any]:
@@ -108,9 +116,7 @@ class BypassMappingElem(BaseConfig):
 
     @staticmethod
     def _pre_validate(bypass: dict[str, Any]) -> None:
-        Schema(
-            {"bypass": list[str], "keep": list[str]}, ignore_extra_keys=True
-        ).validate(bypass)
+        BYPASS_SCHEMA.validate(bypass)
 
     @staticmethod
     def _convert(bypass: dict[str, Any]) -> dict[str, Any]:
@@ -126,11 +132,18 @@ class BypassMappingElem(BaseConfig):
 class MappingConfig(dict[str, MappingElem]):
     def __init__(self: Self, mapping: dict[str, MappingElem]) -> None:
         super().__init__(mapping)
-        msg = f"{self.__class__.__name__} created successfully!"
-        logger.info(msg)
+        if logger.isEnabledFor(logging.INFO):
+            msg = f"{self.__class__.__name__} created successfully!"
+            logger.info(msg)
 
     @classmethod
-    def create(cls: type[MappingConfig], mapping: dict[str, Any]) -> MappingConfig:
+    def create(
+        cls: type[MappingConfig], mapping: dict[str, Any], *, validate: bool = True
+    ) -> MappingConfig:
+        if not validate:
+            with skip_validation():
+                return cls.create(mapping)
+
         _mapping: dict[str, Any] = mapping.get("mapping", mapping)
         _mapping = cls._convert(_mapping)
         return cls(_mapping)
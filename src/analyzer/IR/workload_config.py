@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from math import prod
 from typing import Any, Self
 
 from attr import field, frozen
@@ -10,6 +11,23 @@ from analyzer.utils import get_logger
 
 logger = get_logger()
 
+WORKLOAD_SCHEMA = Schema(
+    {
+        "shape": {
+            "operation_dimensions": [str],
+            Optional("coefficient"): {str: int},
+        },
+        "dataspaces": {
+            str: {
+                "projection": list[list[list[str]]],
+                Optional("read_write"): bool,
+            }
+        },
+        "operation_dimension_size": {str: int},
+    },
+    ignore_extra_keys=True,
+)
+
 
 @frozen
 class WorkloadConfig(BaseConfig):
@@ -20,28 +38,15 @@ class WorkloadConfig(BaseConfig):
     coefficient: dict[str, int] | None = field(default=None)
 
     @classmethod
-    def create(cls: type[WorkloadConfig], workload: dict) -> WorkloadConfig:
+    def create(
+        cls: type[WorkloadConfig], workload: dict, *, validate: bool = True
+    ) -> WorkloadConfig:
         _workload: dict[str, Any] = workload.get("workload", workload)
-        return super().create(_workload)
+        return super().create(_workload, validate=validate)
 
     @staticmethod
     def _pre_validate(workload: dict[str, Any]) -> None:
-        Schema(
-            {
-                "shape": {
-                    "operation_dimensions": [str],
-                    Optional("coefficient"): {str: int},
-                },
-                "dataspaces": {
-                    str: {
-                        "projection": list[list[list[str]]],
-                        Optional("read_write"): bool,
-                    }
-                },
-                "operation_dimension_size": {str: int},
-            },
-            ignore_extra_keys=True,
-        ).validate(workload)
+        WORKLOAD_SCHEMA.validate(workload)
 
         # Check if all operation dimensions is unique
         seen = set()
@@ -59,8 +64,8 @@ class WorkloadConfig(BaseConfig):
         _workload["operation_dimensions"] = set(
             workload["shape"]["operation_dimensions"]
         )
-        if "coefficients" in workload["shape"]:
-            _workload["coefficient"] = workload["shape"]["coefficients"]
+        if "coefficient" in workload["shape"]:
+            _workload["coefficient"] = workload["shape"]["coefficient"]
         _workload["operation_dimension_size"] = workload["operation_dimension_size"]
         _workload["dataspaces_projections"] = {
             k: [Projection(proj) for proj in v["projection"]]
@@ -103,6 +108,33 @@ class WorkloadConfig(BaseConfig):
             logger.error(err_msg)
             raise ValueError(err_msg)
 
+    def get_projection_elems(self: Self) -> dict[str, tuple[frozenset[str], ...]]:
+        return {
+            ds: tuple(frozenset(proj.get_all_proj_elem()) for proj in projs)
+            for ds, projs in self.dataspaces_projections.items()
+        }
+
+    def get_projection_coefficients(
+        self: Self,
+    ) -> dict[str, tuple[dict[str, int], ...]]:
+        # Each projection axis as {dim: coefficient}. Terms of an axis are
+        # summed and coefficients in a term multiply its dims, so
+        # [[Wstride, P], [R]] spans 1 + Wstride * (P - 1) + (R - 1) elements
+        coefficient = self.coefficient or {}
+        projection_coefficients: dict[str, tuple[dict[str, int], ...]] = {}
+        for ds, projs in self.dataspaces_projections.items():
+            axes = []
+            for proj in projs:
+                axis: dict[str, int] = {}
+                for term in proj:
+                    term_coef = prod(coefficient[e] for e in term if e in coefficient)
+                    for dim in term:
+                        if dim in self.operation_dimensions:
+                            axis[dim] = axis.get(dim, 0) + term_coef
+                axes.append(axis)
+            projection_coefficients[ds] = tuple(axes)
+        return projection_coefficients
+
 
 class Projection(list[list[str]]):
     def get_all_proj_elem(self: Self) -> set[str]:
@@ -1,15 +1,34 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+import logging
+from collections.abc import Iterable, Sequence
 from pathlib import Path
+from typing import Any, Self
 
-from yaml import safe_dump, safe_load
+import numpy as np
+from attr import frozen
 
+from analyzer.bound import network_lower_bounds
+from analyzer.cache import ResultCache, get_config_hash
 from analyzer.dataflow import Dataflow
 from analyzer.IR import ArchitectueConfig, MappingConfig, WorkloadConfig
-from analyzer.nest_analysis import NestedLoop
+from analyzer.nest_analysis import Loop, LoopArray, NestedLoop
 from analyzer.network import Network
-from analyzer.tile_analysis import analyze_tiling
+from analyzer.pipeline import PipelineModel
+from analyzer.plan import ComputeUsage, EvaluationPlan
+from analyzer.profiling import profiled
+from analyzer.tile_analysis import (
+    AnalyzeResult,
+    BatchAnalyzeResult,
+    TilingOptions,
+    analyze_tiling,
+    analyze_tiling_batch,
+)
+from analyzer.utils import dump_yaml, get_logger, load_yaml
+
+logger = get_logger()
+
+LATENCY_MODELS = ("serial", "pipelined")
 
 test_factor = [[1, 2], [3, 4], [5, 6], [7, 8], [9, 10], [11, 12]]
 test_permutations = [
@@ -22,6 +41,353 @@ test_permutations = [
 ]
 
 
+@frozen
+class Evaluation:
+    result: AnalyzeResult
+    network_latencies: dict[str, int]
+
+
+@frozen
+class EvaluatorOptions:
+    # Evaluations kept by canonical loop nest, 0 disables the cache
+    cache_size: int = 0
+    # "serial" networks run one by one, "pipelined" ones overlap
+    latency_model: str = "serial"
+
+
+class Evaluator:
+    def __init__(
+        self: Self,
+        workload: WorkloadConfig,
+        arch: ArchitectueConfig,
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+        *,
+        plan: EvaluationPlan | None = None,
+    ) -> None:
+        options = EvaluatorOptions() if options is None else options
+        if options.latency_model not in LATENCY_MODELS:
+            err_msg = f"Latency model {options.latency_model} not supported"
+            raise NotImplementedError(err_msg)
+
+        self.workload = workload
+        self.arch = arch
+        self.workload_type = workload_type
+        self.options = options
+        self.latency_model = options.latency_model
+        self.cache: ResultCache[tuple[Loop, ...], Evaluation] = ResultCache(
+            options.cache_size
+        )
+
+        self.plan = EvaluationPlan.compile(arch, workload) if plan is None else plan
+        self.dataflow = self.plan.dataflow
+        self.networks = self.plan.networks
+        self.levels = self.plan.mapping_levels
+        self.dims = self.plan.dims
+        # Networks overlap as pipeline stages instead of running one by one
+        self.pipeline = (
+            PipelineModel.compile(self.plan, arch)
+            if options.latency_model == "pipelined"
+            else None
+        )
+
+    @classmethod
+    def create(
+        cls: type[Evaluator],
+        workload: dict[str, Any],
+        arch: dict[str, Any],
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+    ) -> Evaluator:
+        return cls(
+            WorkloadConfig.create(workload),
+            ArchitectueConfig.create(arch),
+            workload_type,
+            options,
+        )
+
+    @classmethod
+    def load(
+        cls: type[Evaluator],
+        input_dir: Path,
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+    ) -> Evaluator:
+        workload = load_yaml(input_dir / "workload.yml")
+        architecute = load_yaml(input_dir / "architecture.yml")
+        return cls.create(workload, architecute, workload_type, options)
+
+    @property
+    def config_hash(self: Self) -> str:
+        # Everything that changes the latency of a mapping
+        return get_config_hash(
+            self.arch, self.workload, self.workload_type, self.latency_model
+        )
+
+    def create_mapping(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> MappingConfig:
+        # Mappings built from normalized factors are trusted
+        return MappingConfig.create(
+            _build_mapping(
+                self.levels, *self._normalize(factors, permutations), splits
+            ),
+            validate=False,
+        )
+
+    def canonical_key(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> tuple[Loop, ...]:
+        return self._canonical_key(*self._normalize(factors, permutations), splits)
+
+    def analyze(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> AnalyzeResult:
+        return self._evaluate(factors, permutations, kept, splits=splits).result
+
+    def evaluate_networks(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> dict[str, int]:
+        return dict(
+            self._evaluate(factors, permutations, kept, splits=splits).network_latencies
+        )
+
+    @profiled("Evaluator.evaluate")
+    def evaluate(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> int:
+        return self._get_latency(
+            self._evaluate(factors, permutations, kept, splits=splits)
+        )
+
+    def evaluate_compute(self: Self, factors: Iterable[Iterable[int]]) -> ComputeUsage:
+        # Only needs the factors, so it can reject mappings before evaluation
+        return self.plan.evaluate_compute([
+            [int(factor) for factor in lvl_factors] for lvl_factors in factors
+        ])
+
+    def check_capacity(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+    ) -> int:
+        # Zero if every tile fits its storage, see `EvaluationPlan.check_capacity`
+        return self.plan.check_capacity(
+            *self._normalize(factors, permutations), self.workload_type, kept
+        )
+
+    def check_capacity_batch(
+        self: Self, factors: np.ndarray, kept: np.ndarray | None = None
+    ) -> np.ndarray:
+        return self.plan.check_capacity_batch(
+            np.asarray(factors, dtype=np.int64), self.workload_type, kept
+        )
+
+    def evaluate_roofline(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> int:
+        factors = [list(lvl_factors) for lvl_factors in factors]
+        return max(
+            self.evaluate_compute(factors).compute_cycles,
+            self.evaluate(factors, permutations, kept, splits=splits),
+        )
+
+    def lower_bound(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> int:
+        # Factors and permutations may only cover the outermost levels
+        network_bounds = network_lower_bounds(
+            self.plan, *self._normalize(factors, permutations), splits
+        )
+        if self.pipeline is None:
+            return sum(network_bounds.values())
+        # Overlapping never hides the slowest network
+        return max(network_bounds.values(), default=0)
+
+    def analyze_batch(
+        self: Self,
+        factors: np.ndarray,
+        permutations: np.ndarray,
+        kept: np.ndarray | None = None,
+        *,
+        splits: np.ndarray | None = None,
+    ) -> BatchAnalyzeResult:
+        return analyze_tiling_batch(
+            factors,
+            permutations,
+            self.workload_type,
+            TilingOptions(self.plan, kept, splits=splits),
+        )
+
+    @profiled("Evaluator.evaluate_batch")
+    def evaluate_batch(
+        self: Self,
+        factors: np.ndarray,
+        permutations: np.ndarray,
+        kept: np.ndarray | None = None,
+        *,
+        splits: np.ndarray | None = None,
+    ) -> np.ndarray:
+        # `factors` is indexed by (mapping, level, dim) and `permutations` holds
+        # the dim indices of each level from outer to inner loop. `kept` marks
+        # the dataspaces stored at each ([mapping,] level, dataspace) and
+        # `splits` the loops on the X axis at each ([mapping,] level)
+        return self.evaluate_analysis_batch(
+            self.analyze_batch(factors, permutations, kept, splits=splits), factors
+        )
+
+    def evaluate_analysis_batch(
+        self: Self, tile_analyze_result: BatchAnalyzeResult, factors: np.ndarray
+    ) -> np.ndarray:
+        latencies = np.zeros(len(tile_analyze_result), dtype=self.result_dtype)
+        network_latencies = self.plan.evaluate_latency_batch(tile_analyze_result)
+        for name, network_latency in network_latencies.items():
+            latencies[name] = network_latency
+            latencies["latency"] += network_latency
+        if self.pipeline is not None:
+            latencies["latency"] = self.pipeline.evaluate_latency_batch(
+                tile_analyze_result, network_latencies
+            )
+
+        compute_cycles, utilization = self.plan.evaluate_compute_batch(
+            np.asarray(factors, dtype=np.int64)
+        )
+        latencies["compute_cycles"] = compute_cycles
+        latencies["utilization"] = utilization
+        latencies["roofline"] = np.maximum(compute_cycles, latencies["latency"])
+        return latencies
+
+    @property
+    def result_dtype(self: Self) -> np.dtype:
+        return np.dtype(
+            [(name, np.int64) for name in self.networks]
+            + [
+                ("latency", np.int64),
+                ("compute_cycles", np.int64),
+                ("utilization", np.float64),
+                ("roofline", np.int64),
+            ]
+        )
+
+    def _evaluate(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> Evaluation:
+        _factors, _permutations = self._normalize(factors, permutations)
+
+        # Mappings which only differ in unit factors share the same loop nest,
+        # bypassing mappings are not cached
+        key = None
+        if self.cache.maxsize and kept is None:
+            key = self._canonical_key(_factors, _permutations, splits)
+            if (cached := self.cache.get(key)) is not None:
+                return cached
+
+        # The log level is checked once for all the stages
+        debug = logger.isEnabledFor(logging.DEBUG)
+        loop_array = LoopArray.from_mapping(
+            self.plan.levels, self.dims, _factors, _permutations, splits
+        )
+        tile_analyze_result = analyze_tiling(
+            self.dataflow,
+            loop_array,
+            self.workload,
+            self.workload_type,
+            TilingOptions(self.plan, kept, debug),
+        )
+        evaluation = Evaluation(
+            result=tile_analyze_result,
+            network_latencies={
+                name: network.evaluate_latency(tile_analyze_result, debug=debug)
+                for name, network in self.networks.items()
+            },
+        )
+
+        if key is not None:
+            self.cache.put(key, evaluation)
+        return evaluation
+
+    def _get_latency(self: Self, evaluation: Evaluation) -> int:
+        if self.pipeline is None:
+            return sum(evaluation.network_latencies.values())
+        return self.pipeline.evaluate_latency(
+            evaluation.result, evaluation.network_latencies
+        )
+
+    @profiled("Evaluator._normalize")
+    def _normalize(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+    ) -> tuple[list[list[int]], list[list[str]]]:
+        # Permutations may name dimensions directly or index into `self.dims`
+        return (
+            [[int(factor) for factor in lvl_factors] for lvl_factors in factors],
+            [
+                [dim if isinstance(dim, str) else self.dims[dim] for dim in lvl_perm]
+                for lvl_perm in permutations
+            ],
+        )
+
+    def _canonical_key(
+        self: Self,
+        factors: list[list[int]],
+        permutations: list[list[str]],
+        splits: Sequence[int] | None = None,
+    ) -> tuple[Loop, ...]:
+        # Same loops as `NestedLoop.create` keeps after pruning unit factors
+        return tuple(
+            Loop(dim, factor, level, _get_axis(level, pos, split))
+            for level, split, lvl_factors, lvl_perm in zip(
+                self.levels,
+                splits if splits is not None else [None] * len(factors),
+                factors,
+                permutations,
+                strict=True,
+            )
+            for pos, (dim, factor) in enumerate(zip(lvl_perm, lvl_factors, strict=True))
+            if factor > 1
+        )
+
+
+@profiled("api.evaluator")
 def evaluator(
     input_dir: Path,
     factors: Iterable[Iterable[int]],
@@ -29,9 +395,9 @@ def evaluator(
 ) -> int:
     _create_mapping(input_dir, factors, permutations)
 
-    workload = safe_load((input_dir / "workload.yml").open())
-    architecute = safe_load((input_dir / "architecture.yml").open())
-    mapping = safe_load((input_dir / "mapping.yml").open())
+    workload = load_yaml(input_dir / "workload.yml")
+    architecute = load_yaml(input_dir / "architecture.yml")
+    mapping = load_yaml(input_dir / "mapping.yml")
 
     workload_config = WorkloadConfig.create(workload)
     arch_config = ArchitectueConfig.create(architecute)
@@ -56,30 +422,55 @@ def _create_mapping(
     factors: Iterable[Iterable[int]],
     permutations: Iterable[Iterable[str]],
 ) -> None:
-    mapping = {"mapping": {}}
-    targets = ("DRAM", "L2_SRAM", "L1_Tile", "L1_SRAM", "CP", "CP_Reg")
+    levels = (
+        "DRAM",
+        "L2_SRAM",
+        "L1_Tile_spatial",
+        "L1_SRAM",
+        "CP_spatial",
+        "CP_Reg",
+    )
+    mapping = _build_mapping(levels, factors, permutations)
 
-    for lvl_target, lvl_factors, lvl_permutations in zip(
-        targets, factors, permutations, strict=True
+    dump_yaml(mapping, input_dir / "mapping.yml")
+
+
+def _build_mapping(
+    levels: Iterable[str],
+    factors: Iterable[Iterable[int]],
+    permutations: Iterable[Iterable[str]],
+    splits: Sequence[int] | None = None,
+) -> dict[str, Any]:
+    # Without splits every spatial loop is on the X axis
+    mapping: dict[str, Any] = {"mapping": {}}
+
+    for lvl_idx, (level, lvl_factors, lvl_perm) in enumerate(
+        zip(levels, factors, permutations, strict=True)
     ):
-        if lvl_target not in {"L1_Tile", "CP"}:
-            mapping["mapping"][lvl_target] = {
-                "temporal": {
-                    "factor": dict(zip(lvl_permutations, lvl_factors, strict=True)),
-                    "permutation": lvl_permutations,
-                }
+        lvl_permutations = list(lvl_perm)
+        target = level.removesuffix("_spatial")
+        target_mapping = mapping["mapping"].setdefault(target, {})
+
+        if level.endswith("_spatial"):
+            target_mapping["spatial"] = {
+                "factor": dict(zip(lvl_permutations, lvl_factors, strict=True)),
+                "permutation": lvl_permutations,
+                "split": 999 if splits is None else int(splits[lvl_idx]),
             }
         else:
-            mapping["mapping"][lvl_target] = {
-                "spatial": {
-                    "factor": dict(zip(lvl_permutations, lvl_factors, strict=True)),
-                    "permutation": lvl_permutations,
-                    "split": 999,
-                }
+            target_mapping["temporal"] = {
+                "factor": dict(zip(lvl_permutations, lvl_factors, strict=True)),
+                "permutation": lvl_permutations,
             }
 
-    with (input_dir / "mapping.yml").open("w") as f:
-        safe_dump(mapping, f, sort_keys=False)
+    return mapping
+
+
+def _get_axis(level: str, pos: int, split: int | None) -> str | None:
+    # Axis of the loop at position `pos` of a level's permutation
+    if not level.endswith("_spatial"):
+        return None
+    return "x" if split is None or pos < split else "y"
 
 
 if __name__ == "__main__":
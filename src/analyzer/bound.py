@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from math import prod
+
+from analyzer.nest_analysis import Loop
+from analyzer.plan import EvaluationPlan
+from analyzer.tile_analysis import calc_tile_sharing, calc_tile_size
+
+
+def latency_lower_bound(
+    plan: EvaluationPlan,
+    factors: list[list[int]],
+    permutations: list[list[str]],
+    splits: Sequence[int] | None = None,
+) -> int:
+    return sum(network_lower_bounds(plan, factors, permutations, splits).values())
+
+
+def network_lower_bounds(
+    plan: EvaluationPlan,
+    factors: list[list[int]],
+    permutations: list[list[str]],
+    splits: Sequence[int] | None = None,
+) -> dict[str, int]:
+    # `factors` and `permutations` only fix the outermost mapping levels,
+    # `splits` the loops on the X axis at each of them as in `LoopArray`.
+    # Accesses at the fixed levels and the first free one are exact, deeper
+    # levels can only split the remaining dims further, which never reduces
+    # the accesses by more than the remaining sizes of repeated projection dims.
+    num_fixed = len(factors)
+    if num_fixed > len(plan.mapping_levels) or len(permutations) != num_fixed:
+        err_msg = "Partial mapping must fix the same outermost levels"
+        raise ValueError(err_msg)
+
+    level_loops = [
+        [(dim, factor) for dim, factor in zip(lvl_perm, lvl_factors, strict=True)]
+        for lvl_factors, lvl_perm in zip(factors, permutations, strict=True)
+    ]
+
+    remaining_sizes = {}
+    for dim, dim_size in plan.dimension_sizes.items():
+        fixed_factor = prod(f for loops in level_loops for d, f in loops if d == dim)
+        if dim_size % fixed_factor != 0:
+            err_msg = f"Factors of {dim} do not divide its size {dim_size}"
+            raise ValueError(err_msg)
+        remaining_sizes[dim] = dim_size // fixed_factor
+
+    related_dims = {
+        ds: frozenset().union(*projs) for ds, projs in plan.projection_elems.items()
+    }
+    tile_accesses = _calc_fixed_tile_accesses(
+        plan, level_loops, remaining_sizes, related_dims
+    )
+
+    # Largest possible reduction of the accesses below the fixed levels.
+    # Splitting strided or summed axes may skip elements, so those
+    # dataspaces can be reduced down to their tile iterations
+    reductions = {
+        ds: prod(
+            remaining_sizes[dim] ** (count - 1)
+            for dim, count in zip(plan.dims, ds_counts, strict=True)
+            if count > 1
+        )
+        if all(list(axis.values()) == [1] for axis in plan.projection_coefficients[ds])
+        else calc_tile_size(plan.projection_coefficients[ds], remaining_sizes)
+        for ds, ds_counts in zip(plan.dataspaces, plan.projection_counts, strict=True)
+    }
+    free_accesses = {
+        ds: -(-accesses // reductions[ds])
+        for ds, accesses in tile_accesses[num_fixed].items()
+    }
+
+    # Tiles replicated to the instances of a fixed spatial level are exact,
+    # free spatial levels may still share every tile
+    tile_sharing = {
+        lvl_idx: calc_tile_sharing(
+            (
+                Loop(
+                    dim,
+                    factor,
+                    level,
+                    "x" if splits is None or pos < splits[lvl_idx] else "y",
+                )
+                for pos, (dim, factor) in enumerate(level_loops[lvl_idx])
+            ),
+            related_dims,
+        )
+        for lvl_idx, level in enumerate(plan.mapping_levels[:num_fixed])
+        if level.endswith("_spatial")
+    }
+
+    network_bounds = dict.fromkeys(plan.networks, 0)
+    for link in plan.links:
+        for ds in (plan.dataspaces[ds_idx] for ds_idx in link.dataspace_idx):
+            network_bounds[link.network] += math.ceil(
+                (
+                    tile_accesses[link.level_idx][ds]
+                    if link.level_idx <= num_fixed
+                    else free_accesses[ds]
+                )
+                * prod(
+                    tile_sharing[link.level_idx][ds][axis]
+                    for axis in link.replicated_axes
+                    if link.level_idx < num_fixed
+                )
+                / link.bandwidth
+            )
+    return network_bounds
+
+
+def _calc_fixed_tile_accesses(
+    plan: EvaluationPlan,
+    level_loops: list[list[tuple[str, int]]],
+    remaining_sizes: dict[str, int],
+    related_dims: dict[str, frozenset[str]],
+) -> list[dict[str, int]]:
+    # Exact accesses of the fixed levels and the first free level
+    dim_sizes = [remaining_sizes.copy()]
+    for loops in reversed(level_loops):
+        lvl_dim_sizes = dim_sizes[0].copy()
+        for dim, factor in loops:
+            lvl_dim_sizes[dim] *= factor
+        dim_sizes.insert(0, lvl_dim_sizes)
+
+    cum_factor = 1
+    iterations = dict.fromkeys(plan.dataspaces, 1)
+    tile_accesses = []
+    for lvl_idx, lvl_dim_sizes in enumerate(dim_sizes):
+        tile_accesses.append({
+            ds: iterations[ds] * calc_tile_size(axes, lvl_dim_sizes)
+            for ds, axes in plan.projection_coefficients.items()
+        })
+        if lvl_idx < len(level_loops):
+            for dim, factor in level_loops[lvl_idx]:
+                if factor == 1:
+                    continue
+                cum_factor *= factor
+                for ds, ds_related_dims in related_dims.items():
+                    if dim in ds_related_dims:
+                        iterations[ds] = cum_factor
+    return tile_accesses
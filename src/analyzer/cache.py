@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Generator, Hashable, Iterable
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple, Self
+
+from attr import asdict, has
+
+# Bump when the tables change, older cache files are then cleared
+CACHE_VERSION = 1
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ResultCache[K: Hashable, V]:
+    def __init__(self: Self, maxsize: int) -> None:
+        if maxsize < 0:
+            err_msg = "Cache size must be non-negative"
+            raise ValueError(err_msg)
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self: Self) -> int:
+        return len(self._data)
+
+    def get(self: Self, key: K) -> V | None:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self: Self, key: K, value: V) -> None:
+        if self.maxsize == 0:
+            return
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def info(self: Self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self: Self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class PersistentCache:
+    """Best mappings found by past searches, kept in a SQLite file.
+
+    Mappings are stored under the hash of the configuration they were
+    evaluated with, so changing the architecture or workload never returns
+    stale results. Each call opens its own connection, so the cache can be
+    shared by worker processes.
+    """
+
+    def __init__(self: Self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                conn.execute("DROP TABLE IF EXISTS mappings")
+                conn.execute("DROP TABLE IF EXISTS searches")
+                conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mappings ("
+                "config TEXT, mapping TEXT, latency INTEGER, factors TEXT, "
+                "permutations TEXT, PRIMARY KEY (config, mapping))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "config TEXT, options TEXT, PRIMARY KEY (config, options))"
+            )
+
+    def get_mappings(
+        self: Self, config: str, limit: int
+    ) -> list[tuple[int, tuple[tuple[int, ...], ...], tuple[tuple[str, ...], ...]]]:
+        # (latency, factors, permutations) of the best mappings of `config`
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT latency, factors, permutations FROM mappings "
+                "WHERE config = ? ORDER BY latency, rowid LIMIT ?",
+                (config, limit),
+            ).fetchall()
+        return [
+            (
+                latency,
+                tuple(map(tuple, json.loads(factors))),
+                tuple(map(tuple, json.loads(permutations))),
+            )
+            for latency, factors, permutations in rows
+        ]
+
+    def put_mappings(
+        self: Self,
+        config: str,
+        mappings: Iterable[tuple[Hashable, int, Any, Any]],
+    ) -> None:
+        # `mappings` holds (canonical key, latency, factors, permutations)
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO mappings VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        config,
+                        json.dumps(key),
+                        latency,
+                        json.dumps(factors),
+                        json.dumps(permutations),
+                    )
+                    for key, latency, factors, permutations in mappings
+                ),
+            )
+
+    def is_complete(self: Self, config: str, options: str) -> bool:
+        with self._connect() as conn:
+            return (
+                conn.execute(
+                    "SELECT 1 FROM searches WHERE config = ? AND options = ?",
+                    (config, options),
+                ).fetchone()
+                is not None
+            )
+
+    def set_complete(self: Self, config: str, options: str) -> None:
+        # The whole mapspace was searched with these options
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO searches VALUES (?, ?)", (config, options)
+            )
+
+    def clear(self: Self, config: str | None = None) -> None:
+        with self._connect() as conn:
+            if config is None:
+                conn.execute("DELETE FROM mappings")
+                conn.execute("DELETE FROM searches")
+            else:
+                conn.execute("DELETE FROM mappings WHERE config = ?", (config,))
+                conn.execute("DELETE FROM searches WHERE config = ?", (config,))
+
+    @contextmanager
+    def _connect(self: Self) -> Generator[sqlite3.Connection, None, None]:
+        # One transaction per connection, committed unless an error is raised
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+
+def get_config_hash(*configs: Any) -> str:
+    # Stable across runs and processes, unlike the builtin `hash`
+    data = json.dumps(
+        [
+            asdict(config, retain_collection_types=True)
+            if has(type(config))
+            else config
+            for config in configs
+        ],
+        default=_to_json,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _to_json(obj: Any) -> Any:
+    if isinstance(obj, set | frozenset):
+        return sorted(obj)
+    err_msg = f"Type {type(obj).__name__} not supported"
+    raise TypeError(err_msg)
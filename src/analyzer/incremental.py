@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Sequence
+from math import prod
+from typing import Self
+
+import numpy as np
+
+from analyzer.api import Evaluator
+from analyzer.IR import SPATIAL_AXES
+from analyzer.nest_analysis import Loop
+from analyzer.tile_analysis import (
+    AnalyzeResult,
+    calc_tile_sharing,
+    calc_tile_size,
+    forward_bypassed_accesses,
+    get_bypassed_dataspaces,
+)
+
+
+class IncrementalEvaluator:
+    """Re-evaluate a mapping after changing the loops of a single level.
+
+    Changing level `c` only affects the dim sizes of the levels at or above
+    `c` in the hierarchy (index <= c) and the tile iterations of the levels
+    below it (index > c), and only links whose sink accesses changed are
+    recomputed. The spatial axes and bypasses given to `reset` hold until the
+    next reset.
+    """
+
+    def __init__(self: Self, evaluator: Evaluator) -> None:
+        if evaluator.workload_type not in {"MM", "einsum"}:
+            err_msg = f"Workload type {evaluator.workload_type} not supported"
+            raise NotImplementedError(err_msg)
+        self.workload_type = evaluator.workload_type
+        self.plan = evaluator.plan
+        self.dims = evaluator.dims
+        self.mapping_levels = evaluator.levels
+        self.pipeline = evaluator.pipeline
+
+        levels = self.plan.levels
+        self._related_dims = {
+            ds: frozenset().union(*projs)
+            for ds, projs in self.plan.projection_elems.items()
+        }
+        self._level_loops: list[list[tuple[str, int, str | None]]] = [
+            [] for _ in self.mapping_levels
+        ]
+        self._splits: Sequence[int] | None = None
+        self._kept: np.ndarray | None = None
+        self._bypassed: dict[str, frozenset[str]] = {}
+        # Dataspaces each link carries to its sink
+        self._link_dataspaces = [
+            tuple(self.plan.dataspaces[ds_idx] for ds_idx in link.dataspace_idx)
+            for link in self.plan.links
+        ]
+        self._dim_sizes: list[dict[str, int]] = [
+            dict.fromkeys(self.dims, 1) for _ in levels
+        ]
+        self._tile_sizes: list[dict[str, int]] = [{} for _ in levels]
+        self._tile_sizes[-1] = dict.fromkeys(self.plan.dataspaces, 1)
+        self._tile_iterations: list[dict[str, int]] = [
+            dict.fromkeys(self.plan.dataspaces, 1) for _ in levels
+        ]
+        self._cum_factors = [1] * len(levels)
+        # Accesses of the tiles of each level, and the ones after bypassing
+        self._level_accesses: list[dict[str, int]] = [{} for _ in levels]
+        self._tile_accesses: list[dict[str, int]] = [{} for _ in levels]
+        # Sharing of the spatial levels, and the one links were evaluated with
+        self._tile_sharing: list[dict[str, tuple[int, ...]]] = [{} for _ in levels]
+        self._link_sharing: list[dict[str, tuple[int, ...]]] = [{} for _ in levels]
+        self._link_latencies = [0] * len(self.plan.links)
+        self.network_latencies = dict.fromkeys(self.plan.networks, 0)
+        self.latency = 0
+        self._has_mapping = False
+
+    def reset(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+        kept: np.ndarray | None = None,
+        *,
+        splits: Sequence[int] | None = None,
+    ) -> int:
+        # `kept` is indexed by (level, dataspace) as in `Evaluator.evaluate`,
+        # `splits` puts loops on the X axis as in `LoopArray.from_mapping`
+        self._has_mapping = False
+        self._splits = splits
+        self._set_kept(kept)
+        self._level_loops = [
+            self._create_level_loops(lvl_idx, lvl_factors, lvl_perm)
+            for lvl_idx, (lvl_factors, lvl_perm) in enumerate(
+                zip(factors, permutations, strict=True)
+            )
+        ]
+        if len(self._level_loops) != len(self.mapping_levels):
+            err_msg = f"Expected mappings for {len(self.mapping_levels)} levels"
+            raise ValueError(err_msg)
+
+        # Links are recomputed as routes may have changed with the bypasses
+        num_levels = len(self.plan.levels)
+        self._tile_accesses = [{} for _ in range(num_levels)]
+        self._update_dim_sizes(num_levels - 2)
+        self._update_tile_iterations(0)
+        self._has_mapping = True
+        return self._update_latency(set(range(num_levels)))
+
+    def update(
+        self: Self,
+        level: int | str,
+        factors: Iterable[int],
+        permutation: Iterable[str | int],
+    ) -> int:
+        if not self._has_mapping:
+            err_msg = "Call reset with a whole mapping before updating a level"
+            raise RuntimeError(err_msg)
+
+        lvl_idx = self.mapping_levels.index(level) if isinstance(level, str) else level
+        old_loops = self._level_loops[lvl_idx]
+        new_loops = self._create_level_loops(lvl_idx, factors, permutation)
+        self._level_loops[lvl_idx] = new_loops
+
+        # A pure permutation change keeps every dim size
+        changed_levels = set()
+        if sorted(old_loops) != sorted(new_loops):
+            changed_levels |= self._update_dim_sizes(lvl_idx)
+        changed_levels |= self._update_tile_iterations(lvl_idx + 1)
+        return self._update_latency(changed_levels)
+
+    @property
+    def result(self: Self) -> AnalyzeResult:
+        return AnalyzeResult.create(
+            tile_sizes=dict(zip(self.plan.levels, self._tile_sizes, strict=True)),
+            tile_iterations=dict(
+                zip(self.plan.levels, self._tile_iterations, strict=True)
+            ),
+            tile_accesses=dict(zip(self.plan.levels, self._tile_accesses, strict=True)),
+            tile_sharing={
+                level: self._tile_sharing[idx]
+                for idx, level in enumerate(self.mapping_levels)
+                if level.endswith("_spatial")
+            },
+            bypassed=self._bypassed,
+        )
+
+    def _set_kept(self: Self, kept: np.ndarray | None) -> None:
+        plan = self.plan
+        self._kept = None if kept is None else np.asarray(kept, dtype=bool)
+        self._bypassed = (
+            {}
+            if self._kept is None
+            else get_bypassed_dataspaces(self._kept, plan.levels, plan.dataspaces)
+        )
+        for link_idx, link in enumerate(plan.links):
+            routed = (
+                [True] * len(link.dataspace_idx)
+                if self._kept is None
+                else plan._route(link, self._kept[None])[0].tolist()
+            )
+            self._link_dataspaces[link_idx] = tuple(
+                plan.dataspaces[ds_idx]
+                for ds_idx, ds_routed in zip(link.dataspace_idx, routed, strict=True)
+                if ds_routed
+            )
+
+    def _create_level_loops(
+        self: Self,
+        lvl_idx: int,
+        factors: Iterable[int],
+        permutation: Iterable[str | int],
+    ) -> list[tuple[str, int, str | None]]:
+        split = len(self.dims) if self._splits is None else self._splits[lvl_idx]
+        spatial = self.mapping_levels[lvl_idx].endswith("_spatial")
+        return [
+            (
+                dim if isinstance(dim, str) else self.dims[dim],
+                int(factor),
+                SPATIAL_AXES[int(pos >= split)] if spatial else None,
+            )
+            for pos, (dim, factor) in enumerate(zip(permutation, factors, strict=True))
+            if factor > 1
+        ]
+
+    def _update_dim_sizes(self: Self, lvl_idx: int) -> set[int]:
+        # Dim sizes of a level are the product of the loops at or below it
+        for idx in range(lvl_idx, -1, -1):
+            lvl_dim_sizes = self._dim_sizes[idx + 1].copy()
+            for dim, factor, _ in self._level_loops[idx]:
+                lvl_dim_sizes[dim] *= factor
+            self._dim_sizes[idx] = lvl_dim_sizes
+            self._tile_sizes[idx] = self._calc_tile_sizes(lvl_dim_sizes)
+            level = self.mapping_levels[idx]
+            if level.endswith("_spatial"):
+                self._tile_sharing[idx] = calc_tile_sharing(
+                    (
+                        Loop(dim, factor, level, axis)
+                        for dim, factor, axis in self._level_loops[idx]
+                    ),
+                    self._related_dims,
+                )
+        return set(range(lvl_idx + 1))
+
+    def _calc_tile_sizes(self: Self, dim_sizes: dict[str, int]) -> dict[str, int]:
+        # Same tile models as the analyzers of the workload type
+        if self.workload_type == "MM":
+            return {
+                ds: prod(
+                    dim_sizes[dim] ** count
+                    for dim, count in zip(self.dims, ds_counts, strict=True)
+                )
+                for ds, ds_counts in zip(
+                    self.plan.dataspaces,
+                    self.plan.projection_counts.tolist(),
+                    strict=True,
+                )
+            }
+        return {
+            ds: calc_tile_size(axes, dim_sizes)
+            for ds, axes in self.plan.projection_coefficients.items()
+        }
+
+    def _update_tile_iterations(self: Self, lvl_idx: int) -> set[int]:
+        # Resume from the running products before the changed level
+        start_idx = max(lvl_idx - 1, 0)
+        cum_factor = self._cum_factors[start_idx]
+        iterations = self._tile_iterations[start_idx].copy()
+
+        num_levels = len(self.plan.levels)
+        for idx in range(start_idx, num_levels - 1):
+            cum_factor = self._replay_level(idx, cum_factor, iterations)
+            self._cum_factors[idx + 1] = cum_factor
+            self._tile_iterations[idx + 1] = iterations.copy()
+        return set(range(lvl_idx, num_levels))
+
+    def _replay_level(
+        self: Self, lvl_idx: int, cum_factor: int, iterations: dict[str, int]
+    ) -> int:
+        for dim, factor, _ in self._level_loops[lvl_idx]:
+            cum_factor *= factor
+            for ds, related_dims in self._related_dims.items():
+                if dim in related_dims:
+                    iterations[ds] = cum_factor
+        return cum_factor
+
+    def _update_latency(self: Self, changed_levels: set[int]) -> int:
+        for idx in changed_levels:
+            self._level_accesses[idx] = {
+                ds: tile_size * self._tile_iterations[idx][ds]
+                for ds, tile_size in self._tile_sizes[idx].items()
+            }
+        tile_accesses = self._level_accesses
+        if self._kept is not None:
+            # Bypassed accesses move to the levels above, wherever they changed
+            tile_accesses = self._forward_bypassed_accesses()
+            changed_levels = set(range(len(self.plan.levels)))
+        changed_levels = {
+            idx
+            for idx in changed_levels
+            if self._refresh_tile_accesses(idx, tile_accesses[idx])
+        }
+
+        for link_idx, link in enumerate(self.plan.links):
+            if link.level_idx not in changed_levels:
+                continue
+            tile_accesses = self._tile_accesses[link.level_idx]
+            tile_sharing = self._tile_sharing[link.level_idx]
+            latency = sum(
+                math.ceil(
+                    tile_accesses[ds]
+                    * prod(tile_sharing[ds][axis] for axis in link.replicated_axes)
+                    / link.bandwidth
+                )
+                for ds in self._link_dataspaces[link_idx]
+            )
+            delta = latency - self._link_latencies[link_idx]
+            self._link_latencies[link_idx] = latency
+            self.network_latencies[link.network] += delta
+
+        if self.pipeline is None:
+            self.latency = sum(self.network_latencies.values())
+        else:
+            self.latency = self.pipeline.evaluate_latency(
+                self.result, self.network_latencies
+            )
+        return self.latency
+
+    def _forward_bypassed_accesses(self: Self) -> list[dict[str, int]]:
+        dataspaces = self.plan.dataspaces
+        tile_accesses = forward_bypassed_accesses(
+            np.array([
+                [lvl_accesses[ds] for ds in dataspaces]
+                for lvl_accesses in self._level_accesses
+            ]),
+            self._kept,
+            self.plan.levels,
+        )
+        return [
+            dict(zip(dataspaces, row, strict=True)) for row in tile_accesses.tolist()
+        ]
+
+    def _refresh_tile_accesses(
+        self: Self, lvl_idx: int, tile_accesses: dict[str, int]
+    ) -> bool:
+        changed = (
+            tile_accesses != self._tile_accesses[lvl_idx]
+            or self._tile_sharing[lvl_idx] != self._link_sharing[lvl_idx]
+        )
+        self._tile_accesses[lvl_idx] = tile_accesses
+        self._link_sharing[lvl_idx] = self._tile_sharing[lvl_idx]
+        return changed
@@ -0,0 +1,4 @@
+from .branch_bound import BranchAndBound
+from .genetic import GeneticMapper, GeneticOptions
+from .mapspace import MapSpace
+from .search import Candidate, Mapper, SearchOptions
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import itertools
+import time
+from collections.abc import Generator
+from math import prod
+from typing import Self
+
+import numpy as np
+
+from analyzer.api import Evaluator
+from analyzer.mapper.factorization import get_divisors
+from analyzer.mapper.mapspace import MapSpace
+from analyzer.mapper.search import Candidate
+from analyzer.utils import get_logger
+
+logger = get_logger()
+
+
+class BranchAndBound:
+    def __init__(
+        self: Self,
+        evaluator: Evaluator,
+        *,
+        time_budget: float | None = None,
+        node_budget: int | None = None,
+    ) -> None:
+        self.evaluator = evaluator
+        self.mapspace = MapSpace.create(evaluator)
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+
+        self.best: Candidate | None = None
+        self.num_nodes = 0
+        self.num_pruned = 0
+
+    def run(self: Self) -> Candidate | None:
+        self._start_time = time.monotonic()
+        self._search([], [], dict(self.mapspace.dim_sizes))
+
+        msg = (
+            f"Branch and bound visited {self.num_nodes} nodes "
+            f"and pruned {self.num_pruned} subtrees"
+        )
+        logger.info(msg)
+        return self.best
+
+    def _search(
+        self: Self,
+        factors: list[tuple[int, ...]],
+        permutations: list[tuple[str, ...]],
+        remaining_sizes: dict[str, int],
+    ) -> None:
+        if len(factors) == len(self.mapspace.levels):
+            latency = self.evaluator.evaluate(factors, permutations)
+            if self.best is None or latency < self.best.latency:
+                self.best = Candidate(latency, tuple(factors), tuple(permutations))
+            return
+
+        # Visit the most promising children first to tighten the bound early
+        children = []
+        for lvl_factors, lvl_perm in self._iter_level_mappings(
+            len(factors), remaining_sizes
+        ):
+            bound = self.evaluator.lower_bound(
+                [*factors, lvl_factors], [*permutations, lvl_perm]
+            )
+            children.append((bound, lvl_factors, lvl_perm))
+        children.sort(key=lambda child: child[0])
+
+        for bound, lvl_factors, lvl_perm in children:
+            if self._should_stop():
+                return
+            if self.best is not None and bound >= self.best.latency:
+                self.num_pruned += 1
+                continue
+
+            self.num_nodes += 1
+            self._search(
+                [*factors, lvl_factors],
+                [*permutations, lvl_perm],
+                {
+                    dim: remaining_sizes[dim] // factor
+                    for dim, factor in zip(lvl_perm, lvl_factors, strict=True)
+                },
+            )
+
+    def _iter_level_mappings(
+        self: Self, lvl_idx: int, remaining_sizes: dict[str, int]
+    ) -> Generator[tuple[tuple[int, ...], tuple[str, ...]], None, None]:
+        dims = self.mapspace.dims
+        level = self.mapspace.levels[lvl_idx]
+        fanout = self.mapspace.fanouts.get(level)
+
+        # The innermost level takes whatever is left
+        if lvl_idx == len(self.mapspace.levels) - 1:
+            choices = [(remaining_sizes[dim],) for dim in dims]
+        else:
+            choices = [get_divisors(remaining_sizes[dim]) for dim in dims]
+
+        for combination in itertools.product(*choices):
+            if fanout is not None and prod(combination) > fanout:
+                continue
+
+            # One loop order per class of equivalent orders
+            for perm_idx in self.mapspace.level_permutations(np.array(combination)):
+                lvl_perm = self.mapspace.permutation_table[perm_idx]
+                yield (
+                    tuple(combination[dim] for dim in lvl_perm),
+                    tuple(dims[dim] for dim in lvl_perm),
+                )
+
+    def _should_stop(self: Self) -> bool:
+        if self.node_budget is not None and self.num_nodes >= self.node_budget:
+            return True
+        return (
+            self.time_budget is not None
+            and time.monotonic() - self._start_time >= self.time_budget
+        )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections.abc import Generator, Iterable
+from functools import cache
+from typing import Self
+
+
+@cache
+def get_prime_factors(n: int) -> tuple[tuple[int, int], ...]:
+    # (prime, exponent) pairs of `n` in increasing order
+    if n <= 0:
+        err_msg = "Only positive integers can be factorized"
+        raise ValueError(err_msg)
+
+    prime_factors = []
+    prime = 2
+    while prime * prime <= n:
+        exponent = 0
+        while n % prime == 0:
+            n //= prime
+            exponent += 1
+        if exponent:
+            prime_factors.append((prime, exponent))
+        prime += 1
+    if n > 1:
+        prime_factors.append((n, 1))
+    return tuple(prime_factors)
+
+
+@cache
+def get_divisors(n: int) -> tuple[int, ...]:
+    # Built from the prime factors instead of testing every integer up to `n`
+    divisors = [1]
+    for prime, exponent in get_prime_factors(n):
+        divisors = [
+            divisor * prime**power
+            for divisor in divisors
+            for power in range(exponent + 1)
+        ]
+    return tuple(sorted(divisors))
+
+
+class FactorizationIndex:
+    """Ordered factorizations of `size` over levels with optional caps.
+
+    Factorizations are ordered lexicographically, outer level first. A table
+    counting the factorizations of each divisor over the inner levels gives
+    the size of the space and random access by index without enumerating it.
+    """
+
+    def __init__(self: Self, size: int, caps: Iterable[int | None]) -> None:
+        self.size = size
+        self.caps = tuple(caps)
+        self.divisors = get_divisors(size)
+        self._divisor_idx = {divisor: idx for idx, divisor in enumerate(self.divisors)}
+
+        # _counts[l][j]: factorizations of `divisors[j]` over levels l and below
+        num_levels = len(self.caps)
+        self._counts = [[0] * len(self.divisors) for _ in range(num_levels + 1)]
+        self._counts[num_levels][0] = 1
+        for lvl_idx in reversed(range(num_levels)):
+            inner_counts = self._counts[lvl_idx + 1]
+            for div_idx, divisor in enumerate(self.divisors):
+                self._counts[lvl_idx][div_idx] = sum(
+                    inner_counts[self._divisor_idx[divisor // factor]]
+                    for factor in self._iter_level_factors(lvl_idx, divisor)
+                )
+
+    @property
+    def count(self: Self) -> int:
+        # May not fit in an index sized integer, unlike `len`
+        return self._counts[0][-1]
+
+    def __len__(self: Self) -> int:
+        return self.count
+
+    def __getitem__(self: Self, index: int) -> tuple[int, ...]:
+        if not 0 <= index < self.count:
+            err_msg = f"Factorization index {index} out of range"
+            raise IndexError(err_msg)
+
+        factors = []
+        remaining = self.size
+        for lvl_idx in range(len(self.caps)):
+            inner_counts = self._counts[lvl_idx + 1]
+            for factor in self._iter_level_factors(lvl_idx, remaining):
+                count = inner_counts[self._divisor_idx[remaining // factor]]
+                if index < count:
+                    break
+                index -= count
+            factors.append(factor)
+            remaining //= factor
+        return tuple(factors)
+
+    def __iter__(self: Self) -> Generator[tuple[int, ...], None, None]:
+        yield from self._iter_from(0, self.size)
+
+    def rank(self: Self, factors: Iterable[int]) -> int:
+        # Inverse of indexing
+        index = 0
+        remaining = self.size
+        for lvl_idx, lvl_factor in enumerate(factors):
+            inner_counts = self._counts[lvl_idx + 1]
+            for factor in self._iter_level_factors(lvl_idx, remaining):
+                if factor == lvl_factor:
+                    break
+                index += inner_counts[self._divisor_idx[remaining // factor]]
+            else:
+                err_msg = f"Factor {lvl_factor} not allowed at level {lvl_idx}"
+                raise ValueError(err_msg)
+            remaining //= lvl_factor
+
+        if remaining != 1:
+            err_msg = f"Factors do not multiply to {self.size}"
+            raise ValueError(err_msg)
+        return index
+
+    def _iter_from(
+        self: Self, lvl_idx: int, remaining: int
+    ) -> Generator[tuple[int, ...], None, None]:
+        if lvl_idx == len(self.caps):
+            yield ()
+            return
+
+        inner_counts = self._counts[lvl_idx + 1]
+        for factor in self._iter_level_factors(lvl_idx, remaining):
+            # Skip factors whose remainder cannot be split over the inner levels
+            if inner_counts[self._divisor_idx[remaining // factor]]:
+                for rest in self._iter_from(lvl_idx + 1, remaining // factor):
+                    yield (factor, *rest)
+
+    def _iter_level_factors(
+        self: Self, lvl_idx: int, remaining: int
+    ) -> Generator[int, None, None]:
+        # Divisors of `remaining` allowed at the level, in increasing order
+        cap = self.caps[lvl_idx]
+        for factor in self.divisors:
+            if factor > remaining or (cap is not None and factor > cap):
+                return
+            if remaining % factor == 0:
+                yield factor
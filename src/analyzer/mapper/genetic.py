@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Generator
+from typing import Self
+
+import numpy as np
+from attr import frozen
+
+from analyzer.api import Evaluator
+from analyzer.mapper.factorization import get_prime_factors
+from analyzer.mapper.mapspace import MapSpace
+from analyzer.mapper.search import Candidate, SearchOptions
+from analyzer.utils import get_logger
+
+logger = get_logger()
+
+# Fitness of mappings whose tiles overflow a buffer
+REJECTED = np.iinfo(np.int64).max
+
+
+@frozen
+class GeneticOptions(SearchOptions):
+    """Options of a genetic search, on top of those of a mapspace search.
+
+    A generation is evaluated in batches of `chunk_size` mappings and the
+    victory condition counts the candidates evaluated without improving the
+    top-k. Persistent caches are not supported.
+    """
+
+    population_size: int = 256
+    num_generations: int = 100
+    num_elites: int = 8
+    tournament_size: int = 4
+    mutation_rate: float = 0.5
+    seed: int | None = None
+
+
+class GeneticMapper:
+    """Population based search with the fitness of a generation in one batch.
+
+    Individuals are dim-indexed factors and loop orders of every level, as in
+    `Evaluator.evaluate_batch`. Children are made by crossover of two
+    tournament winners, then mutated by moving a prime factor of a dim to an
+    adjacent level and by swapping two loops of a level. The best individuals
+    survive unchanged. Runs with the same seed are identical.
+    """
+
+    def __init__(
+        self: Self, evaluator: Evaluator, options: GeneticOptions | None = None
+    ) -> None:
+        options = GeneticOptions() if options is None else options
+        if options.population_size <= options.num_elites:
+            err_msg = "Population size must be larger than the number of elites"
+            raise ValueError(err_msg)
+        if options.cache is not None:
+            err_msg = "Persistent cache not supported by the genetic mapper"
+            raise NotImplementedError(err_msg)
+
+        self.evaluator = evaluator
+        self.mapspace = MapSpace.create(evaluator)
+        self.options = options
+        self.rng = np.random.default_rng(options.seed)
+
+        self.num_generations_run = 0
+        self.num_evaluated = 0
+        self.num_rejected = 0
+        self._best: dict[tuple[bytes, bytes], tuple[int, np.ndarray, np.ndarray]] = {}
+
+    def run(self: Self) -> list[Candidate]:
+        for _ in self.search():
+            pass
+        return self.best
+
+    @property
+    def best(self: Self) -> list[Candidate]:
+        return sorted(
+            Candidate(latency, *self.mapspace.to_mapping(factors, permutations))
+            for latency, factors, permutations in self._best.values()
+        )
+
+    def search(self: Self) -> Generator[list[Candidate], None, None]:
+        # Yield the current top-k every time it changes
+        start_time = time.monotonic()
+        stale = 0
+        sink = self.options.sink
+
+        try:
+            factors, permutations = self._init_population()
+            fitness = self._evaluate(factors, permutations)
+            if self._update(factors, permutations, fitness):
+                yield self.best
+
+            for _ in range(self.options.num_generations):
+                if self._should_stop(start_time, stale):
+                    break
+                factors, permutations = self._next_generation(
+                    factors, permutations, fitness
+                )
+                num_evaluated = self.num_evaluated
+                fitness = self._evaluate(factors, permutations)
+                self.num_generations_run += 1
+
+                improved = self._update(factors, permutations, fitness)
+                stale = 0 if improved else stale + self.num_evaluated - num_evaluated
+                if improved:
+                    yield self.best
+        finally:
+            if sink is not None:
+                sink.flush()
+
+        msg = (
+            f"Search finished after {self.num_generations_run} generations, "
+            f"{self.num_evaluated} candidates, {self.num_rejected} rejected"
+        )
+        logger.info(msg)
+
+    def _init_population(self: Self) -> tuple[np.ndarray, np.ndarray]:
+        # Uniform legal factorizations and loop orders
+        num_levels, num_dims = len(self.mapspace.levels), len(self.mapspace.dims)
+        factors = np.stack([
+            self.mapspace.sample_factors(self.rng)
+            for _ in range(self.options.population_size)
+        ])
+        permutations = np.argsort(
+            self.rng.random((self.options.population_size, num_levels, num_dims)),
+            axis=-1,
+        )
+        return factors, permutations
+
+    def _evaluate(
+        self: Self, factors: np.ndarray, permutations: np.ndarray
+    ) -> np.ndarray:
+        # Rejected mappings are not evaluated and get the worst fitness
+        options = self.options
+        accepted = np.ones(len(factors), dtype=bool)
+        if options.min_utilization > 0:
+            _, utilization = self.evaluator.plan.evaluate_compute_batch(factors)
+            accepted &= utilization >= options.min_utilization
+        if options.check_capacity:
+            accepted &= self.evaluator.check_capacity_batch(factors) == 0
+        self.num_rejected += int(np.count_nonzero(~accepted))
+
+        fitness = np.full(len(factors), REJECTED, dtype=np.int64)
+        accepted_idx = np.flatnonzero(accepted)
+        for start in range(0, len(accepted_idx), options.chunk_size):
+            chunk_idx = accepted_idx[start : start + options.chunk_size]
+            chunk_factors, chunk_permutations = (
+                factors[chunk_idx],
+                permutations[chunk_idx],
+            )
+            tile_analyze_result = self.evaluator.analyze_batch(
+                chunk_factors, chunk_permutations
+            )
+            results = self.evaluator.evaluate_analysis_batch(
+                tile_analyze_result, chunk_factors
+            )
+            fitness[chunk_idx] = results["latency"]
+            if options.sink is not None:
+                options.sink.write_batch(
+                    chunk_factors,
+                    chunk_permutations,
+                    results,
+                    tile_analyze_result.tile_accesses,
+                )
+        self.num_evaluated += len(accepted_idx)
+        return fitness
+
+    def _next_generation(
+        self: Self, factors: np.ndarray, permutations: np.ndarray, fitness: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(fitness, kind="stable")
+        next_factors = np.empty_like(factors)
+        next_permutations = np.empty_like(permutations)
+        num_elites = self.options.num_elites
+        next_factors[:num_elites] = factors[order[:num_elites]]
+        next_permutations[:num_elites] = permutations[order[:num_elites]]
+
+        for n in range(num_elites, self.options.population_size):
+            first, second = self._select(fitness), self._select(fitness)
+            child_factors, child_permutations = self._crossover(
+                factors[first],
+                permutations[first],
+                factors[second],
+                permutations[second],
+            )
+            if self.rng.random() < self.options.mutation_rate:
+                self._mutate_factors(child_factors)
+            if self.rng.random() < self.options.mutation_rate:
+                self._mutate_permutation(child_permutations)
+            next_factors[n] = child_factors
+            next_permutations[n] = child_permutations
+        return next_factors, next_permutations
+
+    def _select(self: Self, fitness: np.ndarray) -> int:
+        # Tournament selection
+        contenders = self.rng.integers(len(fitness), size=self.options.tournament_size)
+        return int(contenders[np.argmin(fitness[contenders])])
+
+    def _crossover(
+        self: Self,
+        first_factors: np.ndarray,
+        first_permutations: np.ndarray,
+        second_factors: np.ndarray,
+        second_permutations: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Whole dims keep their product, a child over the fan-out of a spatial
+        # level keeps the first parent's factors
+        num_levels, num_dims = first_factors.shape
+        from_second = self.rng.integers(2, size=num_dims).astype(bool)
+        factors = np.where(from_second[None], second_factors, first_factors)
+        if not self.mapspace.is_legal(factors):
+            factors = first_factors.copy()
+
+        from_second = self.rng.integers(2, size=num_levels).astype(bool)
+        permutations = np.where(
+            from_second[:, None], second_permutations, first_permutations
+        )
+        return factors, permutations
+
+    def _mutate_factors(self: Self, factors: np.ndarray) -> None:
+        # Move a prime factor of one dim to an adjacent level, in place
+        num_levels = factors.shape[0]
+        dim_idx = self.rng.integers(factors.shape[1])
+        sources = np.flatnonzero(factors[:, dim_idx] > 1)
+        if not len(sources):
+            return
+
+        src = int(self.rng.choice(sources))
+        dst = src + int(self.rng.choice((-1, 1)))
+        if not 0 <= dst < num_levels:
+            dst = 2 * src - dst
+
+        # Primes are drawn with their multiplicity
+        primes = [
+            prime
+            for prime, exponent in get_prime_factors(int(factors[src, dim_idx]))
+            for _ in range(exponent)
+        ]
+        prime = int(self.rng.choice(primes))
+        factors[src, dim_idx] //= prime
+        factors[dst, dim_idx] *= prime
+        if not self.mapspace.is_legal(factors):
+            factors[src, dim_idx] *= prime
+            factors[dst, dim_idx] //= prime
+
+    def _mutate_permutation(self: Self, permutations: np.ndarray) -> None:
+        # Swap two loops of one level, in place
+        lvl_idx = self.rng.integers(permutations.shape[0])
+        first, second = self.rng.choice(permutations.shape[1], 2, replace=False)
+        permutations[lvl_idx, [first, second]] = permutations[lvl_idx, [second, first]]
+
+    def _update(
+        self: Self, factors: np.ndarray, permutations: np.ndarray, fitness: np.ndarray
+    ) -> bool:
+        improved = False
+        worst = max((entry[0] for entry in self._best.values()), default=None)
+        top_k = self.options.top_k
+        for idx in np.argsort(fitness, kind="stable")[:top_k]:
+            latency = int(fitness[idx])
+            key = (factors[idx].tobytes(), permutations[idx].tobytes())
+            if key in self._best or latency == REJECTED:
+                continue
+            if len(self._best) >= top_k and latency >= worst:
+                break
+
+            self._best[key] = (latency, factors[idx].copy(), permutations[idx].copy())
+            if len(self._best) > top_k:
+                del self._best[max(self._best, key=lambda k: self._best[k][0])]
+            worst = max(entry[0] for entry in self._best.values())
+            improved = True
+        return improved
+
+    def _should_stop(self: Self, start_time: float, stale: int) -> bool:
+        options = self.options
+        if options.victory_condition is not None and stale >= options.victory_condition:
+            return True
+        if (
+            options.candidate_budget is not None
+            and self.num_evaluated >= options.candidate_budget
+        ):
+            return True
+        return (
+            options.time_budget is not None
+            and time.monotonic() - start_time >= options.time_budget
+        )
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+from collections.abc import Generator, Iterable
+from math import factorial, prod
+from typing import Self
+
+import numpy as np
+from attr import frozen
+
+from analyzer.api import Evaluator
+from analyzer.mapper.factorization import FactorizationIndex, get_divisors
+
+
+@frozen
+class FactorGroup:
+    # Factorizations of a dim with the same factors on the spatial levels,
+    # ranked by their factors on the other levels
+    spatial_factors: tuple[int, ...]
+    temporal_index: FactorizationIndex
+
+
+class MapSpace:
+    """Legal factors of every dim over the mapping levels, and loop orders.
+
+    The factorizations of a dim are grouped by their spatial factors, the
+    only ones constrained across dims (by the fan-outs), and each group is a
+    `FactorizationIndex` over the temporal levels. Legal factors of all dims
+    are ranked dim by dim, group first, with counts of the legal completions
+    given the PEs used, so they are counted, indexed and sharded by index
+    ranges without enumerating the space.
+    """
+
+    def __init__(
+        self: Self,
+        levels: tuple[str, ...],
+        dims: tuple[str, ...],
+        dim_sizes: dict[str, int],
+        fanouts: dict[str, int],
+        related: np.ndarray | None = None,
+    ) -> None:
+        self.levels = levels
+        self.dims = dims
+        self.dim_sizes = dim_sizes
+        self.fanouts = fanouts
+        # Indexed by (dataspace, dim), without it every loop order of the
+        # non-unit loops is kept
+        self.related = np.eye(len(dims), dtype=bool) if related is None else related
+
+        # All loop orders of a single level, outer to inner
+        self.permutation_table = np.array(
+            list(itertools.permutations(range(len(dims)))), dtype=np.intp
+        ).reshape(-1, len(dims))
+
+        self._spatial_idx = [
+            idx for idx, level in enumerate(levels) if level in fanouts
+        ]
+        self._temporal_idx = [
+            idx for idx, level in enumerate(levels) if level not in fanouts
+        ]
+        self._spatial_fanouts = tuple(fanouts[levels[idx]] for idx in self._spatial_idx)
+        self._dim_groups = [self._create_groups(dim_sizes[dim]) for dim in dims]
+        self._cumulative_counts: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        self._level_permutations: dict[tuple[bool, ...], np.ndarray] = {}
+
+    @classmethod
+    def create(cls: type[MapSpace], evaluator: Evaluator) -> MapSpace:
+        return cls(
+            levels=evaluator.levels,
+            dims=evaluator.dims,
+            dim_sizes=evaluator.workload.operation_dimension_size,
+            fanouts={
+                level: evaluator.dataflow[level].num_x * evaluator.dataflow[level].num_y
+                for level in evaluator.levels
+                if level.endswith("_spatial")
+            },
+            related=evaluator.plan.projection_counts > 0,
+        )
+
+    @property
+    def num_level_permutations(self: Self) -> int:
+        return factorial(len(self.dims))
+
+    @property
+    def num_permutations(self: Self) -> int:
+        return self.num_level_permutations ** len(self.levels)
+
+    @property
+    def num_factors(self: Self) -> int:
+        # Legal factors of all dims, counted without enumerating them
+        return self._count_factors(0, (1,) * len(self._spatial_idx))
+
+    def iter_factors(
+        self: Self, start: int = 0, stop: int | None = None
+    ) -> Generator[np.ndarray, None, None]:
+        # Legal factors in index order, a range of indices is a shard
+        stop = self.num_factors if stop is None else min(stop, self.num_factors)
+        for columns in self._iter_columns(
+            0, (1,) * len(self._spatial_idx), start, stop
+        ):
+            yield np.array(columns, dtype=np.int64).T
+
+    def get_factors(self: Self, index: int) -> np.ndarray:
+        # The `index`-th legal factors yielded by `iter_factors`
+        if not 0 <= index < self.num_factors:
+            err_msg = f"Factors index {index} out of range"
+            raise IndexError(err_msg)
+
+        used = (1,) * len(self._spatial_idx)
+        columns = []
+        for dim_idx, groups in enumerate(self._dim_groups):
+            cumulative_counts = self._get_cumulative_counts(dim_idx, used)
+            group_idx = bisect.bisect_right(cumulative_counts, index)
+            if group_idx:
+                index -= cumulative_counts[group_idx - 1]
+            group = groups[group_idx]
+            used = self._add_spatial_factors(used, group.spatial_factors)
+            temporal_idx, index = divmod(index, self._count_factors(dim_idx + 1, used))
+            columns.append(self._get_dim_factors(group, temporal_idx))
+        return np.array(columns, dtype=np.int64).T
+
+    def sample_factors(self: Self, rng: np.random.Generator) -> np.ndarray:
+        # Uniform over the legal factors, whatever the size of the space
+        num_factors = self.num_factors
+        num_bits = num_factors.bit_length()
+        while True:
+            index = int.from_bytes(rng.bytes((num_bits + 7) // 8)) >> (-num_bits % 8)
+            if index < num_factors:
+                return self.get_factors(index)
+
+    def level_permutations(self: Self, lvl_factors: np.ndarray) -> np.ndarray:
+        # Indices into `permutation_table` of one loop order per class of
+        # equivalent orders. The order of a level only changes the tile
+        # iterations, which for each dataspace are the product of the loops
+        # up to its last related loop, so orders with the same set of loops
+        # up to there for every dataspace are equivalent
+        nonunit = tuple(bool(factor > 1) for factor in lvl_factors)
+        if nonunit not in self._level_permutations:
+            table = self.permutation_table
+            kept = np.array(nonunit)[table]
+            related = self.related[:, table] & kept
+            positions = np.arange(len(self.dims))
+            last_related = np.where(related, positions, -1).max(axis=-1)
+            prefix = (positions <= last_related[..., None]) & kept
+            prefix_dims = (prefix * (1 << table)).sum(axis=-1)
+            _, first_idx = np.unique(prefix_dims.T, axis=0, return_index=True)
+            self._level_permutations[nonunit] = np.sort(first_idx)
+        return self._level_permutations[nonunit]
+
+    def count_permutations(self: Self, factors: np.ndarray) -> int:
+        # Loop orders of distinct tile iterations for the given factors
+        return prod(
+            len(self.level_permutations(lvl_factors)) for lvl_factors in factors
+        )
+
+    def is_legal(self: Self, factors: np.ndarray) -> bool:
+        return all(
+            prod(factors[lvl_idx]) <= self.fanouts[level]
+            for lvl_idx, level in enumerate(self.levels)
+            if level in self.fanouts
+        )
+
+    def decode_permutations(
+        self: Self, level_perm_indices: Iterable[Iterable[int]]
+    ) -> np.ndarray:
+        # (n, levels) indices into `permutation_table` to (n, levels, dims)
+        return self.permutation_table[np.asarray(level_perm_indices, dtype=np.intp)]
+
+    def to_mapping(
+        self: Self, factors: np.ndarray, permutations: np.ndarray
+    ) -> tuple[tuple[tuple[int, ...], ...], tuple[tuple[str, ...], ...]]:
+        # Convert dim-indexed arrays to the `Evaluator.evaluate` convention
+        return (
+            tuple(
+                tuple(int(factors[lvl_idx, dim]) for dim in lvl_perm)
+                for lvl_idx, lvl_perm in enumerate(permutations)
+            ),
+            tuple(
+                tuple(self.dims[dim] for dim in lvl_perm) for lvl_perm in permutations
+            ),
+        )
+
+    def _add_spatial_factors(
+        self: Self, used: tuple[int, ...], spatial_factors: tuple[int, ...]
+    ) -> tuple[int, ...] | None:
+        # PEs used on each spatial level, None once a fan-out is exceeded
+        used = tuple(u * f for u, f in zip(used, spatial_factors, strict=True))
+        if any(
+            u > fanout for u, fanout in zip(used, self._spatial_fanouts, strict=True)
+        ):
+            return None
+        return used
+
+    def _create_groups(self: Self, size: int) -> list[FactorGroup]:
+        # Spatial factors within the fan-outs, each with the index of the
+        # factorizations of what is left over the temporal levels
+        temporal_caps = [None] * len(self._temporal_idx)
+        temporal_indices: dict[int, FactorizationIndex] = {}
+        groups = []
+        for spatial_factors in itertools.product(
+            *(
+                [factor for factor in get_divisors(size) if factor <= fanout]
+                for fanout in self._spatial_fanouts
+            )
+        ):
+            spatial_size = prod(spatial_factors)
+            if size % spatial_size:
+                continue
+            remaining = size // spatial_size
+            if remaining not in temporal_indices:
+                temporal_indices[remaining] = FactorizationIndex(
+                    remaining, temporal_caps
+                )
+            groups.append(FactorGroup(spatial_factors, temporal_indices[remaining]))
+        return groups
+
+    def _get_dim_factors(
+        self: Self, group: FactorGroup, temporal_idx: int
+    ) -> list[int]:
+        # Factors of a dim on every level
+        factors = [1] * len(self.levels)
+        for idx, factor in zip(self._spatial_idx, group.spatial_factors, strict=True):
+            factors[idx] = factor
+        for idx, factor in zip(
+            self._temporal_idx, group.temporal_index[temporal_idx], strict=True
+        ):
+            factors[idx] = factor
+        return factors
+
+    def _iter_columns(
+        self: Self, dim_idx: int, used: tuple[int, ...], start: int, stop: int
+    ) -> Generator[tuple[list[int], ...], None, None]:
+        # Factors of the dims from `dim_idx` on, for the indices in
+        # [start, stop) of their legal completions
+        if dim_idx == len(self.dims):
+            yield ()
+            return
+
+        offset = 0
+        for group in self._dim_groups[dim_idx]:
+            if offset >= stop:
+                return
+            inner_used = self._add_spatial_factors(used, group.spatial_factors)
+            if inner_used is None:
+                continue
+            num_completions = self._count_factors(dim_idx + 1, inner_used)
+            group_size = group.temporal_index.count * num_completions
+            if offset + group_size > start and num_completions:
+                first = max(start - offset, 0)
+                last = min(stop - offset, group_size)
+                for temporal_idx in range(
+                    first // num_completions, -(-last // num_completions)
+                ):
+                    dim_factors = self._get_dim_factors(group, temporal_idx)
+                    base = temporal_idx * num_completions
+                    for inner_columns in self._iter_columns(
+                        dim_idx + 1,
+                        inner_used,
+                        max(first - base, 0),
+                        min(last - base, num_completions),
+                    ):
+                        yield (dim_factors, *inner_columns)
+            offset += group_size
+
+    def _count_factors(self: Self, dim_idx: int, used: tuple[int, ...]) -> int:
+        if dim_idx == len(self.dims):
+            return 1
+        cumulative_counts = self._get_cumulative_counts(dim_idx, used)
+        return cumulative_counts[-1] if cumulative_counts else 0
+
+    def _get_cumulative_counts(
+        self: Self, dim_idx: int, used: tuple[int, ...]
+    ) -> list[int]:
+        # Legal completions up to each group of the dim, given the PEs used by
+        # the outer dims
+        if (dim_idx, used) in self._cumulative_counts:
+            return self._cumulative_counts[dim_idx, used]
+
+        counts = []
+        for group in self._dim_groups[dim_idx]:
+            inner_used = self._add_spatial_factors(used, group.spatial_factors)
+            counts.append(
+                0
+                if inner_used is None
+                else group.temporal_index.count
+                * self._count_factors(dim_idx + 1, inner_used)
+            )
+        cumulative_counts = list(itertools.accumulate(counts))
+        self._cumulative_counts[dim_idx, used] = cumulative_counts
+        return cumulative_counts
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import time
+from collections.abc import Generator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from math import prod
+from typing import Self
+
+import numpy as np
+from attr import evolve, frozen
+
+from analyzer.api import Evaluator
+from analyzer.cache import PersistentCache
+from analyzer.mapper.mapspace import MapSpace
+from analyzer.sink import ResultWriter
+from analyzer.utils import get_logger
+
+logger = get_logger()
+
+# Factors sampled to size the ranges of factor indices given to workers
+NUM_RANGE_SAMPLES = 64
+
+_worker_evaluator: Evaluator | None = None
+_worker_mapspace: MapSpace | None = None
+_worker_options: SearchOptions | None = None
+
+
+@frozen(order=True)
+class Candidate:
+    latency: int
+    factors: tuple[tuple[int, ...], ...]
+    permutations: tuple[tuple[str, ...], ...]
+
+
+@frozen
+class BlockResult:
+    num_evaluated: int
+    candidates: list[Candidate]
+    num_rejected: int = 0
+    # Every evaluated mapping as (factors, permutations, latencies, accesses)
+    records: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray | None] | None = None
+
+
+@frozen
+class SearchOptions:
+    """Options of a mapspace search.
+
+    The victory condition is the number of candidates evaluated without
+    improving the top-k. Mappings under `min_utilization` or, with
+    `check_capacity`, overflowing a buffer are rejected unevaluated.
+    """
+
+    top_k: int = 10
+    # Mappings evaluated in one batch
+    chunk_size: int = 4096
+    victory_condition: int | None = None
+    time_budget: float | None = None
+    candidate_budget: int | None = None
+    min_utilization: float = 0.0
+    check_capacity: bool = False
+    sink: ResultWriter | None = None
+    cache: PersistentCache | None = None
+
+
+class Mapper:
+    def __init__(
+        self: Self,
+        evaluator: Evaluator,
+        options: SearchOptions | None = None,
+        *,
+        num_workers: int | None = None,
+    ) -> None:
+        self.evaluator = evaluator
+        self.mapspace = MapSpace.create(evaluator)
+        self.options = SearchOptions() if options is None else options
+        self.num_workers = (os.cpu_count() or 1) if num_workers is None else num_workers
+
+        self.num_evaluated = 0
+        self.num_rejected = 0
+        self._best: list[tuple[int, int, Candidate]] = []
+        self._counter = itertools.count()
+
+    def run(self: Self) -> list[Candidate]:
+        for _ in self.search():
+            pass
+        return self.best
+
+    @property
+    def best(self: Self) -> list[Candidate]:
+        return sorted(candidate for _, _, candidate in self._best)
+
+    def search(self: Self) -> Generator[list[Candidate], None, None]:
+        # Yield the current top-k every time it changes
+        start_time = time.monotonic()
+        stale = 0
+        sink, cache = self.options.sink, self.options.cache
+
+        # Start from the best mappings of past runs, a finished search of the
+        # same configuration is not repeated
+        if cache is not None:
+            config = self.evaluator.config_hash
+            cached = BlockResult(
+                num_evaluated=0,
+                candidates=[
+                    Candidate(*mapping)
+                    for mapping in cache.get_mappings(config, self.options.top_k)
+                ],
+            )
+            if self._update(cached):
+                yield self.best
+            if cache.is_complete(config, self._cache_options):
+                logger.info("Search results loaded from cache")
+                return
+
+        complete = False
+        results = self._iter_results()
+        try:
+            for result in results:
+                improved = self._update(result)
+                if sink is not None and result.records is not None:
+                    sink.write_batch(*result.records)
+                stale = 0 if improved else stale + result.num_evaluated
+                if improved:
+                    yield self.best
+                if self._should_stop(start_time, stale):
+                    break
+            else:
+                complete = True
+        finally:
+            results.close()
+            if sink is not None:
+                sink.flush()
+
+        if cache is not None:
+            self._save_cache(complete=complete)
+
+        msg = (
+            f"Search finished after {self.num_evaluated} candidates, "
+            f"{self.num_rejected} factorizations rejected"
+        )
+        logger.info(msg)
+
+    def _iter_results(self: Self) -> Generator[BlockResult, None, None]:
+        # Workers enumerate their own ranges of factor indices, the parent
+        # only hands out the bounds
+        ranges = self._iter_ranges()
+        sink = self.options.sink
+        record = sink is not None
+        record_accesses = sink is not None and sink.tile_accesses
+        # The sink and cache stay in this process
+        initargs = (self.evaluator, evolve(self.options, sink=None, cache=None))
+
+        if self.num_workers == 0:
+            _init_worker(*initargs)
+            for start, stop in ranges:
+                yield _evaluate_range(start, stop, record, record_accesses)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as executor:
+            pending: set[Future[BlockResult]] = set()
+            try:
+                while True:
+                    pending |= {
+                        executor.submit(
+                            _evaluate_range, start, stop, record, record_accesses
+                        )
+                        for start, stop in itertools.islice(
+                            ranges, 2 * self.num_workers - len(pending)
+                        )
+                    }
+                    if not pending:
+                        break
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _iter_ranges(self: Self) -> Generator[tuple[int, int], None, None]:
+        # Ranges of factor indices holding about `chunk_size` mappings, sized
+        # from the loop orders of evenly spaced factors
+        num_factors = self.mapspace.num_factors
+        if not num_factors:
+            return
+
+        num_samples = min(num_factors, NUM_RANGE_SAMPLES)
+        num_permutations = sum(
+            self.mapspace.count_permutations(
+                self.mapspace.get_factors(idx * num_factors // num_samples)
+            )
+            for idx in range(num_samples)
+        )
+        step = max(1, self.options.chunk_size * num_samples // num_permutations)
+        for start in range(0, num_factors, step):
+            yield start, min(start + step, num_factors)
+
+    @property
+    def _cache_options(self: Self) -> str:
+        # Options changing which mappings a finished search returns
+        return json.dumps({
+            "top_k": self.options.top_k,
+            "min_utilization": self.options.min_utilization,
+            "check_capacity": self.options.check_capacity,
+        })
+
+    def _save_cache(self: Self, *, complete: bool) -> None:
+        cache = self.options.cache
+        assert cache is not None
+        config = self.evaluator.config_hash
+        cache.put_mappings(
+            config,
+            (
+                (
+                    self.evaluator.canonical_key(
+                        candidate.factors, candidate.permutations
+                    ),
+                    candidate.latency,
+                    candidate.factors,
+                    candidate.permutations,
+                )
+                for candidate in self.best
+            ),
+        )
+        if complete:
+            cache.set_complete(config, self._cache_options)
+
+    def _update(self: Self, result: BlockResult) -> bool:
+        self.num_evaluated += result.num_evaluated
+        self.num_rejected += result.num_rejected
+
+        improved = False
+        for candidate in result.candidates:
+            # Cached mappings are found again by the search
+            if any(candidate == best for _, _, best in self._best):
+                continue
+            entry = (-candidate.latency, next(self._counter), candidate)
+            if len(self._best) < self.options.top_k:
+                heapq.heappush(self._best, entry)
+                improved = True
+            elif candidate.latency < -self._best[0][0]:
+                heapq.heapreplace(self._best, entry)
+                improved = True
+        return improved
+
+    def _should_stop(self: Self, start_time: float, stale: int) -> bool:
+        options = self.options
+        if options.victory_condition is not None and stale >= options.victory_condition:
+            return True
+        if (
+            options.candidate_budget is not None
+            and self.num_evaluated >= options.candidate_budget
+        ):
+            return True
+        return (
+            options.time_budget is not None
+            and time.monotonic() - start_time >= options.time_budget
+        )
+
+
+def _init_worker(evaluator: Evaluator, options: SearchOptions) -> None:
+    global _worker_evaluator, _worker_mapspace, _worker_options  # noqa: PLW0603
+    _worker_evaluator = evaluator
+    _worker_mapspace = MapSpace.create(evaluator)
+    _worker_options = options
+
+
+def _evaluate_range(
+    start: int, stop: int, record: bool = False, record_accesses: bool = False
+) -> BlockResult:
+    # Every distinct loop order of the factors in `[start, stop)`, evaluated
+    # in batches of about `chunk_size` mappings
+    assert _worker_mapspace is not None and _worker_options is not None
+    mapspace = _worker_mapspace
+    top_k, chunk_size = _worker_options.top_k, _worker_options.chunk_size
+
+    # Utilization and tile sizes only depend on the factors, so a rejected
+    # factorization skips all its loop orders
+    range_factors = np.stack(list(mapspace.iter_factors(start, stop)))
+    accepted = _accept(range_factors)
+    num_rejected = len(accepted) - int(accepted.sum())
+
+    results: list[BlockResult] = []
+    block: list[tuple[np.ndarray, tuple[int, ...]]] = []
+    block_size = 0
+    for factors in range_factors[accepted]:
+        # Each item enumerates every loop order of the innermost levels
+        level_perms = [
+            mapspace.level_permutations(lvl_factors) for lvl_factors in factors
+        ]
+        num_outer_levels = 0
+        num_inner = prod(len(perms) for perms in level_perms)
+        while num_inner > chunk_size and num_outer_levels < len(factors) - 1:
+            num_inner //= len(level_perms[num_outer_levels])
+            num_outer_levels += 1
+
+        for outer in itertools.product(*level_perms[:num_outer_levels]):
+            block.append((factors, tuple(int(idx) for idx in outer)))
+            block_size += num_inner
+            if block_size >= chunk_size:
+                results.append(_evaluate_block(block, top_k, record, record_accesses))
+                block, block_size = [], 0
+    if block:
+        results.append(_evaluate_block(block, top_k, record, record_accesses))
+
+    records = None
+    if record and results:
+        records = tuple(
+            None if arrays[0] is None else np.concatenate(arrays)
+            for arrays in zip(*(result.records for result in results), strict=True)
+        )
+    return BlockResult(
+        num_evaluated=sum(result.num_evaluated for result in results),
+        candidates=heapq.nsmallest(
+            top_k,
+            itertools.chain.from_iterable(result.candidates for result in results),
+        ),
+        num_rejected=num_rejected,
+        records=records,
+    )
+
+
+def _accept(factors: np.ndarray) -> np.ndarray:
+    # Nothing is computed unless a filter is enabled
+    assert _worker_evaluator is not None and _worker_options is not None
+    evaluator, options = _worker_evaluator, _worker_options
+    accepted = np.ones(len(factors), dtype=bool)
+    if options.min_utilization > 0:
+        _, utilization = evaluator.plan.evaluate_compute_batch(factors)
+        accepted &= utilization >= options.min_utilization
+    if options.check_capacity:
+        accepted &= evaluator.check_capacity_batch(factors) == 0
+    return accepted
+
+
+def _evaluate_block(
+    block: list[tuple[np.ndarray, tuple[int, ...]]],
+    top_k: int,
+    record: bool = False,
+    record_accesses: bool = False,
+) -> BlockResult:
+    assert _worker_evaluator is not None and _worker_mapspace is not None
+    mapspace = _worker_mapspace
+
+    item_factors, item_permutations = [], []
+    for factors, outer_perms in block:
+        inner_level_perms = [
+            mapspace.level_permutations(lvl_factors)
+            for lvl_factors in factors[len(outer_perms) :]
+        ]
+        inner_perms = np.array(
+            list(itertools.product(*inner_level_perms)), dtype=np.intp
+        ).reshape(-1, len(inner_level_perms))
+        level_perm_indices = np.concatenate(
+            (
+                np.broadcast_to(outer_perms, (len(inner_perms), len(outer_perms))),
+                inner_perms,
+            ),
+            axis=1,
+        )
+        permutations = mapspace.decode_permutations(level_perm_indices)
+        item_permutations.append(permutations)
+        item_factors.append(np.broadcast_to(factors, permutations.shape))
+
+    permutations = np.concatenate(item_permutations)
+    batch_factors = np.concatenate(item_factors)
+    tile_analyze_result = _worker_evaluator.analyze_batch(batch_factors, permutations)
+    results = _worker_evaluator.evaluate_analysis_batch(
+        tile_analyze_result, batch_factors
+    )
+    latencies = results["latency"]
+
+    records = None
+    if record:
+        records = (
+            batch_factors,
+            permutations,
+            results,
+            tile_analyze_result.tile_accesses if record_accesses else None,
+        )
+
+    best_idx = np.argsort(latencies, kind="stable")[:top_k]
+    return BlockResult(
+        num_evaluated=len(latencies),
+        candidates=[
+            Candidate(
+                int(latencies[idx]),
+                *mapspace.to_mapping(batch_factors[idx], permutations[idx]),
+            )
+            for idx in best_idx
+        ],
+        records=records,
+    )
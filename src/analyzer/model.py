@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from collections.abc import Hashable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Self
+
+from attr import frozen
+
+from analyzer.api import Evaluator, EvaluatorOptions
+from analyzer.dataflow import Dataflow
+from analyzer.IR import ArchitectueConfig, WorkloadConfig
+from analyzer.mapper import Mapper, SearchOptions
+from analyzer.network import Network
+from analyzer.plan import EvaluationPlan
+from analyzer.utils import load_yaml
+
+
+@frozen
+class LayerResult:
+    name: str
+    latency: int
+    network_latencies: dict[str, int]
+    factors: tuple[tuple[int, ...], ...]
+    permutations: tuple[tuple[str, ...], ...]
+
+
+@frozen
+class ModelResult:
+    layers: tuple[LayerResult, ...]
+
+    @property
+    def latency(self: Self) -> int:
+        return sum(layer.latency for layer in self.layers)
+
+    @property
+    def network_latencies(self: Self) -> dict[str, int]:
+        latencies: dict[str, int] = {}
+        for layer in self.layers:
+            for name, latency in layer.network_latencies.items():
+                latencies[name] = latencies.get(name, 0) + latency
+        return latencies
+
+
+class ModelEvaluator:
+    """Evaluate the layers of a whole model on one architecture.
+
+    The dataflow is built once and networks are shared by layers with the same
+    dataspaces. Layers with the same shape share one `Evaluator`, so they are
+    compiled, evaluated and searched only once.
+    """
+
+    def __init__(
+        self: Self,
+        layers: dict[str, WorkloadConfig],
+        arch: ArchitectueConfig,
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+    ) -> None:
+        self.layers = layers
+        self.arch = arch
+        self.dataflow = Dataflow.create(arch)
+
+        shared_networks: dict[frozenset[tuple[str, str]], dict[str, Network]] = {}
+        self.evaluators: dict[Hashable, Evaluator] = {}
+        self.layer_keys: dict[str, Hashable] = {}
+        for name, workload in layers.items():
+            key = _get_layer_key(workload)
+            self.layer_keys[name] = key
+            if key in self.evaluators:
+                continue
+
+            # Networks only depend on the dataspaces and whether they are written
+            signature = frozenset(workload.dataspaces_type.items())
+            if signature not in shared_networks:
+                shared_networks[signature] = {
+                    net_name: Network.create(network, arch, workload)
+                    for net_name, network in arch.network.items()
+                }
+            plan = EvaluationPlan.compile(
+                arch,
+                workload,
+                dataflow=self.dataflow,
+                networks=shared_networks[signature],
+            )
+            self.evaluators[key] = Evaluator(
+                workload, arch, workload_type, options, plan=plan
+            )
+
+    @classmethod
+    def create(
+        cls: type[ModelEvaluator],
+        layers: dict[str, dict[str, Any]],
+        arch: dict[str, Any],
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+    ) -> ModelEvaluator:
+        # `layers` maps each layer name to its workload
+        return cls(
+            {
+                name: WorkloadConfig.create(workload)
+                for name, workload in layers.items()
+            },
+            ArchitectueConfig.create(arch),
+            workload_type,
+            options,
+        )
+
+    @classmethod
+    def load(
+        cls: type[ModelEvaluator],
+        input_dir: Path,
+        workload_type: str = "MM",
+        options: EvaluatorOptions | None = None,
+    ) -> ModelEvaluator:
+        layers = load_yaml(input_dir / "layers.yml")
+        architecute = load_yaml(input_dir / "architecture.yml")
+        return cls.create(layers["layers"], architecute, workload_type, options)
+
+    @property
+    def num_unique_layers(self: Self) -> int:
+        return len(self.evaluators)
+
+    def get_evaluator(self: Self, layer: str) -> Evaluator:
+        return self.evaluators[self.layer_keys[layer]]
+
+    def evaluate(
+        self: Self,
+        mappings: dict[
+            str, tuple[Iterable[Iterable[int]], Iterable[Iterable[str | int]]]
+        ],
+    ) -> ModelResult:
+        # `mappings` holds the (factors, permutations) of every layer, the same
+        # mapping of layers with the same shape is evaluated once
+        evaluated: dict[Hashable, tuple[int, dict[str, int]]] = {}
+        results = []
+        for name in self.layers:
+            evaluator = self.get_evaluator(name)
+            factors, permutations = evaluator._normalize(*mappings[name])
+            key = (
+                self.layer_keys[name],
+                evaluator.canonical_key(factors, permutations),
+            )
+            if key not in evaluated:
+                evaluation = evaluator._evaluate(factors, permutations)
+                evaluated[key] = (
+                    evaluator._get_latency(evaluation),
+                    dict(evaluation.network_latencies),
+                )
+            latency, network_latencies = evaluated[key]
+            results.append(
+                LayerResult(
+                    name=name,
+                    latency=latency,
+                    network_latencies=network_latencies,
+                    factors=tuple(map(tuple, factors)),
+                    permutations=tuple(map(tuple, permutations)),
+                )
+            )
+        return ModelResult(tuple(results))
+
+    def search(
+        self: Self,
+        options: SearchOptions | None = None,
+        *,
+        num_workers: int | None = None,
+    ) -> ModelResult:
+        # Unique layers are searched concurrently, each by a single process
+        # `Mapper`, and the best mapping of every layer is evaluated
+        if options is not None and (
+            options.sink is not None or options.cache is not None
+        ):
+            # Both are bound to the workload of a single layer
+            err_msg = "Result sink and persistent cache not supported by model search"
+            raise NotImplementedError(err_msg)
+        keys = list(self.evaluators)
+        if num_workers == 0:
+            candidates = [_search_layer(self.evaluators[key], options) for key in keys]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                candidates = list(
+                    executor.map(
+                        _search_layer,
+                        [self.evaluators[key] for key in keys],
+                        [options] * len(keys),
+                    )
+                )
+
+        best = dict(zip(keys, candidates, strict=True))
+        return self.evaluate({name: best[key] for name, key in self.layer_keys.items()})
+
+
+def _get_layer_key(workload: WorkloadConfig) -> Hashable:
+    # Identical shapes, with dims and dataspaces in the same order
+    return (
+        tuple(workload.operation_dimension_size.items()),
+        tuple(
+            (ds, tuple(tuple(map(tuple, proj)) for proj in projs))
+            for ds, projs in workload.dataspaces_projections.items()
+        ),
+        tuple(workload.dataspaces_type.items()),
+        tuple(sorted((workload.coefficient or {}).items())),
+    )
+
+
+def _search_layer(
+    evaluator: Evaluator, options: SearchOptions | None
+) -> tuple[tuple[tuple[int, ...], ...], tuple[tuple[str, ...], ...]]:
+    best = Mapper(evaluator, options, num_workers=0).run()
+    if not best:
+        err_msg = "No legal mapping found for layer"
+        raise ValueError(err_msg)
+    return best[0].factors, best[0].permutations
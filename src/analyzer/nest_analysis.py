@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+import logging
+from collections.abc import Generator, Iterable, Sequence
 from typing import NamedTuple, Self
 
+import numpy as np
+from attr import frozen
+
 from analyzer.dataflow import Dataflow
-from analyzer.IR import MappingConfig
+from analyzer.IR import SPATIAL_AXES, MappingConfig, SpatialMappingElem
+from analyzer.profiling import profiled
 from analyzer.utils import get_logger
 
 logger = get_logger()
@@ -14,30 +19,34 @@ class Loop(NamedTuple):
     dim: str
     factor: int
     level: str
+    # Spatial axis ("x" or "y") of the loops at spatial levels
+    axis: str | None = None
 
 
 class NestedLoop(list[Loop]):
     def __init__(self: Self, loops: list[Loop], level_idx: dict[str, int]) -> None:
         super().__init__(loops)
         self._level_idx = level_idx
-        msg = f"{self.__class__.__name__} created successfully!"
-        logger.info(msg)
+        if logger.isEnabledFor(logging.INFO):
+            msg = f"{self.__class__.__name__} created successfully!"
+            logger.info(msg)
 
     @classmethod
+    @profiled("NestedLoop.create")
     def create(
         cls: type[NestedLoop], dataflow: Dataflow, mapping: MappingConfig
     ) -> NestedLoop:
+        # The last level is the compute component, it has no mapping
         pruned_loop = [
             loop
-            for level in dataflow
-            if level != dataflow.get_levels()[-1]
+            for level in dataflow.get_levels()[:-1]
             for loop in cls._create_level_loops(level, mapping)
         ]
         return cls(pruned_loop, cls._create_level_idx(pruned_loop, dataflow))
 
-    @staticmethod
+    @classmethod
     def _create_level_loops(
-        level: str, mapping: MappingConfig
+        cls: type[NestedLoop], level: str, mapping: MappingConfig
     ) -> Generator[Loop, None, None]:
         spatial_level = level.endswith("_spatial")
         target = level.removesuffix("_spatial") if spatial_level else level
@@ -47,11 +56,20 @@ class NestedLoop(list[Loop]):
 
         assert mapping_elem is not None
         return (
-            Loop(dim, factor, level)
+            Loop(
+                dim,
+                factor,
+                level,
+                cls._get_axis(dim, mapping_elem) if spatial_level else None,
+            )
             for dim in mapping_elem.permutation
             if (factor := mapping_elem.factor[dim]) > 1
         )
 
+    @staticmethod
+    def _get_axis(dim: str, mapping_elem: SpatialMappingElem) -> str:
+        return "x" if dim in mapping_elem.on_num_x else "y"
+
     @staticmethod
     def _create_level_idx(
         pruned_loops: list[Loop], dataflow: Dataflow
@@ -78,3 +96,158 @@ class NestedLoop(list[Loop]):
 
     def get_level_idx(self: Self, level: str) -> int | None:
         return self._level_idx.get(level)
+
+
+@frozen(eq=False)
+class LoopArray:
+    """Loop nest stored as parallel arrays of dim id, factor, level id and axis id.
+
+    Loops are ordered from outer to inner. `axis_ids[i]` indexes `SPATIAL_AXES`
+    for the spatial axis of the i-th loop, it is 0 for temporal loops.
+    `level_start[l]` is the index of the first loop at level `l` or below,
+    `prefix_products[i]` is the product of the loops before the i-th loop and
+    `suffix_products[i, d]` is the product of the loops of dim `d` from the i-th
+    loop on.
+    """
+
+    levels: tuple[str, ...]
+    dims: tuple[str, ...]
+    dim_ids: np.ndarray
+    factors: np.ndarray
+    level_ids: np.ndarray
+    axis_ids: np.ndarray
+    level_start: np.ndarray
+    prefix_products: np.ndarray
+    suffix_products: np.ndarray
+
+    @classmethod
+    def create(
+        cls: type[LoopArray],
+        nested_loop: Iterable[Loop],
+        levels: Sequence[str],
+        dims: Sequence[str],
+    ) -> LoopArray:
+        dim_idx = {dim: idx for idx, dim in enumerate(dims)}
+        level_idx = {level: idx for idx, level in enumerate(levels)}
+        return cls.from_arrays(
+            levels,
+            dims,
+            [
+                (
+                    dim_idx[loop.dim],
+                    loop.factor,
+                    level_idx[loop.level],
+                    SPATIAL_AXES.index(loop.axis) if loop.axis else 0,
+                )
+                for loop in nested_loop
+            ],
+        )
+
+    @classmethod
+    @profiled("LoopArray.from_mapping")
+    def from_mapping(
+        cls: type[LoopArray],
+        levels: Sequence[str],
+        dims: Sequence[str],
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str]],
+        splits: Sequence[int] | None = None,
+    ) -> LoopArray:
+        # Factors and permutations of every level but the last (compute) one.
+        # `splits[l]` loops of the permutation of spatial level `l` are on the
+        # X axis and the others on Y, as `split` in a mapping. Without splits
+        # every spatial loop is on the X axis
+        dim_idx = {dim: idx for idx, dim in enumerate(dims)}
+        loops = []
+        for lvl_idx, (lvl_factors, lvl_perm) in enumerate(
+            zip(factors, permutations, strict=True)
+        ):
+            split = (
+                splits[lvl_idx]
+                if splits is not None and levels[lvl_idx].endswith("_spatial")
+                else len(dims)
+            )
+            for pos, (dim, factor) in enumerate(
+                zip(lvl_perm, lvl_factors, strict=True)
+            ):
+                if factor > 1:
+                    loops.append((dim_idx[dim], factor, lvl_idx, int(pos >= split)))
+        return cls.from_arrays(levels, dims, loops)
+
+    @classmethod
+    @profiled("LoopArray.from_arrays")
+    def from_arrays(
+        cls: type[LoopArray],
+        levels: Sequence[str],
+        dims: Sequence[str],
+        loops: Sequence[tuple[int, int, int, int]],
+    ) -> LoopArray:
+        # `loops` holds the (dim id, factor, level id, axis id) of each loop
+        _dim_ids, _factors, _level_ids, _axis_ids = (
+            np.array(loops, dtype=np.int64).reshape(-1, 4).T.copy()
+        )
+        if np.any(np.diff(_level_ids) < 0):
+            err_msg = "Loops must be ordered from the outermost level"
+            raise ValueError(err_msg)
+
+        num_loops = len(_factors)
+        level_start = np.searchsorted(_level_ids, np.arange(len(levels) + 1))
+        prefix_products = np.ones(num_loops + 1, dtype=np.int64)
+        np.cumprod(_factors, out=prefix_products[1:])
+
+        # One-hot factors so the reverse cumprod keeps a product per dim
+        suffix_products = np.ones((num_loops + 1, len(dims)), dtype=np.int64)
+        suffix_products[np.arange(num_loops), _dim_ids] = _factors
+        suffix_products = np.cumprod(suffix_products[::-1], axis=0)[::-1]
+
+        arrays = (
+            _dim_ids,
+            _factors,
+            _level_ids,
+            _axis_ids,
+            level_start,
+            prefix_products,
+            suffix_products,
+        )
+        for array in arrays:
+            array.flags.writeable = False
+        return cls(tuple(levels), tuple(dims), *arrays)
+
+    def __len__(self: Self) -> int:
+        return len(self.factors)
+
+    def get_level_loops(self: Self, level: str) -> dict[str, Loop]:
+        lvl_idx = self.levels.index(level)
+        start, stop = self.level_start[lvl_idx], self.level_start[lvl_idx + 1]
+        spatial = level.endswith("_spatial")
+        return {
+            self.dims[dim_id]: Loop(
+                self.dims[dim_id],
+                factor,
+                level,
+                SPATIAL_AXES[axis_id] if spatial else None,
+            )
+            for dim_id, factor, axis_id in zip(
+                self.dim_ids[start:stop].tolist(),
+                self.factors[start:stop].tolist(),
+                self.axis_ids[start:stop].tolist(),
+                strict=True,
+            )
+        }
+
+    def get_level_idx(self: Self, level: str) -> int | None:
+        start = int(self.level_start[self.levels.index(level)])
+        return start if start < len(self) else None
+
+    def get_dim_sizes(self: Self) -> np.ndarray:
+        # Indexed by (level, dim)
+        return self.suffix_products[self.level_start[:-1]]
+
+    def get_tile_iterations(self: Self, related: np.ndarray) -> np.ndarray:
+        # `related[t, d]` marks the dims of tile `t`; indexed by (level, tile)
+        # Iterations stop at the innermost related loop above each level
+        is_related = related[:, self.dim_ids] & (self.factors > 1)
+        last_related = np.zeros((len(related), len(self) + 1), dtype=np.intp)
+        last_related[:, 1:] = np.where(is_related, np.arange(1, len(self) + 1), 0)
+        np.maximum.accumulate(last_related, axis=1, out=last_related)
+        return self.prefix_products[last_related[:, self.level_start[:-1]]].T
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+import logging
 import math
+from math import prod
 from typing import Any, Self
 
 from attr import field, frozen
 from icecream import ic
 
 from analyzer.IR import (
+    SPATIAL_AXES,
     ArchitectueConfig,
     NetworkElem,
     StorageAttrtributes,
     WorkloadConfig,
 )
+from analyzer.profiling import profiled
 from analyzer.tile_analysis import AnalyzeResult
 from analyzer.utils import get_logger
 
@@ -22,9 +26,12 @@ logger = get_logger()
 class ConnectionInfo:
     source: str | set[str]
     sink: str | set[str]
+    source_level: str | None = field(default=None)
+    sink_level: str | None = field(default=None)
     datawidth: int | None = field(default=None)
     bandwidth: int | None = field(default=None)
     handle_dataspaces: set[str] | None = field(default=None)
+    multicast: frozenset[str] = field(default=frozenset(SPATIAL_AXES))
 
 
 class Network:
@@ -37,10 +44,13 @@ class Network:
 
         self.source = connection_info.source
         self.sink = connection_info.sink
+        self.source_level = connection_info.source_level
+        self.sink_level = connection_info.sink_level
         self.datawidth = connection_info.datawidth
         self.bandwidth = connection_info.bandwidth
         self.hierarchy_level = hierarchy_level
         self.handle_dataspaces = connection_info.handle_dataspaces
+        self.multicast = connection_info.multicast
 
         if isinstance(self.source, set):
             self._connections: dict[str, dict[str, Network]] = {
@@ -48,6 +58,7 @@ class Network:
             }
 
     @classmethod
+    @profiled("Network.create")
     def create(
         cls: type[Network],
         network: NetworkElem,
@@ -60,6 +71,7 @@ class Network:
             connection_info=ConnectionInfo(
                 source=network.source,
                 sink=network.sink,
+                multicast=network.attributes.multicast,
             ),
             hierarchy_level=hierarchy_level,
         )
@@ -71,11 +83,14 @@ class Network:
                     ConnectionInfo(
                         source=source,
                         sink=sink,
+                        source_level=cls._get_level(source, arch),
+                        sink_level=cls._get_level(sink, arch),
                         datawidth=network.attributes.datawidth,
                         bandwidth=cls._get_bandwidth(source, sink, arch),
                         handle_dataspaces=cls._get_handle_dataspaces(
                             source, sink, workload, arch
                         ),
+                        multicast=network.attributes.multicast,
                     ),
                     hierarchy_level=hierarchy_level,
                 )
@@ -101,6 +116,13 @@ class Network:
 
         return source_levels.pop()
 
+    @staticmethod
+    def _get_level(elem_name: str, arch: ArchitectueConfig) -> str:
+        # Containers only exist as spatial levels in the dataflow
+        if arch.hierarchy[elem_name].elem_type == "container":
+            return f"{elem_name}_spatial"
+        return elem_name
+
     @staticmethod
     def _get_bandwidth(source: str, sink: str, arch: ArchitectueConfig) -> int:
         source_attrs = arch.hierarchy[source].attributes
@@ -148,36 +170,94 @@ class Network:
         err_msg = "Source and sink not found in hierarchy"
         raise ValueError(err_msg)
 
-    def evaluate_latency(self: Self, result: AnalyzeResult) -> int:
+    @profiled("Network.evaluate_latency")
+    def evaluate_latency(
+        self: Self, result: AnalyzeResult, *, debug: bool | None = None
+    ) -> int:
+        # Logging of the links is decided once, None checks the logger level
+        if debug is None:
+            debug = logger.isEnabledFor(logging.DEBUG)
         if not self.children:
-            return self._evaluate_latency(result)
+            return self._evaluate_latency(result, debug=debug)
         else:
-            # TODO: Only consider unicast for now, need to add multicast
-            return sum(child.evaluate_latency(result) for child in self.children)
+            return sum(
+                child._evaluate_latency(
+                    result, self._route(child, result.bypassed), debug=debug
+                )
+                for child in self.children
+            )
 
-    def _evaluate_latency(self: Self, result: AnalyzeResult) -> int:
+    def _route(
+        self: Self, child: Network, bypassed: dict[str, frozenset[str]]
+    ) -> set[str] | None:
+        # A source bypassing a dataspace only forwards it to a sink when no
+        # other source of this network stores it for that sink
+        source_bypassed = bypassed.get(child.source_level, frozenset())
+        if not source_bypassed:
+            return None
+        return {
+            ds
+            for ds in child.handle_dataspaces
+            if ds not in source_bypassed
+            or not any(
+                other is not child
+                and other.sink == child.sink
+                and ds in other.handle_dataspaces
+                and ds not in bypassed.get(other.source_level, frozenset())
+                for other in self.children
+            )
+        }
+
+    def _evaluate_latency(
+        self: Self,
+        result: AnalyzeResult,
+        dataspaces: set[str] | None = None,
+        *,
+        debug: bool = False,
+    ) -> int:
         assert self.bandwidth is not None
         assert self.handle_dataspaces is not None
-        assert isinstance(self.sink, str)
+        assert self.sink_level is not None
+        if dataspaces is None:
+            dataspaces = self.handle_dataspaces
+
+        # Accesses of a spatial level count each shared tile once, which
+        # assumes it is multicast to every instance needing it
+        tile_accesses = result.tile_accesses[self.sink_level]
+        tile_sharing = result.tile_sharing.get(self.sink_level)
+        if tile_sharing is None or self.multicast.issuperset(SPATIAL_AXES):
+            latency = sum(
+                math.ceil(tile_access / self.bandwidth)
+                for tile_name, tile_access in tile_accesses.items()
+                if tile_name in dataspaces
+            )
+        else:
+            latency = sum(
+                math.ceil(
+                    tile_access
+                    * self.get_replication(tile_sharing.get(tile_name, ()))
+                    / self.bandwidth
+                )
+                for tile_name, tile_access in tile_accesses.items()
+                if tile_name in dataspaces
+            )
 
-        tile_accesses = result.tile_accesses.get(self.sink)
-        if tile_accesses is None:
-            tile_accesses = result.tile_accesses.get(f"{self.sink}_spatial")
+        if debug:
+            msg = (
+                f"{self.source:<10}-> {self.sink:<10} | "
+                f"{latency:<10} cycles | {dataspaces}"
+            )
+            logger.debug(msg)
 
-        assert tile_accesses is not None
-        latency = sum(
-            math.ceil(tile_access / self.bandwidth)
-            for tile_name, tile_access in tile_accesses.items()
-            if tile_name in self.handle_dataspaces
-        )
+        return latency
 
-        msg = (
-            f"{self.source:<10}-> {self.sink:<10} | "
-            f"{latency:<10} cycles | {self.handle_dataspaces}"
+    def get_replication(self: Self, tile_sharing: tuple[int, ...]) -> int:
+        # Without multicast along an axis the tile is sent to each instance
+        return prod(
+            num_sharing
+            for axis, num_sharing in zip(SPATIAL_AXES, tile_sharing, strict=False)
+            if axis not in self.multicast
         )
-        logger.debug(msg)
-
-        return latency
 
     def _add_child(self: Self, child: Network) -> None:
         assert isinstance(child.source, str) and isinstance(child.sink, str)
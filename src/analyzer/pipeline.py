@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from typing import Self
+
+import numpy as np
+from attr import frozen
+
+from analyzer.IR import ArchitectueConfig, StorageAttrtributes
+from analyzer.plan import Buffer, EvaluationPlan, Link
+from analyzer.tile_analysis import AnalyzeResult, BatchAnalyzeResult
+
+
+@frozen
+class Stage:
+    network: str
+    links: tuple[Link, ...]
+    # Storage levels keeping the tiles transferred by the network
+    buffers: tuple[Buffer, ...]
+
+
+@frozen(eq=False)
+class PipelineModel:
+    """Latency of the networks working as overlapped pipeline stages.
+
+    A stage whose buffers hold two copies of their tiles transfers the next tile
+    while the current one is used, so the overlapped stages cost the slowest
+    stage plus one transfer of each other stage to fill and drain the pipeline.
+    Stages without room for double buffering stay serialized.
+    """
+
+    plan: EvaluationPlan
+    stages: tuple[Stage, ...]
+
+    @classmethod
+    def compile(
+        cls: type[PipelineModel], plan: EvaluationPlan, arch: ArchitectueConfig
+    ) -> PipelineModel:
+        stages = []
+        for name in plan.networks:
+            links = tuple(link for link in plan.links if link.network == name)
+            buffers = (cls._get_buffer(link.sink, plan, arch) for link in links)
+            stages.append(
+                Stage(
+                    network=name,
+                    links=links,
+                    buffers=tuple(
+                        dict.fromkeys(buffer for buffer in buffers if buffer)
+                    ),
+                )
+            )
+        return cls(plan=plan, stages=tuple(stages))
+
+    @staticmethod
+    def _get_buffer(
+        sink: str, plan: EvaluationPlan, arch: ArchitectueConfig
+    ) -> Buffer | None:
+        # Tiles sent to a container are kept by the first storage below it.
+        # The outermost storage backs the whole workload, like in
+        # `EvaluationPlan.buffers` its capacity never limits the tiles
+        elem_names = list(arch.hierarchy)
+        for elem_name in elem_names[elem_names.index(sink) :]:
+            elem = arch.hierarchy[elem_name]
+            if isinstance(elem.attributes, StorageAttrtributes):
+                if plan.level_idx[elem_name] == 0:
+                    return None
+                return Buffer(plan.level_idx[elem_name], elem.attributes.capacity)
+            if elem.elem_type == "component":
+                return None
+        return None
+
+    def evaluate_latency(
+        self: Self, result: AnalyzeResult, network_latencies: dict[str, int]
+    ) -> int:
+        levels, dataspaces = self.plan.levels, self.plan.dataspaces
+
+        serial_latency = 0
+        stage_latencies: list[int] = []
+        transfer_latencies: list[int] = []
+        for stage in self.stages:
+            latency = network_latencies[stage.network]
+            if not self._is_double_buffered(stage, result):
+                serial_latency += latency
+                continue
+
+            num_transfers = max(
+                (
+                    result.tile_iterations[levels[link.level_idx]][dataspaces[ds_idx]]
+                    for link in stage.links
+                    for ds_idx in link.dataspace_idx
+                ),
+                default=1,
+            )
+            stage_latencies.append(latency)
+            transfer_latencies.append(-(-latency // num_transfers))
+
+        if not stage_latencies:
+            return serial_latency
+
+        bottleneck = stage_latencies.index(max(stage_latencies))
+        return (
+            serial_latency
+            + stage_latencies[bottleneck]
+            + sum(transfer_latencies)
+            - transfer_latencies[bottleneck]
+        )
+
+    def _is_double_buffered(self: Self, stage: Stage, result: AnalyzeResult) -> bool:
+        # Bypassed dataspaces take no room in the buffers
+        for buffer in stage.buffers:
+            level = self.plan.levels[buffer.level_idx]
+            bypassed = result.bypassed.get(level, frozenset())
+            num_elems = sum(
+                tile_size
+                for ds, tile_size in result.tile_sizes[level].items()
+                if ds not in bypassed
+            )
+            if 2 * num_elems > buffer.capacity:
+                return False
+        return True
+
+    def evaluate_latency_batch(
+        self: Self, result: BatchAnalyzeResult, network_latencies: dict[str, np.ndarray]
+    ) -> np.ndarray:
+        # Arrays below are indexed by (mapping, stage)
+        latencies = np.stack(
+            [network_latencies[stage.network] for stage in self.stages], axis=1
+        )
+        tile_sizes = (
+            result.tile_sizes
+            if result.kept is None
+            else result.tile_sizes * result.kept
+        ).sum(axis=-1)
+        double_buffered = np.stack(
+            [
+                np.all(
+                    2 * tile_sizes[:, [buffer.level_idx for buffer in stage.buffers]]
+                    <= np.array([buffer.capacity for buffer in stage.buffers]),
+                    axis=1,
+                )
+                for stage in self.stages
+            ],
+            axis=1,
+        )
+
+        num_transfers = np.ones_like(latencies)
+        for stage_idx, stage in enumerate(self.stages):
+            for link in stage.links:
+                if not link.dataspace_idx:
+                    continue
+                np.maximum(
+                    num_transfers[:, stage_idx],
+                    result.tile_iterations[:, link.level_idx, link.dataspace_idx].max(
+                        axis=1
+                    ),
+                    out=num_transfers[:, stage_idx],
+                )
+
+        stage_latencies = np.where(double_buffered, latencies, 0)
+        transfer_latencies = np.where(
+            double_buffered, -(-latencies // num_transfers), 0
+        )
+        rows = np.arange(len(latencies))
+        bottleneck = stage_latencies.argmax(axis=1)
+        return (
+            np.where(double_buffered, 0, latencies).sum(axis=1)
+            + stage_latencies[rows, bottleneck]
+            + transfer_latencies.sum(axis=1)
+            - transfer_latencies[rows, bottleneck]
+        )
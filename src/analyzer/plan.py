@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+from math import prod
+from typing import Self
+
+import numpy as np
+from attr import frozen
+
+from analyzer.dataflow import Dataflow
+from analyzer.IR import (
+    SPATIAL_AXES,
+    ArchitectueConfig,
+    MappingConfig,
+    StorageAttrtributes,
+    WorkloadConfig,
+)
+from analyzer.network import Network
+from analyzer.profiling import profiled
+from analyzer.tile_analysis import (
+    BatchAnalyzeResult,
+    calc_mm_tile_sizes,
+    calc_tile_sizes,
+    get_dims,
+    get_projection_counts,
+    get_projection_matrices,
+)
+
+
+@frozen
+class Link:
+    network: str
+    source: str
+    sink: str
+    level_idx: int
+    bandwidth: int
+    dataspace_idx: tuple[int, ...]
+    # Spatial axes of the sink level along which tiles are not multicast
+    replicated_axes: tuple[int, ...] = ()
+    source_level_idx: int | None = None
+    # For each dataspace, levels of the other sources feeding the same sink
+    other_source_idx: tuple[tuple[int, ...], ...] = ()
+
+
+@frozen
+class Buffer:
+    level_idx: int
+    capacity: int
+
+
+@frozen
+class ComputeUsage:
+    compute_cycles: int
+    num_used_pes: int
+    num_pes: int
+
+    @property
+    def utilization(self: Self) -> float:
+        return self.num_used_pes / self.num_pes
+
+
+@frozen(eq=False)
+class EvaluationPlan:
+    dataflow: Dataflow
+    networks: dict[str, Network]
+    levels: tuple[str, ...]
+    level_idx: dict[str, int]
+    dims: tuple[str, ...]
+    dimension_sizes: dict[str, int]
+    dataspaces: tuple[str, ...]
+    projection_elems: dict[str, tuple[frozenset[str], ...]]
+    projection_counts: np.ndarray
+    projection_coefficients: dict[str, tuple[dict[str, int], ...]]
+    projection_matrices: np.ndarray
+    links: tuple[Link, ...]
+    # Mapping levels spreading loops over the PEs, and the PEs they provide
+    spatial_level_idx: tuple[int, ...]
+    num_pes: int
+    # Storage levels below the outermost one, which backs the whole workload
+    buffers: tuple[Buffer, ...]
+
+    @classmethod
+    def compile(
+        cls: type[EvaluationPlan],
+        arch: ArchitectueConfig,
+        workload: WorkloadConfig,
+        *,
+        dataflow: Dataflow | None = None,
+        networks: dict[str, Network] | None = None,
+    ) -> EvaluationPlan:
+        # A prebuilt dataflow and networks can be shared by workloads on `arch`
+        if dataflow is None:
+            dataflow = Dataflow.create(arch)
+        if networks is None:
+            networks = {
+                name: Network.create(network, arch, workload)
+                for name, network in arch.network.items()
+            }
+
+        levels = dataflow.get_levels()
+        level_idx = {level: idx for idx, level in enumerate(levels)}
+        dims = get_dims(workload)
+        dataspaces = tuple(workload.dataspaces_projections)
+        projection_elems = workload.get_projection_elems()
+
+        projection_counts = get_projection_counts(projection_elems, dims)
+        projection_coefficients = workload.get_projection_coefficients()
+
+        links = tuple(
+            Link(
+                network=name,
+                source=child.source,
+                sink=child.sink,
+                level_idx=level_idx[child.sink_level],
+                bandwidth=child.bandwidth,
+                dataspace_idx=tuple(
+                    idx
+                    for idx, ds in enumerate(dataspaces)
+                    if ds in child.handle_dataspaces
+                ),
+                replicated_axes=tuple(
+                    idx
+                    for idx, axis in enumerate(SPATIAL_AXES)
+                    if axis not in child.multicast
+                    and child.sink_level.endswith("_spatial")
+                ),
+                source_level_idx=level_idx[child.source_level],
+                other_source_idx=tuple(
+                    tuple(
+                        level_idx[other.source_level]
+                        for other in network.children
+                        if other is not child
+                        and other.sink == child.sink
+                        and ds in other.handle_dataspaces
+                    )
+                    for ds in dataspaces
+                    if ds in child.handle_dataspaces
+                ),
+            )
+            for name, network in networks.items()
+            for child in network.children
+        )
+        spatial_level_idx = tuple(
+            idx for idx, level in enumerate(levels[:-1]) if level.endswith("_spatial")
+        )
+
+        return cls(
+            dataflow=dataflow,
+            networks=networks,
+            levels=levels,
+            level_idx=level_idx,
+            dims=dims,
+            dimension_sizes={
+                dim: workload.operation_dimension_size[dim] for dim in dims
+            },
+            dataspaces=dataspaces,
+            projection_elems=projection_elems,
+            projection_counts=projection_counts,
+            projection_coefficients=projection_coefficients,
+            projection_matrices=get_projection_matrices(projection_coefficients, dims),
+            links=links,
+            spatial_level_idx=spatial_level_idx,
+            num_pes=prod(
+                dataflow[levels[idx]].num_x * dataflow[levels[idx]].num_y
+                for idx in spatial_level_idx
+            ),
+            buffers=tuple(
+                Buffer(level_idx[name], elem.attributes.capacity)
+                for name, elem in arch.hierarchy.items()
+                if isinstance(elem.attributes, StorageAttrtributes)
+                and level_idx[name] > 0
+            ),
+        )
+
+    @property
+    def mapping_levels(self: Self) -> tuple[str, ...]:
+        # The last level is the compute component, it has no mapping
+        return self.levels[:-1]
+
+    @property
+    def num_operations(self: Self) -> int:
+        return prod(self.dimension_sizes.values())
+
+    def evaluate_compute(self: Self, factors: list[list[int]]) -> ComputeUsage:
+        # Each used PE runs one MAC per cycle for all temporal iterations
+        num_used_pes = prod(
+            prod(factors[lvl_idx]) for lvl_idx in self.spatial_level_idx
+        )
+        return ComputeUsage(
+            compute_cycles=self.num_operations // num_used_pes,
+            num_used_pes=num_used_pes,
+            num_pes=self.num_pes,
+        )
+
+    def evaluate_compute_batch(
+        self: Self, factors: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Compute cycles and PE utilization, same layout as `BatchMMAnalyzer`
+        num_used_pes = np.prod(factors[:, list(self.spatial_level_idx)], axis=(1, 2))
+        return self.num_operations // num_used_pes, num_used_pes / self.num_pes
+
+    def get_kept_dataspaces(self: Self, mapping: MappingConfig) -> np.ndarray:
+        # Indexed by (level, dataspace), dataspaces are kept unless bypassed
+        kept = np.ones((len(self.levels), len(self.dataspaces)), dtype=bool)
+        for elem_name, elem in mapping.items():
+            if elem.bypass is None or elem_name not in self.level_idx:
+                continue
+            for ds_idx, ds in enumerate(self.dataspaces):
+                if ds in elem.bypass.bypass:
+                    kept[self.level_idx[elem_name], ds_idx] = False
+        return kept
+
+    def get_tile_sizes(
+        self: Self, dim_sizes: np.ndarray, workload_type: str
+    ) -> np.ndarray:
+        # `dim_sizes` is indexed by (..., dim) and the result by (..., dataspace),
+        # with the tile model of the analyzers of `workload_type`
+        if workload_type == "MM":
+            return calc_mm_tile_sizes(dim_sizes, self.projection_counts)
+        elif workload_type == "einsum":
+            return calc_tile_sizes(dim_sizes, self.projection_matrices)
+        else:
+            err_msg = f"Workload type {workload_type} not supported"
+            raise NotImplementedError(err_msg)
+
+    def check_capacity(
+        self: Self,
+        factors: list[list[int]],
+        permutations: list[list[str]],
+        workload_type: str,
+        kept: np.ndarray | None = None,
+    ) -> int:
+        # Bit `l` of the code is set when the tiles of level `l` overflow it
+        dim_idx = {dim: idx for idx, dim in enumerate(self.dims)}
+        dim_factors = np.ones((len(factors), len(self.dims)), dtype=np.int64)
+        for lvl_idx, (lvl_factors, lvl_perm) in enumerate(
+            zip(factors, permutations, strict=True)
+        ):
+            for dim, factor in zip(lvl_perm, lvl_factors, strict=True):
+                dim_factors[lvl_idx, dim_idx[dim]] = factor
+        return int(self.check_capacity_batch(dim_factors[None], workload_type, kept)[0])
+
+    def check_capacity_batch(
+        self: Self,
+        factors: np.ndarray,
+        workload_type: str,
+        kept: np.ndarray | None = None,
+    ) -> np.ndarray:
+        # Tiles only depend on the factors, so this runs before any analysis.
+        # `kept` is indexed by ([mapping,] level, dataspace)
+        buffer_idx = [buffer.level_idx for buffer in self.buffers]
+        dim_sizes = np.cumprod(factors[:, ::-1], axis=1)[:, ::-1][:, buffer_idx]
+        tile_sizes = self.get_tile_sizes(dim_sizes, workload_type)
+        if kept is not None:
+            tile_sizes *= kept[..., buffer_idx, :]
+
+        overflow = tile_sizes.sum(axis=-1) > np.array([
+            buffer.capacity for buffer in self.buffers
+        ])
+        return overflow @ (np.int64(1) << np.array(buffer_idx, dtype=np.int64))
+
+    @profiled("EvaluationPlan.evaluate_latency_batch")
+    def evaluate_latency_batch(
+        self: Self, result: BatchAnalyzeResult
+    ) -> dict[str, np.ndarray]:
+        latencies = {
+            name: np.zeros(len(result), dtype=np.int64) for name in self.networks
+        }
+        kept = (
+            None
+            if result.kept is None
+            else np.broadcast_to(result.kept, result.tile_accesses.shape)
+        )
+        for link in self.links:
+            tile_accesses = result.tile_accesses[:, link.level_idx, link.dataspace_idx]
+            if kept is not None:
+                tile_accesses *= self._route(link, kept)
+            if link.replicated_axes:
+                tile_sharing = result.tile_sharing[
+                    :, link.level_idx, link.dataspace_idx
+                ][..., link.replicated_axes]
+                tile_accesses *= tile_sharing.prod(axis=-1)
+            latencies[link.network] += (-(-tile_accesses // link.bandwidth)).sum(axis=1)
+        return latencies
+
+    @staticmethod
+    def _route(link: Link, kept: np.ndarray) -> np.ndarray:
+        # Same rule as `Network._route`, indexed by (mapping, link dataspace)
+        routed = kept[:, link.source_level_idx, link.dataspace_idx]
+        for idx, (ds_idx, other_idx) in enumerate(
+            zip(link.dataspace_idx, link.other_source_idx, strict=True)
+        ):
+            routed[:, idx] |= ~kept[:, list(other_idx), ds_idx].any(axis=1)
+        return routed
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import functools
+import json
+import time
+import tracemalloc
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Self
+
+from attr import asdict, define
+from rich.console import Console
+from rich.table import Table
+
+_profiler: Profiler | None = None
+
+
+@define
+class StageStats:
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    # Traced memory after the calls minus before, so memory freed by a call
+    # offsets its allocations, and the highest traced memory of a call above
+    # the memory at its start. Only measured with `trace_memory`
+    net_allocated_bytes: int = 0
+    peak_bytes: int = 0
+
+
+class Profiler:
+    """Call counts, wall and CPU time and traced memory of each evaluator stage.
+
+    Times and memory are inclusive, so a stage also counts the stages it calls.
+    Only the current process is profiled, so mappers should run without
+    workers. Tracing memory with `tracemalloc` slows down every allocation, so
+    it is opt-in.
+    """
+
+    def __init__(self: Self, *, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.stages: dict[str, StageStats] = {}
+        # Highest traced memory seen by each running stage, innermost last, as
+        # every stage resets the peak of `tracemalloc`
+        self._peaks: list[int] = []
+
+    @contextmanager
+    def stage(self: Self, name: str) -> Generator[None, None, None]:
+        start = self.start()
+        try:
+            yield
+        finally:
+            self.stop(name, start)
+
+    def start(self: Self) -> tuple[float, float, int]:
+        traced = 0
+        if self.trace_memory:
+            traced, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            self._peaks.append(traced)
+            tracemalloc.reset_peak()
+        return time.perf_counter(), time.process_time(), traced
+
+    def stop(self: Self, name: str, start: tuple[float, float, int]) -> None:
+        cpu_time = time.process_time()
+        wall_time = time.perf_counter()
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        stats.calls += 1
+        stats.wall_time += wall_time - start[0]
+        stats.cpu_time += cpu_time - start[1]
+        if self.trace_memory:
+            traced, peak = tracemalloc.get_traced_memory()
+            peak = max(self._peaks.pop(), peak)
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            stats.net_allocated_bytes += traced - start[2]
+            stats.peak_bytes = max(stats.peak_bytes, peak - start[2])
+
+    def to_dict(self: Self) -> dict[str, dict[str, Any]]:
+        return {name: asdict(stats) for name, stats in self.stages.items()}
+
+    def dump_json(self: Self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+
+    def to_table(self: Self) -> Table:
+        table = Table(title="Evaluator profile")
+        table.add_column("Stage", overflow="fold")
+        columns = ["Calls", "Wall (s)", "CPU (s)", "Per call (us)"]
+        if self.trace_memory:
+            columns += ["Net alloc (B)", "Peak (B)"]
+        for column in columns:
+            table.add_column(column, justify="right", no_wrap=True)
+
+        # Slowest stages first
+        for name, stats in sorted(
+            self.stages.items(), key=lambda item: item[1].wall_time, reverse=True
+        ):
+            row = [
+                f"{stats.calls}",
+                f"{stats.wall_time:.4f}",
+                f"{stats.cpu_time:.4f}",
+                f"{stats.wall_time / stats.calls * 1e6:.1f}",
+            ]
+            if self.trace_memory:
+                row += [f"{stats.net_allocated_bytes}", f"{stats.peak_bytes}"]
+            table.add_row(name, *row)
+        return table
+
+    def print(self: Self, console: Console | None = None) -> None:
+        (Console() if console is None else console).print(self.to_table())
+
+
+@contextmanager
+def profile(*, trace_memory: bool = False) -> Generator[Profiler, None, None]:
+    # Profile the stages run inside the block, nested blocks profile alone.
+    # Memory is traced from the start of the block unless already traced
+    global _profiler  # noqa: PLW0603
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    previous, _profiler = _profiler, Profiler(trace_memory=trace_memory)
+    try:
+        yield _profiler
+    finally:
+        _profiler = previous
+        if start_tracing:
+            tracemalloc.stop()
+
+
+def profiled[**P, R](name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    # Costs a single global lookup per call while no profile is active, and
+    # skips the generator of `Profiler.stage` while one is
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            start = profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.stop(name, start)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,401 @@
+"""Local evaluation service shared by many optimizer processes.
+
+Requests and responses are JSON objects, one per line. A client first opens a
+session with its workload and architecture, then sends mappings to evaluate:
+
+    {"id": 0, "op": "open", "workload": {...}, "architecture": {...}}
+    {"id": 1, "op": "evaluate", "session": "<session>", "factors": [...],
+     "permutations": [...]}
+
+Factors and permutations follow `Evaluator.evaluate`. Concurrent requests of
+a session are gathered into one `Evaluator.evaluate_batch` call.
+
+Usage: PYTHONPATH=src python -m analyzer.server --socket /tmp/analyzer.sock
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+import numpy as np
+
+from analyzer.api import Evaluator, EvaluatorOptions
+from analyzer.cache import get_config_hash
+from analyzer.utils import get_logger
+
+logger = get_logger()
+
+# Limit of a single JSON line, large enough for any workload description
+STREAM_LIMIT = 2**24
+
+
+class Session:
+    """One compiled evaluator and the queue of its pending mappings."""
+
+    def __init__(
+        self: Self, evaluator: Evaluator, max_batch_size: int, max_delay: float
+    ) -> None:
+        self.evaluator = evaluator
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.num_batches = 0
+        self._dim_sizes = np.array(
+            [evaluator.plan.dimension_sizes[dim] for dim in evaluator.dims],
+            dtype=np.int64,
+        )
+        self.num_evaluated = 0
+
+        self._queue: asyncio.Queue[
+            tuple[np.ndarray, np.ndarray, asyncio.Future[dict[str, Any]]]
+        ] = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def evaluate(
+        self: Self,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+    ) -> dict[str, Any]:
+        # Queue the mapping in the dim-indexed layout of `evaluate_batch`,
+        # invalid mappings are answered with an error instead
+        dims = self.evaluator.dims
+        shape = (len(self.evaluator.levels), len(dims))
+        factors, permutations = self.evaluator._normalize(factors, permutations)
+        if len(permutations) != shape[0] or any(
+            sorted(lvl_perm) != sorted(dims) for lvl_perm in permutations
+        ):
+            err_msg = "Mapping must have one loop per dim at every level"
+            raise ValueError(err_msg)
+        if len(factors) != shape[0] or any(
+            len(lvl_factors) != shape[1] or min(lvl_factors) < 1
+            for lvl_factors in factors
+        ):
+            err_msg = "Mapping must have one positive factor per loop"
+            raise ValueError(err_msg)
+
+        perm_idx = np.array(
+            [[dims.index(dim) for dim in lvl_perm] for lvl_perm in permutations],
+            dtype=np.intp,
+        )
+        dim_factors = np.ones(shape, dtype=np.int64)
+        np.put_along_axis(dim_factors, perm_idx, np.array(factors), axis=1)
+        if np.any(dim_factors.prod(axis=0) != self._dim_sizes):
+            err_msg = "Factors of every dim must multiply to its size"
+            raise ValueError(err_msg)
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((dim_factors, perm_idx, future))
+        return await future
+
+    async def close(self: Self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self: Self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Wait a little for other requests to join the batch
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            factors = np.stack([factors for factors, _, _ in batch])
+            permutations = np.stack([perms for _, perms, _ in batch])
+            try:
+                # Evaluated off the event loop so requests keep being accepted
+                results = await loop.run_in_executor(
+                    None, self.evaluator.evaluate_batch, factors, permutations
+                )
+            except Exception as e:  # noqa: BLE001
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.num_batches += 1
+            self.num_evaluated += len(batch)
+            for result, (_, _, future) in zip(results, batch, strict=True):
+                if not future.done():
+                    future.set_result({
+                        "latency": int(result["latency"]),
+                        "networks": {
+                            name: int(result[name]) for name in self.evaluator.networks
+                        },
+                        "compute_cycles": int(result["compute_cycles"]),
+                        "utilization": float(result["utilization"]),
+                        "roofline": int(result["roofline"]),
+                    })
+
+
+class EvaluationServer:
+    """Serve evaluations of many clients from warm, shared sessions.
+
+    Sessions are keyed by the configuration hash of their evaluator, so
+    clients opening the same workload and architecture share one session and
+    their requests are batched together.
+    """
+
+    def __init__(
+        self: Self, max_batch_size: int = 1024, max_delay: float = 0.002
+    ) -> None:
+        if max_batch_size <= 0:
+            err_msg = "Batch size must be positive"
+            raise ValueError(err_msg)
+
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.sessions: dict[str, Session] = {}
+        # Session of every open request seen, so reopening skips compilation
+        self._request_sessions: dict[str, str] = {}
+
+    async def serve_unix(self: Self, path: Path) -> asyncio.Server:
+        return await asyncio.start_unix_server(
+            self._handle_client, path=path, limit=STREAM_LIMIT
+        )
+
+    async def serve_tcp(
+        self: Self, host: str = "127.0.0.1", port: int = 0
+    ) -> asyncio.Server:
+        return await asyncio.start_server(
+            self._handle_client, host=host, port=port, limit=STREAM_LIMIT
+        )
+
+    async def close(self: Self) -> None:
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+        self._request_sessions.clear()
+
+    async def _handle_client(
+        self: Self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # Requests of a client are answered as they finish, matched by `id`
+        lock = asyncio.Lock()
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _respond(
+        self: Self, line: bytes, writer: asyncio.StreamWriter, lock: asyncio.Lock
+    ) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, **await self._dispatch(request)}
+        except Exception as e:  # noqa: BLE001
+            msg = f"Request failed: {e}"
+            logger.warning(msg)
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+
+        async with lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def _dispatch(self: Self, request: dict[str, Any]) -> dict[str, Any]:
+        op = request.get("op")
+        if op == "open":
+            return {"session": await self._open(request)}
+        elif op == "evaluate":
+            session = self.sessions.get(request["session"])
+            if session is None:
+                err_msg = f"Session {request['session']} not found"
+                raise KeyError(err_msg)
+            return await session.evaluate(request["factors"], request["permutations"])
+        elif op == "stats":
+            return {
+                "sessions": {
+                    key: {
+                        "num_batches": session.num_batches,
+                        "num_evaluated": session.num_evaluated,
+                    }
+                    for key, session in self.sessions.items()
+                }
+            }
+        else:
+            err_msg = f"Operation {op} not supported"
+            raise NotImplementedError(err_msg)
+
+    async def _open(self: Self, request: dict[str, Any]) -> str:
+        # Requests with the same configs reuse their session without parsing
+        # and compiling them again. Different requests compiling to the same
+        # evaluator still share its session
+        workload_type = request.get("workload_type", "MM")
+        options = EvaluatorOptions(latency_model=request.get("latency_model", "serial"))
+        request_key = get_config_hash(
+            request["workload"], request["architecture"], workload_type, options
+        )
+        if (key := self._request_sessions.get(request_key)) in self.sessions:
+            return key
+
+        evaluator = await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: Evaluator.create(
+                request["workload"], request["architecture"], workload_type, options
+            ),
+        )
+        key = evaluator.config_hash
+        if key not in self.sessions:
+            self.sessions[key] = Session(evaluator, self.max_batch_size, self.max_delay)
+            msg = f"Session {key} opened"
+            logger.info(msg)
+        self._request_sessions[request_key] = key
+        return key
+
+
+class EvaluationClient:
+    """Asyncio client of `EvaluationServer`, requests may run concurrently."""
+
+    def __init__(
+        self: Self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._task = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect_unix(cls: type[EvaluationClient], path: Path) -> EvaluationClient:
+        return cls(*await asyncio.open_unix_connection(path, limit=STREAM_LIMIT))
+
+    @classmethod
+    async def connect_tcp(
+        cls: type[EvaluationClient], host: str, port: int
+    ) -> EvaluationClient:
+        return cls(*await asyncio.open_connection(host, port, limit=STREAM_LIMIT))
+
+    async def __aenter__(self: Self) -> Self:
+        return self
+
+    async def __aexit__(
+        self: Self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def open(
+        self: Self,
+        workload: dict[str, Any],
+        architecture: dict[str, Any],
+        workload_type: str = "MM",
+        latency_model: str = "serial",
+    ) -> str:
+        response = await self._request({
+            "op": "open",
+            "workload": workload,
+            "architecture": architecture,
+            "workload_type": workload_type,
+            "latency_model": latency_model,
+        })
+        return response["session"]
+
+    async def evaluate(
+        self: Self,
+        session: str,
+        factors: Iterable[Iterable[int]],
+        permutations: Iterable[Iterable[str | int]],
+    ) -> dict[str, Any]:
+        return await self._request({
+            "op": "evaluate",
+            "session": session,
+            "factors": [[int(f) for f in lvl_factors] for lvl_factors in factors],
+            "permutations": [
+                [p if isinstance(p, str) else int(p) for p in lvl_perm]
+                for lvl_perm in permutations
+            ],
+        })
+
+    async def stats(self: Self) -> dict[str, Any]:
+        return await self._request({"op": "stats"})
+
+    async def close(self: Self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._task.cancel()
+
+    async def _request(self: Self, request: dict[str, Any]) -> dict[str, Any]:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(json.dumps({"id": request_id, **request}).encode() + b"\n")
+        await self._writer.drain()
+
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def _receive(self: Self) -> None:
+        while line := await self._reader.readline():
+            response = json.loads(line)
+            future = self._pending.pop(response.pop("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+        err_msg = "Connection closed by the server"
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(err_msg))
+        self._pending.clear()
+
+
+async def serve(
+    socket: Path | None, host: str, port: int, max_batch_size: int, max_delay: float
+) -> None:
+    server = EvaluationServer(max_batch_size, max_delay)
+    if socket is not None:
+        listener = await server.serve_unix(socket)
+    else:
+        listener = await server.serve_tcp(host, port)
+    msg = f"Serving on {', '.join(str(s.getsockname()) for s in listener.sockets)}"
+    logger.info(msg)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", type=Path)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--max-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    asyncio.run(
+        serve(args.socket, args.host, args.port, args.batch_size, args.max_delay)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+import numpy as np
+import pandas as pd
+
+from analyzer.api import Evaluator
+
+SCHEMA_FILE = "schema.json"
+SHARD_PATTERN = "part-*.npz"
+
+
+class ResultWriter:
+    """Append batch evaluation results to npz shards under `path`.
+
+    Rows are buffered in preallocated columns of `chunk_size` rows and every
+    full buffer is written to its own shard, so memory stays constant for the
+    whole run. Columns are `factor/<level>/<dim>`, `permutation/<level>/<k>`
+    (dim index of the k-th loop), one latency per network, `latency`,
+    `compute_cycles`, `utilization`, `roofline` and, optionally,
+    `access/<level>/<dataspace>`. Shards of a previous run under `path` are
+    deleted when the writer opens.
+    """
+
+    def __init__(
+        self: Self,
+        path: Path,
+        evaluator: Evaluator,
+        chunk_size: int = 65536,
+        *,
+        tile_accesses: bool = True,
+    ) -> None:
+        if chunk_size <= 0:
+            err_msg = "Chunk size must be positive"
+            raise ValueError(err_msg)
+
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.tile_accesses = tile_accesses
+        self.num_rows = 0
+        self.num_shards = 0
+
+        levels, dims = evaluator.levels, evaluator.dims
+        plan = evaluator.plan
+        self._column_names = {
+            "factor": [f"factor/{level}/{dim}" for level in levels for dim in dims],
+            "permutation": [
+                f"permutation/{level}/{k}" for level in levels for k in range(len(dims))
+            ],
+        }
+        if tile_accesses:
+            self._column_names["access"] = [
+                f"access/{level}/{ds}"
+                for level in plan.levels
+                for ds in plan.dataspaces
+            ]
+
+        # One 2D block per column group plus the structured latencies
+        self._buffer = {
+            "factor": np.empty((chunk_size, len(levels) * len(dims)), dtype=np.int64),
+            "permutation": np.empty(
+                (chunk_size, len(levels) * len(dims)), dtype=np.int8
+            ),
+        }
+        if tile_accesses:
+            self._buffer["access"] = np.empty(
+                (chunk_size, len(plan.levels) * len(plan.dataspaces)), dtype=np.int64
+            )
+        self._latencies = np.empty(chunk_size, dtype=evaluator.result_dtype)
+        self._num_buffered = 0
+
+        # Shard numbers restart at zero, leftovers of a longer run would be
+        # read back with the new shards
+        self.path.mkdir(parents=True, exist_ok=True)
+        for shard in self.path.glob(SHARD_PATTERN):
+            shard.unlink()
+        schema = {
+            "columns": {
+                **{
+                    name: self._buffer[group].dtype.str
+                    for group, names in self._column_names.items()
+                    for name in names
+                },
+                **{
+                    name: self._latencies.dtype[name].str
+                    for name in self._latencies.dtype.names
+                },
+            },
+            "levels": list(levels),
+            "dims": list(dims),
+            "networks": list(evaluator.networks),
+            "dataspaces": list(plan.dataspaces),
+        }
+        (self.path / SCHEMA_FILE).write_text(json.dumps(schema, indent=2))
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(
+        self: Self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write_batch(
+        self: Self,
+        factors: np.ndarray,
+        permutations: np.ndarray,
+        latencies: np.ndarray,
+        tile_accesses: np.ndarray | None = None,
+    ) -> None:
+        # Same layout as `Evaluator.evaluate_batch` and `BatchAnalyzeResult`
+        if self.tile_accesses and tile_accesses is None:
+            err_msg = "Tile accesses are required by this writer"
+            raise ValueError(err_msg)
+
+        num_mappings = len(factors)
+        columns = {
+            "factor": factors.reshape(num_mappings, -1),
+            "permutation": permutations.reshape(num_mappings, -1),
+        }
+        if self.tile_accesses:
+            columns["access"] = tile_accesses.reshape(num_mappings, -1)
+
+        start = 0
+        while start < num_mappings:
+            stop = min(start + self.chunk_size - self._num_buffered, num_mappings)
+            dst = slice(self._num_buffered, self._num_buffered + stop - start)
+            for group, column in columns.items():
+                self._buffer[group][dst] = column[start:stop]
+            self._latencies[dst] = latencies[start:stop]
+            self._num_buffered += stop - start
+
+            start = stop
+            if self._num_buffered == self.chunk_size:
+                self.flush()
+
+    def flush(self: Self) -> None:
+        if not self._num_buffered:
+            return
+
+        num_rows = self._num_buffered
+        columns = {
+            name: self._buffer[group][:num_rows, idx]
+            for group, names in self._column_names.items()
+            for idx, name in enumerate(names)
+        }
+        columns |= {
+            name: self._latencies[name][:num_rows]
+            for name in self._latencies.dtype.names
+        }
+        np.savez(self.path / f"part-{self.num_shards:05d}.npz", **columns)
+
+        self.num_rows += num_rows
+        self.num_shards += 1
+        self._num_buffered = 0
+
+    def close(self: Self) -> None:
+        self.flush()
+
+
+def read_schema(path: Path) -> dict[str, Any]:
+    return json.loads((Path(path) / SCHEMA_FILE).read_text())
+
+
+def iter_results(
+    path: Path, columns: Iterable[str] | None = None
+) -> Iterator[pd.DataFrame]:
+    # Shards are loaded one at a time and only the requested columns are read
+    path = Path(path)
+    names = list(read_schema(path)["columns"] if columns is None else columns)
+    for shard in sorted(path.glob(SHARD_PATTERN)):
+        with np.load(shard) as data:
+            yield pd.DataFrame({name: data[name] for name in names})
+
+
+def load_results(path: Path, columns: Iterable[str] | None = None) -> pd.DataFrame:
+    frames = list(iter_results(path, columns))
+    if not frames:
+        names = read_schema(path)["columns"] if columns is None else columns
+        return pd.DataFrame(columns=list(names))
+    return pd.concat(frames, ignore_index=True)
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import logging
+from collections.abc import Iterable
 from math import prod
-from typing import Any, Self
+from typing import TYPE_CHECKING, Any, Self
 
-from attr import frozen
+import numpy as np
+from attr import field, frozen
 
 from analyzer.dataflow import Dataflow
-from analyzer.IR import Projection, WorkloadConfig
-from analyzer.nest_analysis import NestedLoop
+from analyzer.IR import SPATIAL_AXES, WorkloadConfig
+from analyzer.nest_analysis import Loop, LoopArray, NestedLoop
+from analyzer.profiling import profiled
 from analyzer.utils import get_logger
 
+if TYPE_CHECKING:
+    from analyzer.plan import EvaluationPlan
+
 logger = get_logger()
 
 
 def debug_print(name: str, content: dict[str, dict[str, int]]) -> None:
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
     msg = f"{'-' * 20} {name} {'-' * 20}"
     logger.debug(msg)
     for level, data in content.items():
@@ -22,24 +32,206 @@ def debug_print(name: str, content: dict[str, dict[str, int]]) -> None:
         logger.debug(msg)
 
 
+@frozen
+class TilingOptions:
+    # Compiled plan of the workload, and the dataspaces kept at each
+    # ([mapping,] level, dataspace) of the mapping, None when nothing is bypassed
+    plan: EvaluationPlan | None = None
+    kept: np.ndarray | None = None
+    # Log the tile tables, None checks the logger level
+    debug: bool | None = None
+    # Loops of each spatial level on the X axis, as `split` in a mapping,
+    # indexed by ([mapping,] mapping level). Only batches take them, loop nests
+    # carry the axis of every loop. None puts every spatial loop on X
+    splits: np.ndarray | None = None
+
+
+@profiled("analyze_tiling")
 def analyze_tiling(
     dataflow: Dataflow,
-    nested_loop: NestedLoop,
+    nested_loop: NestedLoop | LoopArray,
     workload: WorkloadConfig,
     workload_type: str,
+    options: TilingOptions | None = None,
 ) -> AnalyzeResult:
+    options = TilingOptions() if options is None else options
+    plan, kept = options.plan, options.kept
+    debug = (
+        logger.isEnabledFor(logging.DEBUG) if options.debug is None else options.debug
+    )
     if workload_type == "MM":
-        return MMAnalyzer(dataflow, nested_loop, workload).get_result()
+        if isinstance(nested_loop, LoopArray):
+            return LoopArrayMMAnalyzer(
+                nested_loop, workload, plan, kept, debug=debug
+            ).get_result()
+        return MMAnalyzer(dataflow, nested_loop, workload, plan, kept).get_result()
+    elif workload_type == "einsum":
+        if isinstance(nested_loop, NestedLoop):
+            nested_loop = LoopArray.create(
+                nested_loop,
+                dataflow.get_levels() if plan is None else plan.levels,
+                get_dims(workload) if plan is None else plan.dims,
+            )
+        return EinsumAnalyzer(
+            nested_loop, workload, plan, kept, debug=debug
+        ).get_result()
     else:
         err_msg = f"Workload type {workload_type} not supported"
         raise NotImplementedError(err_msg)
 
 
+@profiled("analyze_tiling_batch")
+def analyze_tiling_batch(
+    factors: np.ndarray,
+    permutations: np.ndarray,
+    workload_type: str,
+    options: TilingOptions,
+) -> BatchAnalyzeResult:
+    plan = options.plan
+    if plan is None:
+        err_msg = "Batch tile analysis needs a compiled plan"
+        raise ValueError(err_msg)
+    if workload_type == "MM":
+        return BatchMMAnalyzer(
+            plan, factors, permutations, options.kept, options.splits
+        ).get_result()
+    elif workload_type == "einsum":
+        return BatchEinsumAnalyzer(
+            plan, factors, permutations, options.kept, options.splits
+        ).get_result()
+    else:
+        err_msg = f"Workload type {workload_type} not supported"
+        raise NotImplementedError(err_msg)
+
+
+def get_projection_counts(
+    projection_elems: dict[str, tuple[frozenset[str], ...]], dims: tuple[str, ...]
+) -> np.ndarray:
+    # Number of projections of each dataspace which contain each dimension
+    projection_counts = np.array(
+        [
+            [sum(dim in proj for proj in projs) for dim in dims]
+            for projs in projection_elems.values()
+        ],
+        dtype=np.int64,
+    ).reshape(len(projection_elems), len(dims))
+    projection_counts.flags.writeable = False
+    return projection_counts
+
+
+def get_dims(workload: WorkloadConfig) -> tuple[str, ...]:
+    # Operation dimensions in the order their sizes are listed
+    return tuple(
+        dim
+        for dim in workload.operation_dimension_size
+        if dim in workload.operation_dimensions
+    )
+
+
+def get_projection_matrices(
+    projection_coefficients: dict[str, tuple[dict[str, int], ...]],
+    dims: tuple[str, ...],
+) -> np.ndarray:
+    # Coefficients indexed by (dataspace, axis, dim), padded with empty axes
+    num_axes = max((len(axes) for axes in projection_coefficients.values()), default=0)
+    projection_matrices = np.zeros(
+        (len(projection_coefficients), num_axes, len(dims)), dtype=np.int64
+    )
+    for ds_idx, axes in enumerate(projection_coefficients.values()):
+        for axis_idx, axis in enumerate(axes):
+            for dim, coef in axis.items():
+                projection_matrices[ds_idx, axis_idx, dims.index(dim)] = coef
+    projection_matrices.flags.writeable = False
+    return projection_matrices
+
+
+def calc_tile_size(axes: tuple[dict[str, int], ...], dim_sizes: dict[str, int]) -> int:
+    return prod(
+        1 + sum(coef * (dim_sizes[dim] - 1) for dim, coef in axis.items())
+        for axis in axes
+    )
+
+
+def calc_tile_sizes(
+    dim_sizes: np.ndarray, projection_matrices: np.ndarray
+) -> np.ndarray:
+    # `dim_sizes` is indexed by (..., dim) and the result by (..., dataspace)
+    num_dataspaces, num_axes, num_dims = projection_matrices.shape
+    extents = 1 + (dim_sizes - 1) @ projection_matrices.reshape(-1, num_dims).T
+    return np.prod(
+        extents.reshape(*dim_sizes.shape[:-1], num_dataspaces, num_axes), axis=-1
+    )
+
+
+def calc_mm_tile_sizes(
+    dim_sizes: np.ndarray, projection_counts: np.ndarray
+) -> np.ndarray:
+    # Same layout as `calc_tile_sizes`, every projection spans the product of
+    # its dims
+    return np.prod(dim_sizes[..., None, :] ** projection_counts, axis=-1)
+
+
+def forward_bypassed_accesses(
+    tile_accesses: np.ndarray, kept: np.ndarray, levels: tuple[str, ...]
+) -> np.ndarray:
+    # Arrays are indexed by ([mapping,] level, dataspace). A storage bypassing
+    # a dataspace receives nothing and the levels above it carry the accesses
+    # of the next level keeping it. Spatial levels follow the storage below.
+    owners = [
+        next(
+            idx
+            for idx in range(lvl_idx, len(levels))
+            if not levels[idx].endswith("_spatial")
+        )
+        for lvl_idx in range(len(levels))
+    ]
+    owner_kept = kept[..., owners, :]
+
+    tile_accesses = tile_accesses.copy()
+    for lvl_idx in range(len(levels) - 2, -1, -1):
+        tile_accesses[..., lvl_idx, :] = np.where(
+            owner_kept[..., lvl_idx, :],
+            tile_accesses[..., lvl_idx, :],
+            tile_accesses[..., lvl_idx + 1, :],
+        )
+    return np.where(kept, tile_accesses, 0)
+
+
+def get_bypassed_dataspaces(
+    kept: np.ndarray, levels: tuple[str, ...], dataspaces: tuple[str, ...]
+) -> dict[str, frozenset[str]]:
+    return {
+        level: frozenset(
+            ds for ds, ds_kept in zip(dataspaces, lvl_kept, strict=True) if not ds_kept
+        )
+        for level, lvl_kept in zip(levels, kept.tolist(), strict=True)
+        if not all(lvl_kept)
+    }
+
+
+def calc_tile_sharing(
+    level_loops: Iterable[Loop], related_dims: dict[str, frozenset[str]]
+) -> dict[str, tuple[int, ...]]:
+    # Spatial instances along each axis which need the same tile, i.e. the
+    # product of the spatial loops over dims unrelated to the dataspace
+    tile_sharing = {ds: [1] * len(SPATIAL_AXES) for ds in related_dims}
+    for loop in level_loops:
+        axis_idx = SPATIAL_AXES.index(loop.axis or SPATIAL_AXES[0])
+        for ds, ds_related_dims in related_dims.items():
+            if loop.dim not in ds_related_dims:
+                tile_sharing[ds][axis_idx] *= loop.factor
+    return {ds: tuple(sharing) for ds, sharing in tile_sharing.items()}
+
+
 @frozen
 class AnalyzeResult:
     tile_sizes: dict[str, dict[str, int]]
     tile_iterations: dict[str, dict[str, int]]
     tile_accesses: dict[str, dict[str, int]]
+    # Only spatial levels, sharing instances per spatial axis
+    tile_sharing: dict[str, dict[str, tuple[int, ...]]] = field(factory=dict)
+    # Only levels not storing some dataspaces
+    bypassed: dict[str, frozenset[str]] = field(factory=dict)
 
     @classmethod
     def create(cls: type[AnalyzeResult], **kwargs: Any) -> AnalyzeResult:
@@ -47,30 +239,78 @@ class AnalyzeResult:
 
 
 class MMAnalyzer:
+    @profiled("MMAnalyzer")
     def __init__(
         self: Self,
         dataflow: Dataflow,
         nested_loop: NestedLoop,
         workload: WorkloadConfig,
+        plan: EvaluationPlan | None = None,
+        kept: np.ndarray | None = None,
     ) -> None:
+        if plan is None:
+            levels = dataflow.get_levels()
+            projection_elems = workload.get_projection_elems()
+        else:
+            levels = plan.levels
+            projection_elems = plan.projection_elems
+        dataspaces = tuple(projection_elems)
+
         self._dim_sizes = self.__calc_dim_sizes(
-            nested_loop, workload.operation_dimensions, dataflow.get_levels()
-        )
-        self.tile_sizes = self.__calc_tile_sizes(
-            workload.dataspaces_projections, dataflow.get_levels()
+            nested_loop, workload.operation_dimensions, levels
         )
+        self.tile_sizes = self.__calc_tile_sizes(projection_elems, levels)
         self.tile_iterations = self.__calc_tile_iterations(
-            nested_loop, workload.dataspaces_projections, dataflow.get_levels()
+            nested_loop, projection_elems, levels
+        )
+        self.tile_accesses = self.__calc_tile_accesses(levels)
+        self.tile_sharing = self.__calc_tile_sharing(
+            nested_loop, projection_elems, levels
         )
-        self.tile_accesses = self.__calc_tile_accesses(dataflow.get_levels())
+
+        self.bypassed = {}
+        if kept is not None:
+            tile_accesses = forward_bypassed_accesses(
+                np.array([
+                    [self.tile_accesses[level][ds] for ds in dataspaces]
+                    for level in levels
+                ]),
+                kept,
+                levels,
+            )
+            self.tile_accesses = {
+                level: dict(zip(dataspaces, row, strict=True))
+                for level, row in zip(levels, tile_accesses.tolist(), strict=True)
+            }
+            self.bypassed = get_bypassed_dataspaces(kept, levels, dataspaces)
 
     def get_result(self: Self) -> AnalyzeResult:
         return AnalyzeResult.create(
             tile_sizes=self.tile_sizes,
             tile_iterations=self.tile_iterations,
             tile_accesses=self.tile_accesses,
+            tile_sharing=self.tile_sharing,
+            bypassed=self.bypassed,
         )
 
+    @staticmethod
+    def __calc_tile_sharing(
+        nested_loop: NestedLoop,
+        dataspaces: dict[str, tuple[frozenset[str], ...]],
+        levels: tuple[str],
+    ) -> dict[str, dict[str, tuple[int, ...]]]:
+        related_proj_elems = {
+            tile_name: frozenset().union(*tile_projs)
+            for tile_name, tile_projs in dataspaces.items()
+        }
+        return {
+            level: calc_tile_sharing(
+                nested_loop.get_level_loops(level).values(), related_proj_elems
+            )
+            for level in levels
+            if level.endswith("_spatial")
+        }
+
     @staticmethod
     def __calc_dim_sizes(
         nested_loop: NestedLoop, dims: set[str], levels: tuple[str]
@@ -92,11 +332,11 @@ class MMAnalyzer:
 
     def __calc_tile_sizes(
         self: Self,
-        dataspaces: dict[str, list[Projection]],
+        dataspaces: dict[str, tuple[frozenset[str], ...]],
         levels: tuple[str],
     ) -> dict[str, dict[str, int]]:
-        def proj_size(proj: Projection, level_dim_sizes: dict[str, int]) -> int:
-            return prod(level_dim_sizes[elem] for elem in proj.get_all_proj_elem())
+        def proj_size(proj: frozenset[str], level_dim_sizes: dict[str, int]) -> int:
+            return prod(level_dim_sizes[elem] for elem in proj)
 
         tile_sizes = {}
         for level in levels:
@@ -112,9 +352,14 @@ class MMAnalyzer:
     @staticmethod
     def __calc_tile_iterations(
         nested_loop: NestedLoop,
-        dataspaces: dict[str, list[Projection]],
+        dataspaces: dict[str, tuple[frozenset[str], ...]],
         levels: tuple[str],
     ) -> dict[str, dict[str, int]]:
+        related_proj_elems = {
+            tile_name: frozenset().union(*tile_projs)
+            for tile_name, tile_projs in dataspaces.items()
+        }
+
         tile_iterations: dict[str, dict[str, int]] = {}
         for level in levels:
             higher_lvl_loops = (
@@ -124,14 +369,10 @@ class MMAnalyzer:
             )
 
             lvl_tile_iterations: dict[str, int] = {}
-            for tile_name, tile_projs in dataspaces.items():
-                related_proj_elems = {
-                    elem for proj in tile_projs for elem in proj.get_all_proj_elem()
-                }
-
+            for tile_name, tile_related_elems in related_proj_elems.items():
                 ignore_idx = 0
                 for r_idx, loop in enumerate(reversed(higher_lvl_loops)):
-                    if loop.dim in related_proj_elems and loop.factor != 1:
+                    if loop.dim in tile_related_elems and loop.factor != 1:
                         ignore_idx = len(higher_lvl_loops) - r_idx
                         break
 
@@ -156,3 +397,298 @@ class MMAnalyzer:
 
         debug_print("Tile accesses", tile_accesses)
         return tile_accesses
+
+
+class LoopArrayMMAnalyzer:
+    def __init__(
+        self: Self,
+        loop_array: LoopArray,
+        workload: WorkloadConfig,
+        plan: EvaluationPlan | None = None,
+        kept: np.ndarray | None = None,
+        *,
+        debug: bool = False,
+    ) -> None:
+        if plan is None:
+            projection_elems = workload.get_projection_elems()
+            projection_counts = get_projection_counts(projection_elems, loop_array.dims)
+        else:
+            projection_elems = plan.projection_elems
+            projection_counts = plan.projection_counts
+
+        self._projection_counts = projection_counts
+
+        # Arrays are indexed by (level, dataspace)
+        dim_sizes = loop_array.get_dim_sizes()
+        tile_sizes = self._calc_tile_sizes(dim_sizes)
+        tile_iterations = loop_array.get_tile_iterations(projection_counts > 0)
+
+        tile_accesses = tile_sizes * tile_iterations
+
+        levels, dataspaces = loop_array.levels, tuple(projection_elems)
+        self.bypassed = {}
+        if kept is not None:
+            tile_accesses = forward_bypassed_accesses(tile_accesses, kept, levels)
+            self.bypassed = get_bypassed_dataspaces(kept, levels, dataspaces)
+
+        self.tile_sizes = self.__to_dict(tile_sizes, levels, dataspaces)
+        self.tile_iterations = self.__to_dict(tile_iterations, levels, dataspaces)
+        self.tile_accesses = self.__to_dict(tile_accesses, levels, dataspaces)
+
+        if debug:
+            debug_print("Tile sizes", self.tile_sizes)
+            debug_print("Tile iterations", self.tile_iterations)
+            debug_print("Tile accesses", self.tile_accesses)
+
+        self.tile_sharing = self._calc_tile_sharing(
+            loop_array, projection_counts, dataspaces
+        )
+
+    def get_result(self: Self) -> AnalyzeResult:
+        return AnalyzeResult.create(
+            tile_sizes=self.tile_sizes,
+            tile_iterations=self.tile_iterations,
+            tile_accesses=self.tile_accesses,
+            tile_sharing=self.tile_sharing,
+            bypassed=self.bypassed,
+        )
+
+    def _calc_tile_sizes(self: Self, dim_sizes: np.ndarray) -> np.ndarray:
+        # `dim_sizes` is indexed by (level, dim) and the result by (level, tile)
+        return calc_mm_tile_sizes(dim_sizes, self._projection_counts)
+
+    @staticmethod
+    def _calc_tile_sharing(
+        loop_array: LoopArray,
+        projection_counts: np.ndarray,
+        dataspaces: tuple[str, ...],
+    ) -> dict[str, dict[str, tuple[int, ...]]]:
+        # Same as `calc_tile_sharing` straight from the loop arrays
+        level_start = loop_array.level_start.tolist()
+        dim_ids, factors = loop_array.dim_ids.tolist(), loop_array.factors.tolist()
+        axis_ids = loop_array.axis_ids.tolist()
+        unrelated = (projection_counts == 0).T.tolist()
+
+        tile_sharing = {}
+        for lvl_idx, level in enumerate(loop_array.levels):
+            if not level.endswith("_spatial"):
+                continue
+            sharing = [[1] * len(SPATIAL_AXES) for _ in dataspaces]
+            for loop_idx in range(level_start[lvl_idx], level_start[lvl_idx + 1]):
+                axis_idx = axis_ids[loop_idx]
+                for ds_idx, is_unrelated in enumerate(unrelated[dim_ids[loop_idx]]):
+                    if is_unrelated:
+                        sharing[ds_idx][axis_idx] *= factors[loop_idx]
+            tile_sharing[level] = {
+                ds: tuple(ds_sharing)
+                for ds, ds_sharing in zip(dataspaces, sharing, strict=True)
+            }
+        return tile_sharing
+
+    @staticmethod
+    def __to_dict(
+        array: np.ndarray, levels: tuple[str, ...], dataspaces: tuple[str, ...]
+    ) -> dict[str, dict[str, int]]:
+        return {
+            level: dict(zip(dataspaces, row, strict=True))
+            for level, row in zip(levels, array.tolist(), strict=True)
+        }
+
+
+@frozen
+class BatchAnalyzeResult:
+    # Arrays are indexed by (mapping, level, dataspace)
+    levels: tuple[str, ...]
+    dataspaces: tuple[str, ...]
+    tile_sizes: np.ndarray
+    tile_iterations: np.ndarray
+    tile_accesses: np.ndarray
+    # Indexed by (mapping, level, dataspace, spatial axis)
+    tile_sharing: np.ndarray
+    # Indexed by ([mapping,] level, dataspace), None if everything is kept
+    kept: np.ndarray | None = None
+
+    @classmethod
+    def create(cls: type[BatchAnalyzeResult], **kwargs: Any) -> BatchAnalyzeResult:
+        return cls(**kwargs)
+
+    def __len__(self: Self) -> int:
+        return len(self.tile_accesses)
+
+
+class BatchMMAnalyzer:
+    """Evaluate N mappings of the same workload at once.
+
+    `factors[n, l, d]` is the factor of dimension `plan.dims[d]` at mapping level `l`
+    and `permutations[n, l, k]` is the dimension index of the k-th loop (outer
+    to inner) at that level. Mapping levels are the dataflow levels without the
+    last (compute) level. The first `splits[n, l]` loops of a spatial level are
+    on the X axis and the others on Y, without splits they are all on X.
+    """
+
+    def __init__(
+        self: Self,
+        plan: EvaluationPlan,
+        factors: np.ndarray,
+        permutations: np.ndarray,
+        kept: np.ndarray | None = None,
+        splits: np.ndarray | None = None,
+    ) -> None:
+        self._levels = plan.levels
+        self._dataspaces = plan.dataspaces
+        self._proj_counts = plan.projection_counts
+
+        factors = np.asarray(factors, dtype=np.int64)
+        permutations = np.asarray(permutations, dtype=np.intp)
+        expected_shape = (len(plan.mapping_levels), len(plan.dims))
+        if factors.shape[1:] != expected_shape:
+            err_msg = (
+                f"Factors must have shape (N, {expected_shape[0]}, {len(plan.dims)})"
+            )
+            raise ValueError(err_msg)
+        if permutations.shape != factors.shape:
+            err_msg = "Permutations must have the same shape as factors"
+            raise ValueError(err_msg)
+
+        self._dim_sizes = self.__calc_dim_sizes(factors)
+        self.tile_sizes = self._calc_tile_sizes(plan)
+        self.tile_iterations = self.__calc_tile_iterations(factors, permutations)
+        self.tile_accesses = self.tile_sizes * self.tile_iterations
+        self.tile_sharing = self.__calc_tile_sharing(factors, permutations, splits)
+
+        self.kept = kept
+        if kept is not None:
+            self.tile_accesses = forward_bypassed_accesses(
+                self.tile_accesses, kept, self._levels
+            )
+
+    def get_result(self: Self) -> BatchAnalyzeResult:
+        return BatchAnalyzeResult.create(
+            levels=self._levels,
+            dataspaces=self._dataspaces,
+            tile_sizes=self.tile_sizes,
+            tile_iterations=self.tile_iterations,
+            tile_accesses=self.tile_accesses,
+            tile_sharing=self.tile_sharing,
+            kept=self.kept,
+        )
+
+    @staticmethod
+    def __calc_dim_sizes(factors: np.ndarray) -> np.ndarray:
+        num_mappings, num_mapping_levels, num_dims = factors.shape
+        dim_sizes = np.ones(
+            (num_mappings, num_mapping_levels + 1, num_dims), dtype=np.int64
+        )
+        dim_sizes[:, :-1] = np.cumprod(factors[:, ::-1], axis=1)[:, ::-1]
+        return dim_sizes
+
+    def __calc_tile_sharing(
+        self: Self,
+        factors: np.ndarray,
+        permutations: np.ndarray,
+        splits: np.ndarray | None,
+    ) -> np.ndarray:
+        num_mappings, num_mapping_levels, _ = factors.shape
+        spatial = np.array(
+            [level.endswith("_spatial") for level in self._levels[:-1]], dtype=bool
+        )
+        unrelated = self._proj_counts == 0
+
+        tile_sharing = np.ones(
+            (
+                num_mappings,
+                num_mapping_levels + 1,
+                len(self._dataspaces),
+                len(SPATIAL_AXES),
+            ),
+            dtype=np.int64,
+        )
+        if splits is None:
+            # Every spatial loop is on the X axis
+            tile_sharing[:, :-1, :, 0] = np.where(
+                spatial[None, :, None],
+                np.prod(np.where(unrelated, factors[:, :, None, :], 1), axis=-1),
+                1,
+            )
+            return tile_sharing
+
+        # Dims on each axis, indexed by (mapping, level, axis, dim), from the
+        # position of each dim in the permutation of its level
+        on_y = np.argsort(permutations, axis=-1) >= np.asarray(splits)[..., None]
+        on_axis = np.stack((~on_y, on_y), axis=-2)
+        shared = (
+            spatial[None, :, None, None, None]
+            & unrelated[None, None, :, None, :]
+            & on_axis[:, :, None]
+        )
+        tile_sharing[:, :-1] = np.prod(
+            np.where(shared, factors[:, :, None, None, :], 1), axis=-1
+        )
+        return tile_sharing
+
+    def _calc_tile_sizes(self: Self, plan: EvaluationPlan) -> np.ndarray:
+        return calc_mm_tile_sizes(self._dim_sizes, self._proj_counts)
+
+    def __calc_tile_iterations(
+        self: Self, factors: np.ndarray, permutations: np.ndarray
+    ) -> np.ndarray:
+        num_mappings, _, num_dims = factors.shape
+
+        # Flatten the loop nest from outer to inner
+        loop_dims = permutations.reshape(num_mappings, -1)
+        loop_factors = np.take_along_axis(factors, permutations, axis=2).reshape(
+            num_mappings, -1
+        )
+
+        related = (self._proj_counts > 0).T[loop_dims] & (loop_factors > 1)[..., None]
+        loop_pos = np.arange(loop_dims.shape[1])[None, :, None]
+        last_related = np.maximum.accumulate(np.where(related, loop_pos, -1), axis=1)
+
+        # The loops above level `l` end at position `l * num_dims - 1`
+        lvl_last_related = np.concatenate(
+            (
+                np.full((num_mappings, 1, len(self._dataspaces)), -1),
+                last_related[:, num_dims - 1 :: num_dims],
+            ),
+            axis=1,
+        )
+
+        cum_factors = np.ones((num_mappings, loop_factors.shape[1] + 1), np.int64)
+        cum_factors[:, 1:] = np.cumprod(loop_factors, axis=1)
+        return cum_factors[np.arange(num_mappings)[:, None, None], lvl_last_related + 1]
+
+
+class EinsumAnalyzer(LoopArrayMMAnalyzer):
+    """Tile analysis of any workload described by its projections.
+
+    Each projection axis of a dataspace spans `1 + sum(coef * (size - 1))`
+    elements over its dims, which covers sliding windows and strides. With a
+    single dim per axis it is the same as `LoopArrayMMAnalyzer`.
+    """
+
+    def __init__(
+        self: Self,
+        loop_array: LoopArray,
+        workload: WorkloadConfig,
+        plan: EvaluationPlan | None = None,
+        kept: np.ndarray | None = None,
+        *,
+        debug: bool = False,
+    ) -> None:
+        self._projection_matrices = (
+            get_projection_matrices(
+                workload.get_projection_coefficients(), loop_array.dims
+            )
+            if plan is None
+            else plan.projection_matrices
+        )
+        super().__init__(loop_array, workload, plan, kept, debug=debug)
+
+    def _calc_tile_sizes(self: Self, dim_sizes: np.ndarray) -> np.ndarray:
+        return calc_tile_sizes(dim_sizes, self._projection_matrices)
+
+
+class BatchEinsumAnalyzer(BatchMMAnalyzer):
+    # Same projection model as `EinsumAnalyzer`
+    def _calc_tile_sizes(self: Self, plan: EvaluationPlan) -> np.ndarray:
+        return calc_tile_sizes(self._dim_sizes, plan.projection_matrices)
@@ -1,15 +1,48 @@
 import logging
+import os
+from pathlib import Path
+from typing import Any
 
+import yaml
 from rich.logging import RichHandler
 
+# The libyaml bindings are much faster but optional
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
 
-def set_logger() -> None:
-    logger = logging.getLogger("main")
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(RichHandler())
+LOGGER_NAME = "main"
+
+
+def set_logger(level: int | str = logging.DEBUG, *, rich: bool = True) -> None:
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    for handler in logger.handlers.copy():
+        logger.removeHandler(handler)
+    logger.addHandler(RichHandler() if rich else logging.StreamHandler())
+
+
+def set_production_mode() -> None:
+    # Only warnings and errors, rendered without Rich
+    set_logger(logging.WARNING, rich=False)
+
+
+def load_yaml(path: Path) -> Any:
+    with Path(path).open(encoding="utf-8") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def dump_yaml(data: Any, path: Path) -> None:
+    with Path(path).open("w", encoding="utf-8") as f:
+        yaml.dump(data, f, Dumper=SafeDumper, sort_keys=False)
 
 
 def get_logger() -> logging.Logger:
-    if "main" not in logging.Logger.manager.loggerDict:
-        set_logger()
-    return logging.getLogger("main")
+    if LOGGER_NAME not in logging.Logger.manager.loggerDict:
+        if os.environ.get("ANALYZER_PRODUCTION"):
+            set_production_mode()
+        else:
+            set_logger(os.environ.get("ANALYZER_LOG_LEVEL", logging.DEBUG))
+    return logging.getLogger(LOGGER_NAME)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from analyzer import utils
+from analyzer.api import Evaluator
+from analyzer.mapper import MapSpace
+from analyzer.utils import load_yaml
+
+INPUT_DIR = Path(__file__).parents[1] / "inputs"
+
+# Strided convolution, its input axes span several dims
+CONV_WORKLOAD = {
+    "workload": {
+        "shape": {
+            "operation_dimensions": ["N", "K", "C", "P", "Q", "R", "S"],
+            "coefficient": {"Wstride": 2},
+        },
+        "dataspaces": {
+            "Weights": {"projection": [[["K"]], [["C"]], [["R"]], [["S"]]]},
+            "Inputs": {
+                "projection": [
+                    [["N"]],
+                    [["C"]],
+                    [["Wstride", "P"], ["R"]],
+                    [["Q"], ["S"]],
+                ]
+            },
+            "Outputs": {
+                "projection": [[["N"]], [["K"]], [["P"]], [["Q"]]],
+                "read_write": True,
+            },
+        },
+        "operation_dimension_size": {
+            "N": 2,
+            "K": 16,
+            "C": 8,
+            "P": 8,
+            "Q": 4,
+            "R": 3,
+            "S": 2,
+        },
+    }
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _production_logging() -> None:
+    utils.set_production_mode()
+
+
+@pytest.fixture(scope="session")
+def architecture() -> dict[str, Any]:
+    return load_yaml(INPUT_DIR / "architecture.yml")
+
+
+@pytest.fixture(scope="session")
+def mm_workload() -> dict[str, Any]:
+    return load_yaml(INPUT_DIR / "workload.yml")
+
+
+@pytest.fixture(scope="session")
+def tiny_workload(mm_workload: dict[str, Any]) -> dict[str, Any]:
+    # Small enough to enumerate every mapping
+    workload = {"workload": dict(mm_workload["workload"])}
+    workload["workload"]["operation_dimension_size"] = {
+        "BatchSize": 2,
+        "NumInputFeature": 4,
+        "NumOutputFeature": 2,
+    }
+    return workload
+
+
+@pytest.fixture(scope="session")
+def mm_evaluator(
+    mm_workload: dict[str, Any], architecture: dict[str, Any]
+) -> Evaluator:
+    return Evaluator.create(mm_workload, architecture)
+
+
+@pytest.fixture(scope="session")
+def conv_evaluator(architecture: dict[str, Any]) -> Evaluator:
+    return Evaluator.create(CONV_WORKLOAD, architecture, "einsum")
+
+
+@pytest.fixture(scope="session")
+def tiny_evaluator(
+    tiny_workload: dict[str, Any], architecture: dict[str, Any]
+) -> Evaluator:
+    return Evaluator.create(tiny_workload, architecture)
+
+
+@pytest.fixture(scope="session")
+def sample_mappings() -> Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]:
+    # Legal dim-indexed factors and random loop orders, as `evaluate_batch`
+    # takes them
+    def sample(
+        evaluator: Evaluator, num_mappings: int, seed: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        mapspace = MapSpace.create(evaluator)
+        rng = np.random.default_rng(seed)
+        factors = np.stack([mapspace.sample_factors(rng) for _ in range(num_mappings)])
+        permutations = np.argsort(rng.random(factors.shape), axis=-1)
+        return factors, permutations
+
+    return sample
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import copy
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pytest
+
+from analyzer.api import Evaluator, EvaluatorOptions
+from analyzer.incremental import IncrementalEvaluator
+from analyzer.mapper import MapSpace
+from analyzer.mapper.factorization import get_prime_factors
+from analyzer.nest_analysis import LoopArray, NestedLoop
+from analyzer.network import Network
+from analyzer.tile_analysis import TilingOptions, analyze_tiling
+
+type Sampler = Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]
+type Mapping = tuple[tuple[tuple[int, ...], ...], tuple[tuple[str, ...], ...]]
+
+KEEP_PROBABILITY = 0.7
+REORDER_PROBABILITY = 0.5
+# Deep enough on-chip buffers to double buffer the tiles of most mappings
+BUFFER_DEPTH_SCALE = 64
+
+
+def to_mappings(
+    evaluator: Evaluator, factors: np.ndarray, permutations: np.ndarray
+) -> list[Mapping]:
+    mapspace = MapSpace.create(evaluator)
+    return [
+        mapspace.to_mapping(mapping_factors, mapping_permutations)
+        for mapping_factors, mapping_permutations in zip(
+            factors, permutations, strict=True
+        )
+    ]
+
+
+def reference_networks(
+    evaluator: Evaluator,
+    mapping: Mapping,
+    workload_type: str = "MM",
+    kept: np.ndarray | None = None,
+    splits: np.ndarray | None = None,
+) -> dict[str, int]:
+    # The original pipeline: mapping config, `NestedLoop` and `MMAnalyzer`
+    nested_loop = NestedLoop.create(
+        evaluator.dataflow, evaluator.create_mapping(*mapping, splits=splits)
+    )
+    result = analyze_tiling(
+        evaluator.dataflow,
+        nested_loop,
+        evaluator.workload,
+        workload_type,
+        TilingOptions(kept=kept),
+    )
+    return {
+        name: Network.create(
+            network, evaluator.arch, evaluator.workload
+        ).evaluate_latency(result)
+        for name, network in evaluator.arch.network.items()
+    }
+
+
+def sample_kept(evaluator: Evaluator, num_mappings: int, seed: int) -> np.ndarray:
+    # Random bypasses of the storage levels below the outermost one
+    plan = evaluator.plan
+    rng = np.random.default_rng(seed)
+    kept = (
+        rng.random((num_mappings, len(plan.levels), len(plan.dataspaces)))
+        < KEEP_PROBABILITY
+    )
+    kept[:, [0, *plan.spatial_level_idx, len(plan.levels) - 1]] = True
+    return kept
+
+
+def test_scalar_matches_reference(
+    mm_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    for mapping in to_mappings(mm_evaluator, *sample_mappings(mm_evaluator, 100, 0)):
+        networks = reference_networks(mm_evaluator, mapping)
+        assert mm_evaluator.evaluate_networks(*mapping) == networks
+        assert mm_evaluator.evaluate(*mapping) == sum(networks.values())
+
+
+@pytest.mark.parametrize("evaluator_name", ["mm_evaluator", "conv_evaluator"])
+@pytest.mark.parametrize("latency_model", ["serial", "pipelined"])
+def test_batch_matches_scalar(
+    evaluator_name: str,
+    latency_model: str,
+    sample_mappings: Sampler,
+    request: pytest.FixtureRequest,
+) -> None:
+    base: Evaluator = request.getfixturevalue(evaluator_name)
+    evaluator = Evaluator(
+        base.workload,
+        base.arch,
+        base.workload_type,
+        EvaluatorOptions(latency_model=latency_model),
+        plan=base.plan,
+    )
+    factors, permutations = sample_mappings(evaluator, 100, 1)
+    results = evaluator.evaluate_batch(factors, permutations)
+    for result, mapping in zip(
+        results, to_mappings(evaluator, factors, permutations), strict=True
+    ):
+        assert result["latency"] == evaluator.evaluate(*mapping)
+        for name, latency in evaluator.evaluate_networks(*mapping).items():
+            assert result[name] == latency
+
+
+def test_einsum_matches_mm(
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    mm_evaluator: Evaluator,
+    sample_mappings: Sampler,
+) -> None:
+    einsum_evaluator = Evaluator.create(mm_workload, architecture, "einsum")
+    factors, permutations = sample_mappings(mm_evaluator, 100, 2)
+    np.testing.assert_array_equal(
+        einsum_evaluator.evaluate_batch(factors, permutations),
+        mm_evaluator.evaluate_batch(factors, permutations),
+    )
+    for mapping in to_mappings(mm_evaluator, factors, permutations):
+        assert einsum_evaluator.evaluate(*mapping) == mm_evaluator.evaluate(*mapping)
+
+
+def test_einsum_nested_loop_matches_loop_array(
+    conv_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    mappings = to_mappings(conv_evaluator, *sample_mappings(conv_evaluator, 50, 3))
+    for mapping in mappings:
+        assert reference_networks(
+            conv_evaluator, mapping, "einsum"
+        ) == conv_evaluator.evaluate_networks(*mapping)
+
+
+def test_cache_matches_uncached(
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    mm_evaluator: Evaluator,
+    sample_mappings: Sampler,
+) -> None:
+    cached_evaluator = Evaluator.create(
+        mm_workload, architecture, options=EvaluatorOptions(cache_size=16)
+    )
+    mappings = to_mappings(mm_evaluator, *sample_mappings(mm_evaluator, 100, 4))
+    for factors, permutations in mappings:
+        # Moving the unit loops first changes the mapping but not its cache key
+        moved_factors, moved_permutations = [], []
+        for lvl_factors, lvl_perm in zip(factors, permutations, strict=True):
+            loops = sorted(
+                zip(lvl_factors, lvl_perm, strict=True), key=lambda loop: loop[0] > 1
+            )
+            moved_factors.append([factor for factor, _ in loops])
+            moved_permutations.append([dim for _, dim in loops])
+
+        assert cached_evaluator.evaluate(
+            factors, permutations
+        ) == mm_evaluator.evaluate(factors, permutations)
+        assert cached_evaluator.evaluate(
+            moved_factors, moved_permutations
+        ) == mm_evaluator.evaluate(moved_factors, moved_permutations)
+    assert cached_evaluator.cache.hits == len(mappings)
+
+
+def test_bypass_matches_reference(
+    mm_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    factors, permutations = sample_mappings(mm_evaluator, 100, 5)
+    kept = sample_kept(mm_evaluator, len(factors), 5)
+    results = mm_evaluator.evaluate_batch(factors, permutations, kept)
+    mappings = to_mappings(mm_evaluator, factors, permutations)
+    for result, mapping, mapping_kept in zip(results, mappings, kept, strict=True):
+        networks = reference_networks(mm_evaluator, mapping, kept=mapping_kept)
+        assert mm_evaluator.evaluate_networks(*mapping, mapping_kept) == networks
+        for name, latency in networks.items():
+            assert result[name] == latency
+
+
+def test_unicast_matches_reference(
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    sample_mappings: Sampler,
+) -> None:
+    # Shared tiles are sent once per instance along the X axis
+    unicast_architecture = copy.deepcopy(architecture)
+    for network in unicast_architecture["architecture"]["network"]:
+        network["attributes"]["multicast"] = ["y"]
+    evaluator = Evaluator.create(mm_workload, unicast_architecture)
+    multicast_evaluator = Evaluator.create(mm_workload, architecture)
+
+    factors, permutations = sample_mappings(evaluator, 100, 12)
+    results = evaluator.evaluate_batch(factors, permutations)
+    multicast_latencies = multicast_evaluator.evaluate_batch(factors, permutations)
+    assert (results["latency"] >= multicast_latencies["latency"]).all()
+    assert (results["latency"] > multicast_latencies["latency"]).any()
+    mappings = to_mappings(evaluator, factors, permutations)
+    for result, mapping in zip(results, mappings, strict=True):
+        networks = reference_networks(evaluator, mapping)
+        assert evaluator.evaluate_networks(*mapping) == networks
+        assert result["latency"] == sum(networks.values())
+
+
+@pytest.mark.parametrize("workload_type", ["MM", "einsum"])
+def test_capacity_batch_matches_scalar(
+    workload_type: str, conv_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    # Both checks count the tiles the analyzers of the workload type see
+    evaluator = Evaluator(
+        conv_evaluator.workload,
+        conv_evaluator.arch,
+        workload_type,
+        plan=conv_evaluator.plan,
+    )
+    factors, permutations = sample_mappings(evaluator, 100, 6)
+    codes = evaluator.check_capacity_batch(factors)
+    mappings = to_mappings(evaluator, factors, permutations)
+    for code, mapping in zip(codes, mappings, strict=True):
+        assert evaluator.check_capacity(*mapping) == code
+        tile_sizes = evaluator.analyze(*mapping).tile_sizes
+        assert code == sum(
+            1 << buffer.level_idx
+            for buffer in evaluator.plan.buffers
+            if sum(tile_sizes[evaluator.plan.levels[buffer.level_idx]].values())
+            > buffer.capacity
+        )
+
+
+@pytest.mark.parametrize(
+    ("evaluator_name", "workload_type"),
+    [("mm_evaluator", "MM"), ("conv_evaluator", "MM"), ("conv_evaluator", "einsum")],
+)
+@pytest.mark.parametrize("bypass", [False, True])
+def test_incremental_matches_full(
+    evaluator_name: str,
+    workload_type: str,
+    bypass: bool,
+    sample_mappings: Sampler,
+    request: pytest.FixtureRequest,
+) -> None:
+    base_evaluator: Evaluator = request.getfixturevalue(evaluator_name)
+    evaluator = Evaluator(
+        base_evaluator.workload,
+        base_evaluator.arch,
+        workload_type,
+        plan=base_evaluator.plan,
+    )
+    incremental = IncrementalEvaluator(evaluator)
+    rng = np.random.default_rng(7)
+    factors, permutations = sample_mappings(evaluator, 1, 7)
+    factors, permutations = factors[0], permutations[0]
+    kept = sample_kept(evaluator, 1, 7)[0] if bypass else None
+    num_levels, num_dims = factors.shape
+
+    def evaluate(lvl_idx: int) -> int:
+        return incremental.update(
+            lvl_idx, factors[lvl_idx, permutations[lvl_idx]], permutations[lvl_idx]
+        )
+
+    with pytest.raises(RuntimeError, match="reset"):
+        evaluate(0)
+    assert incremental.reset(
+        np.take_along_axis(factors, permutations, axis=1), permutations, kept
+    ) == evaluator.evaluate(
+        np.take_along_axis(factors, permutations, axis=1), permutations, kept
+    )
+    for _ in range(200):
+        if rng.random() < REORDER_PROBABILITY:
+            # Reorder the loops of one level
+            lvl_idx = int(rng.integers(num_levels))
+            permutations[lvl_idx] = rng.permutation(num_dims)
+            changed = [lvl_idx]
+        else:
+            # Move a prime factor of one dim to another level
+            dim_idx = int(rng.integers(num_dims))
+            src = int(rng.choice(np.flatnonzero(factors[:, dim_idx] > 1)))
+            dst = int(rng.integers(num_levels))
+            prime = get_prime_factors(int(factors[src, dim_idx]))[0][0]
+            factors[src, dim_idx] //= prime
+            factors[dst, dim_idx] *= prime
+            changed = [src, dst]
+
+        for lvl_idx in changed:
+            latency = evaluate(lvl_idx)
+        assert latency == evaluator.evaluate(
+            np.take_along_axis(factors, permutations, axis=1), permutations, kept
+        )
+
+
+@pytest.mark.parametrize("evaluator_name", ["mm_evaluator", "conv_evaluator"])
+@pytest.mark.parametrize("latency_model", ["serial", "pipelined"])
+def test_lower_bound_below_latency(
+    evaluator_name: str,
+    latency_model: str,
+    sample_mappings: Sampler,
+    request: pytest.FixtureRequest,
+) -> None:
+    base: Evaluator = request.getfixturevalue(evaluator_name)
+    evaluator = Evaluator(
+        base.workload,
+        base.arch,
+        base.workload_type,
+        EvaluatorOptions(latency_model=latency_model),
+        plan=base.plan,
+    )
+    for factors, permutations in to_mappings(
+        evaluator, *sample_mappings(evaluator, 100, 8)
+    ):
+        latency = evaluator.evaluate(factors, permutations)
+        for num_fixed in range(len(factors) + 1):
+            assert (
+                evaluator.lower_bound(factors[:num_fixed], permutations[:num_fixed])
+                <= latency
+            )
+
+
+def test_split_matches_reference(
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    sample_mappings: Sampler,
+) -> None:
+    # Loops after the split are on the Y axis, the only one multicasting
+    y_architecture = copy.deepcopy(architecture)
+    for network in y_architecture["architecture"]["network"]:
+        network["attributes"]["multicast"] = ["y"]
+    evaluator = Evaluator.create(mm_workload, y_architecture)
+
+    factors, permutations = sample_mappings(evaluator, 100, 13)
+    rng = np.random.default_rng(13)
+    splits = rng.integers(0, len(evaluator.dims), size=factors.shape[:2])
+    results = evaluator.evaluate_batch(factors, permutations, splits=splits)
+    x_latencies = evaluator.evaluate_batch(factors, permutations)["latency"]
+    assert (results["latency"] != x_latencies).any()
+
+    incremental = IncrementalEvaluator(evaluator)
+    mappings = to_mappings(evaluator, factors, permutations)
+    for result, mapping, mapping_splits in zip(results, mappings, splits, strict=True):
+        mapping_config = evaluator.create_mapping(*mapping, splits=mapping_splits)
+        nested_loop = NestedLoop.create(evaluator.dataflow, mapping_config)
+        loop_arrays = [
+            LoopArray.create(nested_loop, evaluator.plan.levels, evaluator.dims),
+            LoopArray.from_mapping(
+                evaluator.plan.levels, evaluator.dims, *mapping, mapping_splits
+            ),
+        ]
+        for level in evaluator.levels:
+            level_loops = nested_loop.get_level_loops(level)
+            for loop_array in loop_arrays:
+                assert loop_array.get_level_loops(level) == level_loops
+
+        networks = reference_networks(evaluator, mapping, splits=mapping_splits)
+        assert evaluator.evaluate_networks(*mapping, splits=mapping_splits) == networks
+        for name, latency in networks.items():
+            assert result[name] == latency
+        assert incremental.reset(*mapping, splits=mapping_splits) == result["latency"]
+        assert (
+            evaluator.lower_bound(
+                mapping[0][:3], mapping[1][:3], splits=mapping_splits[:3]
+            )
+            <= result["latency"]
+        )
+
+
+def test_pipelined_overlaps_double_buffered_stages(
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    sample_mappings: Sampler,
+) -> None:
+    large_architecture = copy.deepcopy(architecture)
+    for elem in large_architecture["architecture"]["hierarchy"][1:]:
+        if elem.get("class") == "storage":
+            elem["attributes"]["depth"] *= BUFFER_DEPTH_SCALE
+    serial = Evaluator.create(mm_workload, large_architecture)
+    pipelined = Evaluator(
+        serial.workload,
+        serial.arch,
+        serial.workload_type,
+        EvaluatorOptions(latency_model="pipelined"),
+        plan=serial.plan,
+    )
+
+    factors, permutations = sample_mappings(serial, 100, 13)
+    serial_latencies = serial.evaluate_batch(factors, permutations)["latency"]
+    pipelined_latencies = pipelined.evaluate_batch(factors, permutations)["latency"]
+    assert (pipelined_latencies <= serial_latencies).all()
+    assert (pipelined_latencies < serial_latencies).any()
+    mappings = to_mappings(serial, factors, permutations)
+    for latency, mapping in zip(pipelined_latencies, mappings, strict=True):
+        assert pipelined.evaluate(*mapping) == latency
+        assert pipelined.lower_bound(mapping[0][:3], mapping[1][:3]) <= latency
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import itertools
+from collections.abc import Callable
+from math import factorial, prod
+
+import numpy as np
+import pytest
+
+from analyzer.api import Evaluator
+from analyzer.mapper import (
+    BranchAndBound,
+    Candidate,
+    GeneticMapper,
+    GeneticOptions,
+    Mapper,
+    MapSpace,
+)
+from analyzer.mapper.factorization import (
+    FactorizationIndex,
+    get_divisors,
+    get_prime_factors,
+)
+
+type Sampler = Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]
+
+RANGE_SIZE = 200
+
+
+def brute_force_factorizations(
+    size: int, caps: tuple[int | None, ...]
+) -> list[tuple[int, ...]]:
+    divisors = [factor for factor in range(1, size + 1) if size % factor == 0]
+    return [
+        factors
+        for factors in itertools.product(divisors, repeat=len(caps))
+        if prod(factors) == size
+        and all(
+            cap is None or factor <= cap
+            for factor, cap in zip(factors, caps, strict=True)
+        )
+    ]
+
+
+def brute_force_optimum(evaluator: Evaluator) -> int:
+    # Every order of the non-unit loops of every level, the order of unit
+    # loops does not change the mapping
+    mapspace = MapSpace.create(evaluator)
+    best = None
+    for factors in mapspace.iter_factors():
+        level_orders = []
+        for lvl_factors in factors:
+            nonunit = [dim for dim, factor in enumerate(lvl_factors) if factor > 1]
+            unit = [dim for dim, factor in enumerate(lvl_factors) if factor == 1]
+            level_orders.append([
+                (*order, *unit) for order in itertools.permutations(nonunit)
+            ])
+        permutations = np.array(list(itertools.product(*level_orders)))
+        results = evaluator.evaluate_batch(
+            np.broadcast_to(factors, permutations.shape), permutations
+        )
+        latency = int(results["latency"].min())
+        best = latency if best is None else min(best, latency)
+    return best
+
+
+@pytest.mark.parametrize("n", [1, 2, 12, 36, 97, 360, 1024])
+def test_divisors(n: int) -> None:
+    assert get_divisors(n) == tuple(
+        factor for factor in range(1, n + 1) if n % factor == 0
+    )
+    assert prod(prime**exponent for prime, exponent in get_prime_factors(n)) == n
+
+
+@pytest.mark.parametrize(
+    ("size", "caps"),
+    [(1, (None, None)), (24, (None, 4, None, 2)), (36, (None, 2, 3)), (64, (8,) * 3)],
+)
+def test_factorization_index_round_trip(
+    size: int, caps: tuple[int | None, ...]
+) -> None:
+    index = FactorizationIndex(size, caps)
+    factorizations = brute_force_factorizations(size, caps)
+    assert list(index) == factorizations
+    assert len(index) == len(factorizations)
+    for idx in range(len(index)):
+        assert index[idx] == factorizations[idx]
+        assert index.rank(index[idx]) == idx
+
+    with pytest.raises(IndexError):
+        index[len(index)]
+
+
+def test_factorization_index_rejects_invalid() -> None:
+    index = FactorizationIndex(24, (None, 4, None))
+    with pytest.raises(ValueError, match="not allowed"):
+        index.rank((1, 8, 3))
+    with pytest.raises(ValueError, match="multiply"):
+        index.rank((2, 2, 2))
+
+
+def test_mapspace_index(tiny_evaluator: Evaluator) -> None:
+    mapspace = MapSpace.create(tiny_evaluator)
+    caps = tuple(mapspace.fanouts.get(level) for level in mapspace.levels)
+    legal = {
+        combination
+        for combination in itertools.product(
+            *(
+                brute_force_factorizations(mapspace.dim_sizes[dim], caps)
+                for dim in mapspace.dims
+            )
+        )
+        if mapspace.is_legal(np.array(combination).T)
+    }
+    assert mapspace.num_factors == len(legal)
+
+    factors = list(mapspace.iter_factors())
+    assert {tuple(map(tuple, dim_factors.T.tolist())) for dim_factors in factors} == (
+        legal
+    )
+    for idx in range(mapspace.num_factors):
+        np.testing.assert_array_equal(mapspace.get_factors(idx), factors[idx])
+    for start, stop in [(0, 1), (5, 100), (600, mapspace.num_factors + 10)]:
+        np.testing.assert_array_equal(
+            list(mapspace.iter_factors(start, stop)), factors[start:stop]
+        )
+
+    with pytest.raises(IndexError):
+        mapspace.get_factors(mapspace.num_factors)
+
+
+def test_mapspace_ranges(conv_evaluator: Evaluator) -> None:
+    # Ranges anywhere in a large space match random access
+    mapspace = MapSpace.create(conv_evaluator)
+    rng = np.random.default_rng(15)
+    for start in rng.integers(mapspace.num_factors - RANGE_SIZE, size=5).tolist():
+        factors = list(mapspace.iter_factors(start, start + RANGE_SIZE))
+        assert len(factors) == RANGE_SIZE
+        for offset in range(0, RANGE_SIZE, 7):
+            np.testing.assert_array_equal(
+                factors[offset], mapspace.get_factors(start + offset)
+            )
+        for dim_factors in factors:
+            assert mapspace.is_legal(dim_factors)
+            assert dim_factors.prod(axis=0).tolist() == [
+                mapspace.dim_sizes[dim] for dim in mapspace.dims
+            ]
+
+
+@pytest.mark.parametrize("evaluator_name", ["mm_evaluator", "conv_evaluator"])
+def test_level_permutations_cover_all_orders(
+    evaluator_name: str, sample_mappings: Sampler, request: pytest.FixtureRequest
+) -> None:
+    evaluator: Evaluator = request.getfixturevalue(evaluator_name)
+    mapspace = MapSpace.create(evaluator)
+    factors, permutations = sample_mappings(evaluator, 3, 9)
+    num_orders = mapspace.num_level_permutations
+    for mapping_factors, mapping_permutations in zip(
+        factors, permutations, strict=True
+    ):
+        for lvl_idx, lvl_factors in enumerate(mapping_factors):
+            # Every order of the level matches one of the kept orders
+            level_permutations = np.repeat(mapping_permutations[None], num_orders, 0)
+            level_permutations[:, lvl_idx] = mapspace.permutation_table
+            latencies = evaluator.evaluate_batch(
+                np.broadcast_to(mapping_factors, level_permutations.shape),
+                level_permutations,
+            )["latency"]
+            kept = latencies[mapspace.level_permutations(lvl_factors)]
+            assert np.isin(latencies, kept).all()
+            assert len(kept) <= factorial(int((lvl_factors > 1).sum()))
+
+
+def test_mapper_finds_optimum(tiny_evaluator: Evaluator) -> None:
+    optimum = brute_force_optimum(tiny_evaluator)
+    best = Mapper(tiny_evaluator, num_workers=0).run()
+    assert best[0].latency == optimum
+    assert tiny_evaluator.evaluate(best[0].factors, best[0].permutations) == optimum
+    assert Mapper(tiny_evaluator, num_workers=1).run() == best
+
+
+def test_branch_and_bound_finds_optimum(tiny_evaluator: Evaluator) -> None:
+    best = BranchAndBound(tiny_evaluator).run()
+    assert best is not None
+    assert best.latency == brute_force_optimum(tiny_evaluator)
+    assert tiny_evaluator.evaluate(best.factors, best.permutations) == best.latency
+
+
+def test_genetic_mapper_is_seeded(tiny_evaluator: Evaluator) -> None:
+    def run() -> list[Candidate]:
+        return GeneticMapper(
+            tiny_evaluator,
+            GeneticOptions(population_size=32, num_generations=10, seed=0),
+        ).run()
+
+    best = run()
+    assert best == run()
+    assert best[0].latency >= brute_force_optimum(tiny_evaluator)
+    for candidate in best:
+        assert (
+            tiny_evaluator.evaluate(candidate.factors, candidate.permutations)
+            == candidate.latency
+        )
+
+
+def test_genetic_mapper_budgets(conv_evaluator: Evaluator) -> None:
+    # Whole generations are evaluated until the budget is reached
+    options = GeneticOptions(
+        population_size=32, num_generations=100, seed=1, candidate_budget=100
+    )
+    mapper = GeneticMapper(conv_evaluator, options)
+    mapper.run()
+    num_populations = -(-options.candidate_budget // options.population_size)
+    assert mapper.num_evaluated == num_populations * options.population_size
+    assert mapper.num_generations_run == num_populations - 1
+
+    # Overflowing mappings are rejected before evaluation
+    options = GeneticOptions(
+        population_size=32, num_generations=5, seed=1, check_capacity=True
+    )
+    mapper = GeneticMapper(conv_evaluator, options)
+    best = mapper.run()
+    assert mapper.num_rejected > 0
+    assert mapper.num_evaluated + mapper.num_rejected == (
+        (options.num_generations + 1) * options.population_size
+    )
+    for candidate in best:
+        assert (
+            conv_evaluator.check_capacity(candidate.factors, candidate.permutations)
+            == 0
+        )
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from analyzer.api import Evaluator
+from analyzer.mapper import Mapper, MapSpace, SearchOptions
+from analyzer.model import ModelEvaluator
+from analyzer.sink import ResultWriter
+
+type Sampler = Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]
+
+
+@pytest.fixture(scope="module")
+def model(
+    tiny_workload: dict[str, Any], architecture: dict[str, Any]
+) -> ModelEvaluator:
+    # Two layers of the same shape and one of another
+    other = {"workload": dict(tiny_workload["workload"])}
+    other["workload"]["operation_dimension_size"] = {
+        "BatchSize": 4,
+        "NumInputFeature": 2,
+        "NumOutputFeature": 2,
+    }
+    layers = {
+        "first": tiny_workload["workload"],
+        "repeated": tiny_workload["workload"],
+        "other": other["workload"],
+    }
+    return ModelEvaluator.create(layers, architecture)
+
+
+def test_model_evaluates_unique_mappings_once(
+    model: ModelEvaluator, sample_mappings: Sampler, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mappings = {}
+    for seed, name in enumerate(["first", "other"]):
+        evaluator = model.get_evaluator(name)
+        factors, permutations = sample_mappings(evaluator, 1, seed)
+        mappings[name] = MapSpace.create(evaluator).to_mapping(
+            factors[0], permutations[0]
+        )
+    mappings["repeated"] = mappings["first"]
+
+    evaluate = Evaluator._evaluate
+    calls = []
+
+    def count(self: Evaluator, *args: Any, **kwargs: Any) -> Any:
+        calls.append(self)
+        return evaluate(self, *args, **kwargs)
+
+    monkeypatch.setattr(Evaluator, "_evaluate", count)
+    result = model.evaluate(mappings)
+    assert len(calls) == model.num_unique_layers
+    monkeypatch.undo()
+
+    for layer in result.layers:
+        evaluator = model.get_evaluator(layer.name)
+        assert layer.latency == evaluator.evaluate(*mappings[layer.name])
+        assert layer.network_latencies == evaluator.evaluate_networks(
+            *mappings[layer.name]
+        )
+
+
+def test_model_search(model: ModelEvaluator, tmp_path: Path) -> None:
+    result = model.search(num_workers=0)
+    for layer in result.layers:
+        best = Mapper(model.get_evaluator(layer.name), num_workers=0).run()
+        assert layer.latency == best[0].latency
+
+    # A sink holds the results of a single layer's workload
+    with ResultWriter(tmp_path, model.get_evaluator("first")) as sink:
+        with pytest.raises(NotImplementedError, match="sink"):
+            model.search(SearchOptions(sink=sink), num_workers=0)
+    assert sink.num_rows == 0
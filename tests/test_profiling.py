@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import tracemalloc
+
+from analyzer.profiling import profile, profiled
+
+TEMPORARY_SIZE = 100_000
+KEPT_SIZE = 10_000
+# Bytes of each list element on 64-bit builds
+POINTER_SIZE = 8
+
+
+@profiled("inner")
+def inner() -> int:
+    return len([0] * TEMPORARY_SIZE)
+
+
+@profiled("outer")
+def outer() -> list[int]:
+    kept = [1] * KEPT_SIZE
+    inner()
+    return kept
+
+
+def test_trace_memory() -> None:
+    with profile(trace_memory=True) as profiler:
+        kept = outer()
+    assert not tracemalloc.is_tracing()
+
+    stats = profiler.stages
+    assert stats["inner"].peak_bytes >= TEMPORARY_SIZE * POINTER_SIZE
+    assert stats["inner"].net_allocated_bytes < KEPT_SIZE * POINTER_SIZE
+    # Outer stages include the peaks of the stages they call
+    assert stats["outer"].peak_bytes >= (TEMPORARY_SIZE + KEPT_SIZE) * POINTER_SIZE
+    assert stats["outer"].net_allocated_bytes >= len(kept) * POINTER_SIZE
+
+    with profile() as profiler:
+        outer()
+    assert profiler.stages["outer"].peak_bytes == 0
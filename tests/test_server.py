@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from analyzer.api import Evaluator
+from analyzer.mapper import MapSpace
+from analyzer.server import EvaluationClient, EvaluationServer
+
+type Sampler = Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]
+
+
+def test_server_matches_evaluator(
+    tmp_path: Path,
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    mm_evaluator: Evaluator,
+    sample_mappings: Sampler,
+) -> None:
+    mapspace = MapSpace.create(mm_evaluator)
+    mappings = [
+        mapspace.to_mapping(factors, permutations)
+        for factors, permutations in zip(
+            *sample_mappings(mm_evaluator, 50, 14), strict=True
+        )
+    ]
+
+    async def run() -> None:
+        server = EvaluationServer(max_batch_size=16)
+        listener = await server.serve_unix(tmp_path / "server.sock")
+        async with await EvaluationClient.connect_unix(
+            tmp_path / "server.sock"
+        ) as client:
+            session = await client.open(mm_workload, architecture)
+            assert await client.open(mm_workload, architecture) == session
+            assert len(server.sessions) == 1
+
+            results = await asyncio.gather(
+                *(client.evaluate(session, *mapping) for mapping in mappings)
+            )
+            for result, mapping in zip(results, mappings, strict=True):
+                assert result["latency"] == mm_evaluator.evaluate(*mapping)
+                assert result["networks"] == mm_evaluator.evaluate_networks(*mapping)
+        listener.close()
+        await listener.wait_closed()
+        await server.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    ("mapping", "match"),
+    [
+        # A dim twice and another missing at the first level
+        (
+            (
+                [[8, 32, 1], [1, 1, 1], [1, 2, 1], [1, 1, 1024], [1, 4, 1], [1, 1, 1]],
+                [[0, 0, 1]] + [[0, 2, 1]] * 5,
+            ),
+            "one loop per dim",
+        ),
+        (([[8, 32, 1]] * 5, [[0, 2, 1]] * 5), "one loop per dim"),
+        (
+            ([[8, 32], [1, 1], [1, 2], [1, 1], [1, 4], [1, 1]], [[0, 2, 1]] * 6),
+            "one positive factor",
+        ),
+        (
+            (
+                [[8, 32, 1], [1, 1, 1], [1, 2, 1], [1, 1, 1024], [1, 4, 1], [1, 1, 2]],
+                [[0, 2, 1]] * 6,
+            ),
+            "multiply to its size",
+        ),
+    ],
+)
+def test_server_rejects_invalid_mappings(
+    tmp_path: Path,
+    mm_workload: dict[str, Any],
+    architecture: dict[str, Any],
+    mapping: tuple[list[list[int]], list[list[int]]],
+    match: str,
+) -> None:
+    async def run() -> None:
+        server = EvaluationServer()
+        listener = await server.serve_unix(tmp_path / "server.sock")
+        async with await EvaluationClient.connect_unix(
+            tmp_path / "server.sock"
+        ) as client:
+            session = await client.open(mm_workload, architecture)
+            with pytest.raises(RuntimeError, match=match):
+                await client.evaluate(session, *mapping)
+            assert (await client.stats())["sessions"][session]["num_evaluated"] == 0
+        listener.close()
+        await listener.wait_closed()
+        await server.close()
+
+    asyncio.run(run())
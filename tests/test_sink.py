@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from analyzer.api import Evaluator
+from analyzer.sink import ResultWriter, load_results
+
+type Sampler = Callable[[Evaluator, int, int], tuple[np.ndarray, np.ndarray]]
+
+
+def write(
+    path: Path, evaluator: Evaluator, factors: np.ndarray, permutations: np.ndarray
+) -> ResultWriter:
+    with ResultWriter(path, evaluator, chunk_size=16) as writer:
+        result = evaluator.analyze_batch(factors, permutations)
+        writer.write_batch(
+            factors,
+            permutations,
+            evaluator.evaluate_analysis_batch(result, factors),
+            result.tile_accesses,
+        )
+    return writer
+
+
+def test_results_round_trip(
+    tmp_path: Path, mm_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    factors, permutations = sample_mappings(mm_evaluator, 40, 10)
+    writer = write(tmp_path, mm_evaluator, factors, permutations)
+    assert (writer.num_rows, writer.num_shards) == (40, 3)
+
+    results = load_results(tmp_path)
+    np.testing.assert_array_equal(
+        results["latency"],
+        mm_evaluator.evaluate_batch(factors, permutations)["latency"],
+    )
+    for lvl_idx, level in enumerate(mm_evaluator.levels):
+        for dim_idx, dim in enumerate(mm_evaluator.dims):
+            np.testing.assert_array_equal(
+                results[f"factor/{level}/{dim}"], factors[:, lvl_idx, dim_idx]
+            )
+
+
+def test_reopen_drops_previous_shards(
+    tmp_path: Path, mm_evaluator: Evaluator, sample_mappings: Sampler
+) -> None:
+    factors, permutations = sample_mappings(mm_evaluator, 40, 11)
+    write(tmp_path, mm_evaluator, factors, permutations)
+    write(tmp_path, mm_evaluator, factors[:10], permutations[:10])
+    assert len(load_results(tmp_path, ["latency"])) == len(factors[:10])